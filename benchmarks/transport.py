@@ -0,0 +1,72 @@
+"""
+Benchmark of the messages per second a node handles on one core, on the asyncio and the uvloop event loop
+
+A client sends getmempool requests in batches and reads the replies, so every message passes the framing, the
+scheduling, the handler and the coalesced writes of the node.
+
+Usage: python benchmarks/transport.py [number of messages]
+"""
+import asyncio
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from kermapy import kermapy  # noqa: E402
+
+MESSAGES = 50000
+BATCH = 100
+HOST = "127.0.0.1"
+PORT = 19100
+
+HELLO = b'{"agent":"Kermapy benchmark","type":"hello","version":"0.8.0"}\n'
+GET_MEMPOOL = b'{"type":"getmempool"}\n'
+
+
+async def _run(messages: int) -> float:
+    with tempfile.TemporaryDirectory() as storage_path:
+        node = kermapy.Node(f"{HOST}:{PORT}", storage_path)
+        await node.start_server()
+        serve = asyncio.create_task(node.serve())
+        reader, writer = await asyncio.open_connection(HOST, PORT)
+        writer.write(HELLO)
+        # Skip the preamble of the node
+        for _ in range(4):
+            await reader.readline()
+
+        start = time.perf_counter()
+        for _ in range(messages // BATCH):
+            writer.write(GET_MEMPOOL * BATCH)
+            await writer.drain()
+            for _ in range(BATCH):
+                await reader.readline()
+        elapsed = time.perf_counter() - start
+
+        writer.close()
+        await writer.wait_closed()
+        serve.cancel()
+        try:
+            await serve
+        except asyncio.CancelledError:
+            pass
+        return elapsed
+
+
+def main(messages: int) -> None:
+    loops = [("asyncio", asyncio.DefaultEventLoopPolicy)]
+    try:
+        import uvloop
+        loops.append(("uvloop", uvloop.EventLoopPolicy))
+    except ImportError:
+        print("uvloop is not installed, skipping it")
+    print(f"{'loop':>8} {'messages':>9} {'time [s]':>9} {'messages/s':>11}")
+    for name, policy in loops:
+        asyncio.set_event_loop_policy(policy())
+        elapsed = asyncio.run(_run(messages))
+        print(f"{name:>8} {messages:>9} {elapsed:>9.3f} {messages / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGES)
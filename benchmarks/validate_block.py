@@ -0,0 +1,99 @@
+"""
+Benchmark of the validation of the transactions of synthetic blocks, serial versus on thread and process pools
+
+Usage: python benchmarks/validate_block.py [number of transactions ...]
+"""
+import multiprocessing
+import os
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from kermapy import objects, transaction_validation  # noqa: E402
+from kermapy.org.webpki.json.Canonicalize import canonicalize  # noqa: E402
+
+SIZES = [1000, 2500, 5000, 10000]
+# Share of transactions spending an output of an earlier transaction of the same block
+DEPENDENT_SHARE = 0.2
+
+
+class InMemoryObjects:
+    def __init__(self) -> None:
+        self._objects: dict[str, dict] = {}
+
+    def get(self, object_id: str) -> dict:
+        return self._objects[object_id]
+
+    def put_object(self, obj: dict) -> str:
+        object_id = objects.Objects.id(obj)
+        self._objects[object_id] = obj
+        return object_id
+
+
+def _pubkey(private_key: ed25519.Ed25519PrivateKey) -> str:
+    return private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw).hex()
+
+
+def _signed_transaction(outpoint: tuple[str, int], value: int, private_key: ed25519.Ed25519PrivateKey) -> dict:
+    transaction = {
+        "type": "transaction",
+        "inputs": [{"outpoint": {"txid": outpoint[0], "index": outpoint[1]}, "sig": None}],
+        "outputs": [{"pubkey": _pubkey(private_key), "value": value}]
+    }
+    transaction["inputs"][0]["sig"] = private_key.sign(canonicalize(transaction)).hex()
+    return transaction
+
+
+def synthetic_block(size: int, objs: InMemoryObjects) -> dict[str, dict]:
+    """Creates the transactions of a block with a partially dependent spend DAG"""
+    rng = random.Random(size)
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    transactions: dict[str, dict] = {}
+    spendable: list[str] = []
+    for height in range(size):
+        if spendable and rng.random() < DEPENDENT_SHARE:
+            # Spend the output of an earlier transaction of the block
+            outpoint = (spendable.pop(rng.randrange(len(spendable))), 0)
+        else:
+            coinbase = {"type": "transaction", "height": height,
+                        "outputs": [{"pubkey": _pubkey(private_key), "value": 50}]}
+            outpoint = (objs.put_object(coinbase), 0)
+        transaction = _signed_transaction(outpoint, 50, private_key)
+        tx_id = objs.put_object(transaction)
+        transactions[tx_id] = transaction
+        spendable.append(tx_id)
+    return transactions
+
+
+def _measure(transactions: dict[str, dict], objs: InMemoryObjects, executor: Executor | None) -> float:
+    start = time.perf_counter()
+    transaction_validation.validate_transactions(transactions, objs, executor)
+    return time.perf_counter() - start
+
+
+def main(sizes: list[int]) -> None:
+    workers = os.cpu_count() or 1
+    print(f"{'txs':>6} {'levels':>6} {'serial [s]':>11} {f'threads({workers}) [s]':>16} {'speedup':>8} "
+          f"{f'processes({workers}) [s]':>18} {'speedup':>8}")
+    with ThreadPoolExecutor(workers) as threads, \
+            ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as processes:
+        for size in sizes:
+            objs = InMemoryObjects()
+            transactions = synthetic_block(size, objs)
+            levels = len(transaction_validation.spend_dag_levels(transactions))
+            serial = _measure(transactions, objs, None)
+            threaded = _measure(transactions, objs, threads)
+            multiprocessed = _measure(transactions, objs, processes)
+            print(f"{size:>6} {levels:>6} {serial:>11.3f} {threaded:>16.3f} {serial / threaded:>7.2f}x "
+                  f"{multiprocessed:>18.3f} {serial / multiprocessed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -1,7 +1,24 @@
+import argparse
 import asyncio
 import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from . import kermapy, config
+from . import kermapy, config, objects, snapshot, supervisor
+
+
+def install_event_loop(name: str) -> None:
+    if name == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            logging.warning("uvloop is not installed, falling back to the asyncio event loop")
+            return
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    elif name != "asyncio":
+        logging.warning(f"Unknown event loop {name}, falling back to the asyncio event loop")
 
 
 async def main():
@@ -10,10 +27,60 @@ async def main():
     await node.serve()
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="kermapy", description="Runs the node, if no command is given")
+    commands = parser.add_subparsers(dest="command")
+    export_parser = commands.add_parser("export", help="Write the best chain to a chain file")
+    export_parser.add_argument("file")
+    import_parser = commands.add_parser("import", help="Validate and store the chain of a chain file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--batch-size", type=int, default=100, help="Blocks stored in one write")
+    import_parser.add_argument("--workers", type=int, default=config.VALIDATION_WORKERS,
+                               help="Processes checking the transactions, none if 1")
+    return parser.parse_args()
+
+
+def export_chain(path: str) -> None:
+    objs = objects.Objects(config.STORAGE_PATH)
+    try:
+        with open(path, "wb") as fp:
+            blocks = snapshot.export_chain(objs, fp)
+    finally:
+        objs.close()
+    logging.info(f"Exported {blocks} blocks to {path}")
+
+
+def import_chain(path: str, batch_size: int, workers: int) -> None:
+    started = time.monotonic()
+    objs = objects.Objects(config.STORAGE_PATH)
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers > 1 else None
+    try:
+        with open(path, "rb") as fp:
+            blocks = snapshot.import_chain(objs, fp, executor, batch_size)
+    except snapshot.SnapshotError as e:
+        logging.error(f"Import stopped: {e}")
+        sys.exit(1)
+    finally:
+        if executor:
+            executor.shutdown()
+        objs.close()
+    logging.info(f"Imported {blocks} blocks from {path} in {time.monotonic() - started:.1f} seconds")
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
-    node = kermapy.Node(config.LISTEN_ADDR, config.STORAGE_PATH)
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        pass
+    args = parse_args()
+    if args.command == "export":
+        export_chain(args.file)
+    elif args.command == "import":
+        import_chain(args.file, args.batch_size, args.workers)
+    else:
+        install_event_loop(config.EVENT_LOOP)
+        if config.WORKERS > 1:
+            supervisor.run(config.WORKERS)
+        else:
+            node = kermapy.Node(config.LISTEN_ADDR, config.STORAGE_PATH)
+            try:
+                asyncio.run(main())
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import pathlib
+import time
+from collections import Counter
+from typing import Collection
+
+from .peers import write_atomically
+
+
+class BanManager:
+    """
+    Bans hosts that misbehave repeatedly for a limited time
+
+    Every misbehaviour of a host adds to its score, e.g. a lot for an invalid object and a little for a malformed
+    message. Once the score reaches the threshold the host is banned for the ban duration and its score starts over.
+    Bans are kept by host rather than by address, as a peer reconnects from another port, and survive restarts.
+    """
+
+    def __init__(self, storage_path: str, threshold: int, duration: float, exempt: Collection[str] = ()) -> None:
+        self._threshold: int = threshold
+        self._duration: float = duration
+        self._exempt: Collection[str] = exempt
+        self._scores: Counter[str] = Counter()
+        # Unix time until which a host is banned
+        self._bans: dict[str, float] = {}
+        self._path: pathlib.Path = pathlib.Path(storage_path, "bans.json")
+        # Whether the bans changed since they were last written to the file
+        self.dirty: bool = False
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._bans)
+
+    def is_banned(self, host: str) -> bool:
+        until = self._bans.get(host)
+        if until is None:
+            return False
+        if until <= time.time():
+            del self._bans[host]
+            self.dirty = True
+            return False
+        return True
+
+    def misbehaved(self, host: str, weight: int) -> bool:
+        """
+        Adds to the misbehaviour score of a host
+
+        Returns:
+            True, if the host got banned
+        """
+        if host in self._exempt:
+            return False
+        self._scores[host] += weight
+        if self._scores[host] < self._threshold:
+            return False
+        del self._scores[host]
+        self._bans[host] = time.time() + self._duration
+        self.dirty = True
+        return True
+
+    def dump(self) -> None:
+        write_atomically(self._path, self._serialize())
+
+    async def flush(self) -> bool:
+        """
+        Writes the bans to the file in a worker thread, if they changed
+
+        Returns:
+            True, if the file was written
+        """
+        if not self.dirty:
+            return False
+        data = self._serialize()
+        try:
+            await asyncio.to_thread(write_atomically, self._path, data)
+        except OSError:
+            self.dirty = True
+            raise
+        return True
+
+    def _serialize(self) -> bytes:
+        self.dirty = False
+        now = time.time()
+        return json.dumps({host: until for host, until in self._bans.items() if until > now}).encode()
+
+    def load(self) -> None:
+        self._bans = {}
+        if self._path.exists():
+            try:
+                with self._path.open() as fp:
+                    bans = json.load(fp)
+            except ValueError as e:
+                logging.error(f"Unable to load the bans: {e}")
+                return
+            now = time.time()
+            self._bans = {host: until for host, until in bans.items() if until > now}
+        self.dirty = False
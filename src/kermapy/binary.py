@@ -0,0 +1,236 @@
+"""
+Compact binary encoding of the messages exchanged on links that negotiated the "binary" extension
+
+After the switch marker, every message is sent as a frame of a 4-byte big-endian length followed by the payload.
+The first byte of the payload is the kind of the message: canonical JSON for any message, or an object message
+with the object encoded with raw 32-byte ids and hashes, raw signatures and varints. An object is only sent in the
+binary encoding if it decodes to an object with the same object id, otherwise it is sent as JSON.
+"""
+import json
+
+from org.webpki.json.Canonicalize import canonicalize
+from . import objects
+
+EXTENSION = "binary"
+# Sent as the last line before the frames, the peer switches its reading side once it receives the line
+SWITCH_MARKER = canonicalize({"type": "switch", "extension": EXTENSION}) + b"\n"
+LENGTH_SIZE = 4
+
+KIND_JSON = 0
+KIND_OBJECT = 1
+
+_COINBASE = 1
+_TRANSACTION = 2
+_BLOCK = 3
+
+_HAS_PREVID = 1
+_HAS_MINER = 2
+_HAS_NOTE = 4
+
+
+class DecodeError(ValueError):
+    pass
+
+
+def frame(payload: bytes) -> bytes:
+    return len(payload).to_bytes(LENGTH_SIZE, "big") + payload
+
+
+def encode_message(message: dict) -> bytes:
+    """
+    Encodes a message as a frame
+
+    Args:
+        message (dict): The message that should be sent
+
+    Returns:
+        The frame including the length prefix
+    """
+    return frame(message_payload(message))
+
+
+def message_payload(message: dict) -> bytes:
+    if message["type"] == "object":
+        try:
+            encoded = encode_object(message["object"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            encoded = None
+        if encoded is not None and objects.Objects.id(decode_object(encoded)) == objects.Objects.id(message["object"]):
+            return bytes([KIND_OBJECT]) + encoded
+    return bytes([KIND_JSON]) + canonicalize(message)
+
+
+def encode_lines(data: bytes) -> bytes:
+    """Encodes already serialized newline-delimited JSON messages as frames"""
+    return b"".join(frame(payload) for payload in line_payloads(data))
+
+
+def line_payloads(data: bytes) -> list[bytes]:
+    return [bytes([KIND_JSON]) + line for line in data.splitlines() if line]
+
+
+def decode_message(payload: bytes) -> dict:
+    """
+    Decodes the payload of a frame
+
+    Raises:
+        ValueError: The payload is not a valid message
+    """
+    if not payload:
+        raise DecodeError("Received empty frame")
+    if payload[0] == KIND_JSON:
+        return json.loads(payload[1:])
+    if payload[0] == KIND_OBJECT:
+        return {"type": "object", "object": decode_object(payload[1:])}
+    raise DecodeError(f"Received frame of unknown kind {payload[0]}")
+
+
+def encode_object(obj: dict) -> bytes | None:
+    """
+    Encodes a transaction or a block
+
+    Returns:
+        The encoded object or None, if the object has fields which cannot be encoded
+    """
+    out = bytearray()
+    if obj["type"] == "transaction" and obj.keys() == {"type", "height", "outputs"}:
+        out.append(_COINBASE)
+        _write_varint(out, obj["height"])
+        _write_outputs(out, obj["outputs"])
+    elif obj["type"] == "transaction" and obj.keys() == {"type", "inputs", "outputs"}:
+        out.append(_TRANSACTION)
+        _write_varint(out, len(obj["inputs"]))
+        for inpt in obj["inputs"]:
+            if inpt.keys() != {"outpoint", "sig"} or inpt["outpoint"].keys() != {"txid", "index"}:
+                return None
+            _write_hex(out, inpt["outpoint"]["txid"], 32)
+            _write_varint(out, inpt["outpoint"]["index"])
+            _write_hex(out, inpt["sig"], 64)
+        _write_outputs(out, obj["outputs"])
+    elif obj["type"] == "block" and obj.keys() <= {"type", "txids", "nonce", "previd", "created", "T", "miner", "note"}:
+        out.append(_BLOCK)
+        flags = _HAS_PREVID if obj["previd"] is not None else 0
+        flags |= _HAS_MINER if "miner" in obj else 0
+        flags |= _HAS_NOTE if "note" in obj else 0
+        out.append(flags)
+        _write_hex(out, obj["T"], 32)
+        _write_varint(out, obj["created"])
+        _write_hex(out, obj["nonce"], 32)
+        if obj["previd"] is not None:
+            _write_hex(out, obj["previd"], 32)
+        _write_varint(out, len(obj["txids"]))
+        for txid in obj["txids"]:
+            _write_hex(out, txid, 32)
+        if "miner" in obj:
+            _write_string(out, obj["miner"])
+        if "note" in obj:
+            _write_string(out, obj["note"])
+    else:
+        return None
+    return bytes(out)
+
+
+def decode_object(data: bytes) -> dict:
+    """
+    Decodes a transaction or a block
+
+    Raises:
+        DecodeError: The data is not a valid encoded object
+    """
+    reader = _Reader(data)
+    tag = reader.byte()
+    if tag == _COINBASE:
+        obj = {"type": "transaction", "height": reader.varint(), "outputs": _read_outputs(reader)}
+    elif tag == _TRANSACTION:
+        inputs = []
+        for _ in range(reader.varint()):
+            txid = reader.hex(32)
+            index = reader.varint()
+            inputs.append({"outpoint": {"txid": txid, "index": index}, "sig": reader.hex(64)})
+        obj = {"type": "transaction", "inputs": inputs, "outputs": _read_outputs(reader)}
+    elif tag == _BLOCK:
+        flags = reader.byte()
+        obj = {"type": "block", "T": reader.hex(32), "created": reader.varint(), "nonce": reader.hex(32)}
+        obj["previd"] = reader.hex(32) if flags & _HAS_PREVID else None
+        obj["txids"] = [reader.hex(32) for _ in range(reader.varint())]
+        if flags & _HAS_MINER:
+            obj["miner"] = reader.string()
+        if flags & _HAS_NOTE:
+            obj["note"] = reader.string()
+    else:
+        raise DecodeError(f"Received object of unknown tag {tag}")
+    if not reader.done():
+        raise DecodeError("Received object with trailing data")
+    return obj
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"Cannot encode {value!r} as varint")
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_hex(out: bytearray, value: str, size: int) -> None:
+    raw = bytes.fromhex(value)
+    if len(raw) != size or raw.hex() != value:
+        raise ValueError(f"Cannot encode {value!r} as {size} bytes")
+    out += raw
+
+
+def _write_string(out: bytearray, value: str) -> None:
+    raw = value.encode()
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _write_outputs(out: bytearray, outputs: list[dict]) -> None:
+    _write_varint(out, len(outputs))
+    for output in outputs:
+        if output.keys() != {"pubkey", "value"}:
+            raise ValueError("Cannot encode output with unknown fields")
+        _write_hex(out, output["pubkey"], 32)
+        _write_varint(out, output["value"])
+
+
+def _read_outputs(reader: '_Reader') -> list[dict]:
+    return [{"pubkey": reader.hex(32), "value": reader.varint()} for _ in range(reader.varint())]
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self._data: bytes = data
+        self._position: int = 0
+
+    def done(self) -> bool:
+        return self._position == len(self._data)
+
+    def _take(self, size: int) -> bytes:
+        if self._position + size > len(self._data):
+            raise DecodeError("Received truncated object")
+        chunk = self._data[self._position:self._position + size]
+        self._position += size
+        return chunk
+
+    def byte(self) -> int:
+        return self._take(1)[0]
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.byte()
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def hex(self, size: int) -> str:
+        return self._take(size).hex()
+
+    def string(self) -> str:
+        try:
+            return self._take(self.varint()).decode()
+        except UnicodeDecodeError as e:
+            raise DecodeError(str(e))
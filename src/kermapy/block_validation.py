@@ -0,0 +1,80 @@
+from . import config, objects
+from .transaction_validation import TransactionMetadata
+
+
+class InvalidBlock(Exception):
+    pass
+
+
+def check_proof_of_work(block: dict, block_id: str) -> None:
+    """
+    Checks the target and the proof-of-work of a block
+
+    Raises:
+        InvalidBlock: The block has another target or its id does not satisfy the target
+    """
+    # Ensure the target is the one required
+    if block["T"] != config.TARGET:
+        raise InvalidBlock("Received block with invalid target")
+    # Check the proof-of-work
+    if int(block_id, base=16) >= int(block['T'], base=16):
+        raise InvalidBlock(
+            "Received block does not satisfy the proof-of-work equation")
+
+
+def check_ancestry(block: dict, block_id: str, parent: dict | None) -> None:
+    """
+    Checks a block against its parent, or against the genesis block if it has none
+
+    Raises:
+        InvalidBlock: The block is not later than its parent or it is a different genesis block
+    """
+    if parent is not None:
+        # Check that the timestamp of each block (the created field) is later than that of its parent
+        if parent["created"] > block["created"]:
+            raise InvalidBlock("Received block with timestamp not later than of its parent")
+    elif block_id != objects.Objects.id(config.GENESIS):
+        raise InvalidBlock("Received block which stops at a different genesis")
+
+
+def check_coinbase(block: dict, txs: list[dict], metadata: dict[str, TransactionMetadata | None],
+                   height: int) -> None:
+    """
+    Checks the coinbase transaction of a block, if it has one
+
+    Args:
+        block (dict): The block
+        txs (list[dict]): The transactions of the block in block order
+        metadata (dict[str, TransactionMetadata | None]): The metadata of the validated transactions which are not
+            coinbase transactions by their ids
+        height (int): The height of the block
+
+    Raises:
+        InvalidBlock: The coinbase transaction is not valid
+    """
+    fees = sum(m.total_input_value - m.total_output_value for m in metadata.values())
+    # Check for coinbase transactions, there can be at most one coinbase transaction in a block
+    coinbase_txs = [tx for tx in txs if "inputs" not in tx]
+    if len(coinbase_txs) > 1:
+        raise InvalidBlock(
+            "Received block contains more than one coinbase transaction")
+    if len(coinbase_txs) == 1:
+        coinbase_txid = objects.Objects.id(coinbase_txs[0])
+        if block["txids"][0] != coinbase_txid:
+            raise InvalidBlock(
+                "Received block with coinbase transaction not at index 0")
+        # Check the coinbase transaction cannot be spent in another transaction in the same block (this is in order
+        # to make the law of conservation for the coinbase transaction easier to verify).
+        for tx in txs:
+            for inpt in tx.get("inputs", []):
+                txid = inpt["outpoint"]["txid"]
+                if txid == coinbase_txid:
+                    raise InvalidBlock("Received block with coinbase transaction spend in another transaction")
+        # Check that the height in the coinbase transaction matches the height of the block the transaction is
+        # contained in.
+        if coinbase_txs[0]["height"] != height:
+            raise InvalidBlock("Received block with coinbase transaction height does not match block height")
+        # Check the coinbase transaction has no outputs that exceed the block rewards and the fees.
+        outputs = sum(output["value"] for output in coinbase_txs[0]["outputs"])
+        if outputs > config.BLOCK_REWARD + fees:
+            raise InvalidBlock("Received block with coinbase transaction that exceed block rewards and the fees")
@@ -0,0 +1,60 @@
+import time
+import zlib
+
+from . import metrics
+
+EXTENSION = "zlib"
+# Set in the kind byte of compressed frame payloads
+COMPRESSED = 0x80
+
+
+class FrameCompressor:
+    """
+    Compresses the frame payloads sent to a peer above a size threshold
+
+    All compressed payloads of a connection share one zlib stream, every payload is flushed on its own, so the
+    history of earlier messages helps compressing the hex strings of later ones.
+    """
+
+    def __init__(self, threshold: int, level: int, node_metrics: metrics.Metrics) -> None:
+        self._threshold: int = threshold
+        self._compressobj = zlib.compressobj(level)
+        self._metrics: metrics.Metrics = node_metrics
+
+    def compress(self, payload: bytes) -> bytes:
+        if len(payload) < self._threshold:
+            return payload
+        start = time.process_time()
+        compressed = self._compressobj.compress(payload[1:]) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+        self._metrics.observe("compression_seconds", time.process_time() - start)
+        self._metrics.inc("compression_bytes_in", len(payload))
+        self._metrics.inc("compression_bytes_out", len(compressed) + 1)
+        self._metrics.set("compression_ratio",
+                          self._metrics.counters["compression_bytes_in"] / self._metrics.counters["compression_bytes_out"])
+        return bytes([payload[0] | COMPRESSED]) + compressed
+
+
+class FrameDecompressor:
+    def __init__(self, max_size: int, node_metrics: metrics.Metrics) -> None:
+        self._max_size: int = max_size
+        self._decompressobj = zlib.decompressobj()
+        self._metrics: metrics.Metrics = node_metrics
+
+    def decompress(self, payload: bytes) -> bytes:
+        """
+        Restores a payload compressed by the peer, other payloads are returned as they are
+
+        Raises:
+            ValueError: The payload cannot be decompressed or exceeds the maximum message size
+        """
+        if not payload or not payload[0] & COMPRESSED:
+            return payload
+        start = time.process_time()
+        try:
+            data = self._decompressobj.decompress(payload[1:], self._max_size)
+        except zlib.error as e:
+            raise ValueError(f"Received frame that cannot be decompressed: {e}")
+        if self._decompressobj.unconsumed_tail:
+            raise ValueError("Received compressed frame exceeding the maximum message size")
+        self._metrics.observe("decompression_seconds", time.process_time() - start)
+        return bytes([payload[0] & ~COMPRESSED]) + data
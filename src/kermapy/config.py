@@ -10,6 +10,10 @@ def _getenv_as_int(key: str, default: int) -> int:
     return int(os.getenv(key, default))
 
 
+def _getenv_as_float(key: str, default: float) -> float:
+    return float(os.getenv(key, default))
+
+
 VERSION = "1.4.0"
 TARGET = "00000002af000000000000000000000000000000000000000000000000000000"
 GENESIS = {
@@ -28,5 +32,82 @@ BLOCK_REWARD = 50 * BU
 LISTEN_ADDR = os.getenv("LISTEN_ADDR", "0.0.0.0:18018")
 STORAGE_PATH = os.getenv("STORAGE_PATH", "../../data")
 BOOTSTRAP_NODES = _getenv_as_list("BOOTSTRAP_NODES", "128.130.122.101:18018")
+# Known peers are kept in buckets of this size, in tables of gossiped and of connected peers
+NEW_BUCKETS = _getenv_as_int("NEW_BUCKETS", 64)
+TRIED_BUCKETS = _getenv_as_int("TRIED_BUCKETS", 16)
+BUCKET_SIZE = _getenv_as_int("BUCKET_SIZE", 16)
+# Addresses of one host kept on ports other than the default port, so one host cannot fill its bucket
+PEERS_PER_HOST = _getenv_as_int("PEERS_PER_HOST", 10)
+# A host is banned for BAN_DURATION seconds once its misbehaviour adds up to BAN_THRESHOLD, the hosts in BAN_EXEMPT
+# are never banned
+BAN_THRESHOLD = _getenv_as_int("BAN_THRESHOLD", 100)
+BAN_DURATION = _getenv_as_float("BAN_DURATION", 86400)
+BAN_EXEMPT = [host for host in _getenv_as_list("BAN_EXEMPT", "127.0.0.1,::1") if host]
+# Misbehaviour of sending an invalid object or a message that cannot be parsed or validated
+MISBEHAVIOUR_INVALID_OBJECT = _getenv_as_int("MISBEHAVIOUR_INVALID_OBJECT", 50)
+MISBEHAVIOUR_MALFORMED_MESSAGE = _getenv_as_int("MISBEHAVIOUR_MALFORMED_MESSAGE", 10)
+# Reading from a peer is slowed down to this many 'object' and 'getobject' messages per second, after a burst
+OBJECT_RATE = _getenv_as_float("OBJECT_RATE", 100)
+OBJECT_BURST = _getenv_as_int("OBJECT_BURST", 500)
+GETOBJECT_RATE = _getenv_as_float("GETOBJECT_RATE", 100)
+GETOBJECT_BURST = _getenv_as_int("GETOBJECT_BURST", 500)
+# The metrics of the node are logged this often, in seconds
+METRICS_INTERVAL = _getenv_as_float("METRICS_INTERVAL", 60)
+# Changed peers are written to peers.json at most this often, in seconds
+PEERS_FLUSH_INTERVAL = _getenv_as_float("PEERS_FLUSH_INTERVAL", 10)
+# At most this many peers are sent in a 'peers' message
+PEERS_REPLY_SIZE = _getenv_as_int("PEERS_REPLY_SIZE", 30)
+# Protocol extensions offered in the hello message, "binary" for length-prefixed binary frames and "zlib" for
+# compressing the binary frames
+EXTENSIONS = [extension for extension in _getenv_as_list("EXTENSIONS", "") if extension]
+# Binary frames are compressed from this payload size in bytes on
+COMPRESSION_THRESHOLD = _getenv_as_int("COMPRESSION_THRESHOLD", 512)
+COMPRESSION_LEVEL = _getenv_as_int("COMPRESSION_LEVEL", 6)
+# Serve connections from this many worker processes sharing the listening port, if greater than 1
+WORKERS = _getenv_as_int("WORKERS", 1)
+# The event loop to run on, "asyncio" or "uvloop" if it is installed
+EVENT_LOOP = os.getenv("EVENT_LOOP", "asyncio")
+# The number of outbound connections kept open
 CLIENT_CONNECTIONS = _getenv_as_int("CLIENT_CONNECTIONS", 8)
+# Free outbound slots are filled at least this often, in seconds
+OUTBOUND_INTERVAL = _getenv_as_float("OUTBOUND_INTERVAL", 5)
+# A peer is retried after a backoff doubling with every failure from the minimum up to the maximum, in seconds
+RECONNECT_MIN_BACKOFF = _getenv_as_float("RECONNECT_MIN_BACKOFF", 1)
+RECONNECT_MAX_BACKOFF = _getenv_as_float("RECONNECT_MAX_BACKOFF", 300)
+# An outbound connection closed before this many seconds counts as failure
+STABLE_CONNECTION = _getenv_as_float("STABLE_CONNECTION", 60)
+# The slowest outbound peer is replaced this often, in seconds
+ROTATE_INTERVAL = _getenv_as_float("ROTATE_INTERVAL", 600)
+# Reading from a peer pauses while this many bytes of received messages wait to be handled
 BUFFER_SIZE = _getenv_as_int("BUFFER_SIZE", 1048576)
+MAX_MESSAGE_SIZE = _getenv_as_int("MAX_MESSAGE_SIZE", 1048576)
+MEMPOOL_DEFERRED_TXS = _getenv_as_int("MEMPOOL_DEFERRED_TXS", 1000)
+VALIDATION_WORKERS = _getenv_as_int("VALIDATION_WORKERS", os.cpu_count() or 1)
+# Validate the transactions of large blocks in this many worker processes instead of threads, if greater than 0
+VALIDATION_PROCESSES = _getenv_as_int("VALIDATION_PROCESSES", 0)
+PARALLEL_VALIDATION_TXS = _getenv_as_int("PARALLEL_VALIDATION_TXS", 64)
+# Blocks with unknown parents are kept up to this many blocks and this many bytes
+ORPHAN_BLOCKS = _getenv_as_int("ORPHAN_BLOCKS", 1024)
+ORPHAN_BYTES = _getenv_as_int("ORPHAN_BYTES", 67108864)
+SYNC_WINDOW = _getenv_as_int("SYNC_WINDOW", 256)
+GETOBJECT_FANOUT = _getenv_as_int("GETOBJECT_FANOUT", 2)
+GETOBJECT_RETRY_TIMEOUT = _getenv_as_float("GETOBJECT_RETRY_TIMEOUT", 5)
+KNOWN_INVENTORY = _getenv_as_int("KNOWN_INVENTORY", 50000)
+# The ids of this many invalid objects are remembered, so they are not fetched and validated again
+REJECTED_OBJECTS = _getenv_as_int("REJECTED_OBJECTS", 50000)
+ANNOUNCE_TO_SENDER = bool(_getenv_as_int("ANNOUNCE_TO_SENDER", 1))
+ANNOUNCE_INTERVAL = _getenv_as_float("ANNOUNCE_INTERVAL", 0.1)
+SEND_QUEUE_SIZE = _getenv_as_int("SEND_QUEUE_SIZE", 1024)
+# What happens to messages for a peer whose send queue is full, "drop" or "disconnect"
+SEND_QUEUE_POLICY = os.getenv("SEND_QUEUE_POLICY", "drop")
+# Replies wait this many seconds for space in a full send queue, before the send queue policy applies
+SEND_TIMEOUT = _getenv_as_float("SEND_TIMEOUT", 5)
+CLOSE_TIMEOUT = _getenv_as_float("CLOSE_TIMEOUT", 1)
+# Connecting to a peer fails after this many seconds, so an unresponsive address is backed off like a refused one
+CONNECT_TIMEOUT = _getenv_as_float("CONNECT_TIMEOUT", 10)
+HANDSHAKE_TIMEOUT = _getenv_as_float("HANDSHAKE_TIMEOUT", 20)
+INBOUND_QUEUE_SIZE = _getenv_as_int("INBOUND_QUEUE_SIZE", 64)
+# Messages of one peer handled at once, and handled or waiting for the objects they need
+CONNECTION_WORKERS = _getenv_as_int("CONNECTION_WORKERS", 8)
+CONNECTION_HANDLERS = _getenv_as_int("CONNECTION_HANDLERS", 64)
+PROCESSING_WORKERS = _getenv_as_int("PROCESSING_WORKERS", 64)
@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import logging
+from typing import Awaitable, Callable, Collection
+
+from . import binary
+
+
+class MessageTooLarge(Exception):
+    pass
+
+
+class LineFramer(asyncio.streams.FlowControlMixin, asyncio.Protocol):
+    """
+    Splits the data received from a peer into newline-delimited messages
+
+    Received data is appended to one reusable buffer, all messages completed by a chunk are split off at once through a
+    view of the buffer, so each message is copied once, and the consumed part of the buffer is discarded once per
+    chunk. The search for the end of a line resumes where the previous chunk left off. Reading from the socket pauses
+    while more than buffer_size bytes of complete messages are waiting to be read. If the binary extension is enabled and the peer
+    sends the switch marker, the data after it is split into length-prefixed frames instead.
+    """
+
+    def __init__(self, max_message_size: int, buffer_size: int,
+                 client_connected_cb: Callable[['LineFramer', asyncio.StreamWriter], Awaitable] | None = None,
+                 extensions: Collection[str] = ()) -> None:
+        super().__init__(asyncio.get_running_loop())
+        self._max_message_size: int = max_message_size
+        self._buffer_size: int = buffer_size
+        self._client_connected_cb = client_connected_cb
+        self._extensions: Collection[str] = extensions
+        self.binary: bool = False
+        self._buffer: bytearray = bytearray()
+        # Length of the start of the buffer that is known to contain no newline
+        self._scanned: int = 0
+        # Received messages, each flagged whether it is the payload of a binary frame
+        self._messages: collections.deque[tuple[bool, bytes]] = collections.deque()
+        self._buffered: int = 0
+        self._waiter: asyncio.Future | None = None
+        self._exception: Exception | None = None
+        self._eof: bool = False
+        self._reading_paused: bool = False
+        self._transport: asyncio.Transport | None = None
+        self._closed: asyncio.Future = self._loop.create_future()
+        self._task: asyncio.Task | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        self.writer = asyncio.StreamWriter(transport, self, None, self._loop)
+        if self._client_connected_cb:
+            self._task = self._loop.create_task(self._client_connected_cb(self, self.writer))
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        super().connection_lost(exc)
+        if exc and not self._exception:
+            self._exception = exc
+        self._eof = True
+        self._wake_up()
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self._task = None
+
+    def data_received(self, data: bytes) -> None:
+        if self._exception:
+            return
+        self._buffer.extend(data)
+        # The view is released before the buffer is resized
+        with memoryview(self._buffer) as view:
+            start = 0 if self.binary else self._split_lines(view)
+            if start is not None and self.binary:
+                start = self._split_frames(view, start)
+        if start is None:
+            self._fail()
+            return
+        del self._buffer[:start]
+        if not self.binary and len(self._buffer) > self._max_message_size:
+            self._fail()
+            return
+        if self._messages:
+            self._wake_up()
+        if self._buffered > self._buffer_size and not self._reading_paused:
+            self._reading_paused = True
+            self._transport.pause_reading()
+
+    def _split_lines(self, view: memoryview) -> int | None:
+        """Returns the start of the incomplete rest of the buffer, or None if a message is too large"""
+        start = 0
+        end = self._buffer.find(b"\n", self._scanned)
+        while end != -1:
+            if end + 1 - start > self._max_message_size:
+                return None
+            message = bytes(view[start:end + 1])
+            start = end + 1
+            if message == binary.SWITCH_MARKER and binary.EXTENSION in self._extensions:
+                self.binary = True
+                break
+            self._messages.append((False, message))
+            self._buffered += len(message)
+            end = self._buffer.find(b"\n", start)
+        # A message received in many chunks is searched for its newline only once
+        self._scanned = 0 if self.binary else len(view) - start
+        return start
+
+    def _split_frames(self, view: memoryview, start: int) -> int | None:
+        while len(view) - start >= binary.LENGTH_SIZE:
+            size = int.from_bytes(view[start:start + binary.LENGTH_SIZE], "big")
+            if size > self._max_message_size:
+                return None
+            end = start + binary.LENGTH_SIZE + size
+            if len(view) < end:
+                break
+            message = bytes(view[start + binary.LENGTH_SIZE:end])
+            self._messages.append((True, message))
+            self._buffered += len(message)
+            start = end
+        return start
+
+    def eof_received(self) -> bool:
+        self._eof = True
+        self._wake_up()
+        return False
+
+    def _fail(self) -> None:
+        logging.debug(f"Discarding {len(self._buffer)} buffered bytes with an oversized message")
+        self._buffer.clear()
+        self._scanned = 0
+        self._exception = MessageTooLarge(
+            f"Received message exceeds the maximum size of {self._max_message_size} bytes")
+        self._transport.pause_reading()
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _get_close_waiter(self, stream: asyncio.StreamWriter) -> asyncio.Future:
+        return self._closed
+
+    async def read_message(self) -> tuple[bool, bytes]:
+        """
+        Returns the next message, a line including the newline or the payload of a binary frame
+
+        Raises:
+            MessageTooLarge: The peer sent a message larger than the maximum message size
+            EOFError: The peer closed the connection
+            ConnectionError: The connection was lost
+        """
+        while not self._messages:
+            if self._exception:
+                raise self._exception
+            if self._eof:
+                raise EOFError("Connection closed by peer")
+            self._waiter = self._loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        is_binary, message = self._messages.popleft()
+        self._buffered -= len(message)
+        if self._reading_paused and self._buffered <= self._buffer_size:
+            self._reading_paused = False
+            self._transport.resume_reading()
+        return is_binary, message
+
+
+async def start_server(client_connected_cb: Callable[[LineFramer, asyncio.StreamWriter], Awaitable], host: str,
+                       port: int | str, max_message_size: int, buffer_size: int,
+                       reuse_port: bool = False, extensions: Collection[str] = ()) -> asyncio.Server:
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(
+        lambda: LineFramer(max_message_size, buffer_size, client_connected_cb, extensions), host, port,
+        reuse_port=reuse_port or None)
+
+
+async def open_connection(host: str, port: int | str, max_message_size: int, buffer_size: int,
+                          extensions: Collection[str] = ()) -> tuple[LineFramer, asyncio.StreamWriter]:
+    loop = asyncio.get_running_loop()
+    _, framer = await loop.create_connection(
+        lambda: LineFramer(max_message_size, buffer_size, extensions=extensions), host, port)
+    return framer, framer.writer
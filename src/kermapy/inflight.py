@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Callable
+
+from org.webpki.json.Canonicalize import canonicalize
+from . import objects
+
+
+class _Request:
+    def __init__(self, event: asyncio.Event) -> None:
+        self.event: asyncio.Event = event
+        # The peers asked for the object with the time they were asked
+        self.tried: dict = {}
+        self.task: asyncio.Task | None = None
+
+
+class InflightRequests:
+    """
+    Missing objects requested from the peers, every object is requested only once at a time
+
+    A request is sent to the fanout least loaded peers, or to the peer that announced the object. Among equally loaded
+    peers the ones with the highest score are asked first. If the object does not arrive within the retry timeout,
+    the peers asked count a timeout and it is requested from the least loaded peers that were not asked yet. All
+    waiters for an object share the event that is set when the object is stored. The scores and timeouts of the peers
+    are looked up and recorded for all peers at once, as they may be kept by another process.
+    """
+
+    def __init__(self, objs: objects.Objects, connections: set, fanout: int, retry_timeout: float,
+                 timeout: float, scores: Callable[[list], list[float]] | None = None,
+                 timed_out: Callable[[list], None] | None = None) -> None:
+        self._objs: objects.Objects = objs
+        self._connections: set = connections
+        self._fanout: int = fanout
+        self._retry_timeout: float = retry_timeout
+        self._timeout: float = timeout
+        self._requests: dict[str, _Request] = {}
+        self._load: Counter = Counter()
+        self._scores: Callable[[list], list[float]] = scores or (lambda conns: [0] * len(conns))
+        self._timed_out: Callable[[list], None] = timed_out or (lambda conns: None)
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._requests
+
+    def load(self, conn) -> int:
+        return self._load[conn]
+
+    def response_time(self, object_id: str, conn) -> float | None:
+        """Returns the seconds since the object was requested from the peer, or None if it was not requested from it"""
+        request = self._requests.get(object_id)
+        if request is None or conn not in request.tried:
+            return None
+        return time.monotonic() - request.tried[conn]
+
+    def request(self, object_id: str, hint=None) -> asyncio.Event:
+        """
+        Requests an object from the peers, unless it is already in flight
+
+        Args:
+            object_id (str): The id of the missing object
+            hint (Connection | None): The peer that should be asked first, e.g. because it announced the object
+
+        Returns:
+            The event that is set once the object is stored
+        """
+        request = self._requests.get(object_id)
+        if request is None:
+            request = _Request(self._objs.event_for(object_id))
+            self._requests[object_id] = request
+            request.task = asyncio.create_task(self._drive(object_id, request, hint))
+        return request.event
+
+    async def fetch(self, object_id: str) -> None:
+        """
+        Waits until a missing object is stored
+
+        Raises:
+            asyncio.TimeoutError: The object could not be received within the timeout
+        """
+        if object_id in self._objs:
+            return
+        event = self.request(object_id)
+        await asyncio.wait_for(event.wait(), self._timeout)
+
+    def received(self, object_id: str) -> None:
+        """Stops requesting an object that arrived but is not stored, e.g. an orphan block"""
+        request = self._requests.get(object_id)
+        if request:
+            request.task.cancel()
+
+    def clear(self) -> None:
+        for request in self._requests.values():
+            request.task.cancel()
+
+    async def _drive(self, object_id: str, request: _Request, hint) -> None:
+        try:
+            async with asyncio.timeout(self._timeout):
+                peers = [hint] if hint in self._connections else self._next_peers(request)
+                while not request.event.is_set():
+                    self._send(object_id, request, peers)
+                    try:
+                        await asyncio.wait_for(request.event.wait(), self._retry_timeout)
+                    except asyncio.TimeoutError:
+                        if peers:
+                            self._timed_out(peers)
+                        peers = self._next_peers(request)
+                        if peers:
+                            logging.info(f"Object with ID: {object_id} not received yet, asking other peers")
+        except asyncio.TimeoutError:
+            logging.info(f"Object with ID: {object_id} could not be received")
+        finally:
+            for peer in request.tried:
+                self._load[peer] -= 1
+                if self._load[peer] <= 0:
+                    del self._load[peer]
+            del self._requests[object_id]
+
+    def _next_peers(self, request: _Request) -> list:
+        untried = [conn for conn in self._connections if conn not in request.tried]
+        if len(untried) <= self._fanout:
+            return untried
+        ranked = sorted(zip(untried, self._scores(untried)), key=lambda item: (self._load[item[0]], -item[1]))
+        return [conn for conn, _ in ranked[:self._fanout]]
+
+    def _send(self, object_id: str, request: _Request, peers: list) -> None:
+        data = canonicalize({
+            "type": "getobject",
+            "objectid": object_id
+        }) + b"\n"
+        for peer in peers:
+            request.tried[peer] = time.monotonic()
+            self._load[peer] += 1
+            peer.send(data)
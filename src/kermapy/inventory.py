@@ -0,0 +1,65 @@
+import enum
+
+
+class KnownInventory:
+    """
+    Bounded set of the object ids a peer is known to have
+
+    The ids are kept in two generations. Once the current generation holds capacity ids, the previous generation is
+    dropped and a new one is started, so the most recent capacity ids are always remembered.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity: int = capacity
+        self._current: set[str] = set()
+        self._previous: set[str] = set()
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._current or object_id in self._previous
+
+    def add(self, object_id: str) -> None:
+        if len(self._current) >= self._capacity:
+            self._previous = self._current
+            self._current = set()
+        self._current.add(object_id)
+
+
+class RejectReason(enum.Enum):
+    PROOF_OF_WORK = "proof-of-work"
+    TRANSACTION = "transaction"
+    BLOCK = "block"
+    # A block extending a rejected block
+    ANCESTRY = "ancestry"
+
+
+class Rejection:
+    def __init__(self, reason: RejectReason, error: str) -> None:
+        self.reason: RejectReason = reason
+        # The error message sent to the peer that sent the object
+        self.error: str = error
+
+
+class RejectedObjects:
+    """
+    Bounded map of the ids of invalid objects to why they were rejected
+
+    Like the known inventory, the ids are kept in two generations, so the most recent capacity rejections are always
+    remembered. Only objects that are invalid for good are added, not ones that failed for a transient reason.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity: int = capacity
+        self._current: dict[str, Rejection] = {}
+        self._previous: dict[str, Rejection] = {}
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._current or object_id in self._previous
+
+    def get(self, object_id: str) -> Rejection | None:
+        return self._current.get(object_id) or self._previous.get(object_id)
+
+    def add(self, object_id: str, reason: RejectReason, error: str) -> None:
+        if len(self._current) >= self._capacity:
+            self._previous = self._current
+            self._current = {}
+        self._current[object_id] = Rejection(reason, error)
@@ -1,47 +1,224 @@
 import asyncio
+import contextlib
+import itertools
 import json
 import logging
 import time
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, NoReturn
 
 from jsonschema.exceptions import ValidationError
-from jsonschema.validators import validate
 
 from org.webpki.json.Canonicalize import canonicalize
-from . import config, messages, objects, peers, schemas, transaction_validation, utxo, mempool
+from . import bans, binary, block_validation, compression, config, framing, inflight, inventory, limits, messages, \
+    metrics, objects, orphans, outbound, peers, scheduler, schemas, sync, transaction_validation, utxo, mempool
 
 
 class ProtocolError(Exception):
     pass
 
 
+class TransientError(ProtocolError):
+    """An object could not be validated for a reason that may go away, it is not invalid for good"""
+    pass
+
+
+class UnavailableError(TransientError):
+    """An object could not be validated, because objects it refers to could not be received"""
+    pass
+
+
 class TaskError(Exception):
     pass
 
 
 class Connection:
-    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, incoming: bool) -> None:
-        self._reader: asyncio.StreamReader = reader
+    def __init__(self, reader: framing.LineFramer, writer: asyncio.StreamWriter, incoming: bool,
+                 processing: limits.ConcurrencyLimit | None = None) -> None:
+        self._reader: framing.LineFramer = reader
         self._writer: asyncio.StreamWriter = writer
         self.incoming: bool = incoming
+        # The processing slot of a handler is given up while it waits for space in the send queue
+        self._processing: limits.ConcurrencyLimit | None = processing
         self.peer_name: str = "{}:{}".format(
             *writer.get_extra_info("peername"))
+        self.host: str = writer.get_extra_info("peername")[0]
+        # Limits the rate at which the peer can make us fetch, validate and serve objects
+        self.rate_limits: dict[str, limits.TokenBucket] = {
+            "object": limits.TokenBucket(config.OBJECT_RATE, config.OBJECT_BURST),
+            "getobject": limits.TokenBucket(config.GETOBJECT_RATE, config.GETOBJECT_BURST)
+        }
+        # Objects the peer announced, sent or was told about
+        self.known_objects: inventory.KnownInventory = inventory.KnownInventory(config.KNOWN_INVENTORY)
+        # Announcements are coalesced for a short interval and flushed in one write
+        self._announcements: list[bytes] = []
+        self._announcement_timer: asyncio.TimerHandle | None = None
+        # Serialized messages sent to the peer by a dedicated task. Binary frame payloads are framed when they are
+        # written, as compressed frames share one zlib stream and must reach the peer in the order they were compressed.
+        self._send_queue: asyncio.Queue[bytes | list[bytes]] = asyncio.Queue(config.SEND_QUEUE_SIZE)
+        self._send_task: asyncio.Task = asyncio.create_task(self._send_loop())
+        # Whether messages are sent as binary frames instead of lines
+        self._binary: bool = False
+        self._compressor: compression.FrameCompressor | None = None
+        self._decompressor: compression.FrameDecompressor | None = None
+        # Received messages waiting for a worker by class, reading pauses while the queue is full
+        self.inbound: asyncio.PriorityQueue[tuple[scheduler.MessageClass, int, float, dict]] = \
+            asyncio.PriorityQueue(config.INBOUND_QUEUE_SIZE)
+        # Bounds the messages taken from the queue that are handled or wait for the objects they need
+        self.handlers: asyncio.Semaphore = asyncio.Semaphore(config.CONNECTION_HANDLERS)
         logging.info(
             f"Established connection {'from' if incoming else 'to'} {self.peer_name}")
 
     async def close(self) -> None:
         logging.info(
             f"Closing the connection {'from' if self.incoming else 'to'} {self.peer_name}")
+        self.flush_announcements()
+        if not self._send_task.done():
+            try:
+                await asyncio.wait_for(self._send_queue.join(), config.CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logging.debug(f"Dropping {self._send_queue.qsize()} queued messages to {self.peer_name}")
+        self._send_task.cancel()
         try:
             self._writer.close()
             await self._writer.wait_closed()
         except ConnectionError as e:
             logging.debug(e)
 
+    def abort(self) -> None:
+        """Drops the connection without waiting for queued messages, the handler of the connection ends"""
+        self._writer.transport.abort()
+
+    @property
+    def send_backlog(self) -> int:
+        return self._send_queue.qsize()
+
     async def write_message(self, message: dict) -> None:
-        data = canonicalize(message) + b"\n"
-        logging.debug(f"Sending {data!r} to {self.peer_name}")
-        self._writer.write(data)
-        await self._writer.drain()
+        if self._binary:
+            data = [binary.message_payload(message)]
+        else:
+            data = canonicalize(message) + b"\n"
+        await self._queue(data)
+
+    async def write_messages(self, messages: list[dict]) -> None:
+        """Queues several messages as one write"""
+        if self._binary:
+            data = [binary.message_payload(message) for message in messages]
+        else:
+            data = b"".join(canonicalize(message) + b"\n" for message in messages)
+        await self._queue(data)
+
+    async def _queue(self, data: bytes | list[bytes]) -> None:
+        """
+        Queues serialized messages for the peer, waiting for space in the queue for up to SEND_TIMEOUT seconds
+
+        A slow peer slows down the handling of its own messages this way, without holding a processing slot. If the
+        queue stays full, the configured send queue policy applies.
+        """
+        if self._writer.is_closing():
+            return
+        try:
+            self._send_queue.put_nowait(data)
+            return
+        except asyncio.QueueFull:
+            pass
+        try:
+            async with self._processing.suspended() if self._processing else contextlib.nullcontext():
+                await asyncio.wait_for(self._send_queue.put(data), config.SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._queue_full(data)
+
+    async def switch_to_binary(self, node_metrics: metrics.Metrics | None = None) -> None:
+        """
+        Sends all further messages as binary frames, after telling the peer with the switch marker
+
+        Args:
+            node_metrics (metrics.Metrics | None): Where to record the compression of the frames, frames are only
+                compressed if given
+        """
+        # Pending announcements were batched as lines
+        self.flush_announcements()
+        await self._send_queue.put(binary.SWITCH_MARKER)
+        self._binary = True
+        if node_metrics is not None:
+            self._compressor = compression.FrameCompressor(
+                config.COMPRESSION_THRESHOLD, config.COMPRESSION_LEVEL, node_metrics)
+            self._decompressor = compression.FrameDecompressor(config.MAX_MESSAGE_SIZE, node_metrics)
+        logging.info(f"Switched to binary frames for {self.peer_name}{' with compression' if node_metrics else ''}")
+
+    def _frame(self, payloads: list[bytes]) -> bytes:
+        if self._compressor:
+            payloads = [self._compressor.compress(payload) for payload in payloads]
+        return b"".join(binary.frame(payload) for payload in payloads)
+
+    def send(self, data: bytes) -> bool:
+        """
+        Queues serialized messages for the peer without waiting
+
+        If the queue of the peer is full, the messages are dropped or the connection is aborted, depending on the
+        configured send queue policy.
+
+        Returns:
+            False, if the queue of the peer is full and the messages were not queued
+        """
+        return self._put_nowait(binary.line_payloads(data) if self._binary else data)
+
+    def _put_nowait(self, data: bytes | list[bytes]) -> bool:
+        try:
+            self._send_queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self._queue_full(data)
+            return False
+        return True
+
+    def _queue_full(self, data: bytes | list[bytes]) -> None:
+        if config.SEND_QUEUE_POLICY == "disconnect":
+            logging.warning(f"Send queue of {self.peer_name} is full, disconnecting")
+            self.abort()
+        else:
+            logging.warning(f"Send queue of {self.peer_name} is full, dropping {data!r}")
+
+    async def _send_loop(self) -> None:
+        try:
+            while True:
+                # Coalesce everything queued meanwhile into one write and one drain
+                batch = [await self._send_queue.get()]
+                while not self._send_queue.empty():
+                    batch.append(self._send_queue.get_nowait())
+                logging.debug(f"Sending {batch!r} to {self.peer_name}")
+                self._writer.writelines([data if isinstance(data, bytes) else self._frame(data) for data in batch])
+                await self._writer.drain()
+                for _ in batch:
+                    self._send_queue.task_done()
+        except ConnectionError as e:
+            logging.debug(e)
+
+    def announce(self, line: bytes, payload: bytes) -> None:
+        """
+        Batches an announcement for the peer
+
+        The announcement is serialized once by the caller and shared by all peers; only the batching into one write
+        happens per peer.
+
+        Args:
+            line: The announcement as a line of canonical JSON
+            payload: The announcement as a binary payload
+        """
+        self._announcements.append(payload if self._binary else line)
+        if self._announcement_timer is None:
+            self._announcement_timer = asyncio.get_running_loop().call_later(
+                config.ANNOUNCE_INTERVAL, self.flush_announcements)
+
+    def flush_announcements(self) -> None:
+        if self._announcement_timer:
+            self._announcement_timer.cancel()
+            self._announcement_timer = None
+        if not self._announcements:
+            return
+        data = list(self._announcements) if self._binary else b"".join(self._announcements)
+        self._announcements.clear()
+        self._put_nowait(data)
 
     async def write_error(self, error: str) -> None:
         await self.write_message({
@@ -50,32 +227,65 @@ class Connection:
         })
 
     async def read_message(self) -> dict:
-        data = await self._reader.readuntil()
+        is_binary, data = await self._reader.read_message()
         logging.debug(f"Received {data!r} from {self.peer_name}")
+        if is_binary:
+            if self._decompressor:
+                data = self._decompressor.decompress(data)
+            return binary.decode_message(data)
         return json.loads(data)
 
 
 class Node:
-    def __init__(self, listen_addr: str, storage_path: str, timeout: float = 300) -> None:
+    def __init__(self, listen_addr: str, storage_path: str, timeout: float = 300, objs: objects.Objects | None = None,
+                 reuse_port: bool = False, known_peers: peers.Peers | None = None,
+                 ban_manager: bans.BanManager | None = None) -> None:
         self._server = None
         self._listen_addr: str = listen_addr
-        self._peers: peers.Peers = peers.Peers(storage_path)
+        self._reuse_port: bool = reuse_port
+        self._peers: peers.Peers = known_peers if known_peers is not None else peers.Peers(storage_path)
+        self._bans: bans.BanManager = ban_manager if ban_manager is not None else bans.BanManager(
+            storage_path, config.BAN_THRESHOLD, config.BAN_DURATION, config.BAN_EXEMPT)
         self._connections: set[Connection] = set()
-        self._client_conn_sem: asyncio.Semaphore = asyncio.Semaphore(
-            config.CLIENT_CONNECTIONS)
         self._background_tasks: set = set()
-        self._objs: objects.Objects = objects.Objects(storage_path)
+        self._processing: limits.ConcurrencyLimit = limits.ConcurrencyLimit(
+            config.PROCESSING_WORKERS, config.CONNECTION_WORKERS)
+        # Keeps messages of the same class in the order they were received
+        self._message_sequence = itertools.count()
+        self._metrics: metrics.Metrics = metrics.Metrics()
+        self._objs: objects.Objects = objs if objs is not None else objects.Objects(storage_path)
         self._timeout = timeout
         self._mempool = mempool.Mempool(self._objs)
         self._mempool.init()
+        self._executor: Executor
+        if config.VALIDATION_PROCESSES > 0:
+            # Worker processes are spawned, as forking would copy the event loop and the open database
+            self._executor = ProcessPoolExecutor(config.VALIDATION_PROCESSES,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(config.VALIDATION_WORKERS)
+        self._orphans: orphans.OrphanPool = orphans.OrphanPool(config.ORPHAN_BLOCKS, config.ORPHAN_BYTES)
+        self._rejected: inventory.RejectedObjects = inventory.RejectedObjects(config.REJECTED_OBJECTS)
+        self._sync: sync.ChainSync = sync.ChainSync(self.request_object, config.SYNC_WINDOW, timeout)
+        self._inflight: inflight.InflightRequests = inflight.InflightRequests(
+            self._objs, self._connections, config.GETOBJECT_FANOUT, config.GETOBJECT_RETRY_TIMEOUT, timeout,
+            lambda conns: self._peers.scores([conn.peer_name for conn in conns]),
+            lambda conns: self._peers.record_timeouts([conn.peer_name for conn in conns]))
+        self._outbound: outbound.OutboundConnections = outbound.OutboundConnections(
+            self.connect, self._outbound_candidates, self._peer_slowness, self._disconnect_peer,
+            config.CLIENT_CONNECTIONS, self._metrics, config.OUTBOUND_INTERVAL, config.RECONNECT_MIN_BACKOFF,
+            config.RECONNECT_MAX_BACKOFF, config.STABLE_CONNECTION, config.ROTATE_INTERVAL)
 
     async def start_server(self):
-        self._server = await asyncio.start_server(self.handle_connection, *self._listen_addr.rsplit(":", 1),
-                                                  limit=config.BUFFER_SIZE)
+        self._server = await framing.start_server(self.handle_connection, *self._listen_addr.rsplit(":", 1),
+                                                  config.MAX_MESSAGE_SIZE, config.BUFFER_SIZE, self._reuse_port,
+                                                  config.EXTENSIONS)
 
         addrs = ", ".join(str(sock.getsockname())
                           for sock in self._server.sockets)
         logging.info(f"Serving on {addrs}")
+        self._run_in_background(self.persist_peers())
+        self._run_in_background(self.report_metrics())
 
     async def serve(self) -> None:
         try:
@@ -90,137 +300,281 @@ class Node:
             self._server.close()
         for background_task in self._background_tasks:
             background_task.cancel()
-        await asyncio.gather(*self._background_tasks)
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for orphan in self._orphans.clear():
+            orphan.timer.cancel()
+        self._sync.clear()
+        self._inflight.clear()
+        # Keep the peers and their statistics for the next start
+        await self.flush_peers()
+        await self.flush_bans()
+
+    async def persist_peers(self) -> None:
+        while True:
+            await asyncio.sleep(config.PEERS_FLUSH_INTERVAL)
+            await self.flush_peers()
+            await self.flush_bans()
+
+    async def report_metrics(self) -> None:
+        # Every worker of a multi-process node reports its own metrics, named by its process
+        while True:
+            await asyncio.sleep(config.METRICS_INTERVAL)
+            logging.info(f"Metrics of {multiprocessing.current_process().name}: "
+                         f"{json.dumps(self._metrics.snapshot(), sort_keys=True)}")
+
+    async def flush_peers(self) -> None:
+        started = time.monotonic()
+        try:
+            if await self._peers.flush():
+                self._metrics.observe("peers_flush_seconds", time.monotonic() - started)
+        except OSError as e:
+            logging.error(f"Unable to write the peers: {e}")
 
-    def peer_discovery(self) -> None:
-        for peer in self._peers:
-            task = asyncio.create_task(self.connect(peer))
-            self._background_tasks.add(task)
-            task.add_done_callback(self._background_tasks.discard)
+    async def flush_bans(self) -> None:
+        try:
+            await self._bans.flush()
+        except OSError as e:
+            logging.error(f"Unable to write the bans: {e}")
+
+    def misbehaved(self, conn: Connection, weight: int, reason: str) -> None:
+        if not self._bans.misbehaved(conn.host, weight):
+            return
+        logging.warning(f"Banning {conn.host} for {config.BAN_DURATION} seconds: {reason}")
+        self._metrics.inc("peers_banned")
+        for connection in self._connections:
+            if connection.host == conn.host and connection is not conn:
+                connection.abort()
+        # The offending connection is closed once the error message is sent
+        self._run_in_background(conn.close())
 
-    def broadcast(self, message: dict) -> None:
+    def peer_discovery(self) -> None:
+        self._run_in_background(self._outbound.run())
+
+    def _outbound_candidates(self) -> Iterator[str]:
+        connected = {conn.peer_name for conn in self._connections}
+        # Lazily, the bans may be looked up in the storage process
+        return (peer for peer in self._peers.ranked()
+                if peer not in connected and not self._bans.is_banned(peer.rsplit(":", 1)[0]))
+
+    def _connection_to(self, peer: str) -> Connection | None:
+        return next((conn for conn in self._connections if conn.peer_name == peer and not conn.incoming), None)
+
+    def _peer_slowness(self, peer: str) -> float:
+        # Messages the peer did not read yet and objects it did not send yet
+        conn = self._connection_to(peer)
+        return conn.send_backlog + self._inflight.load(conn) if conn else 0
+
+    def _disconnect_peer(self, peer: str) -> None:
+        conn = self._connection_to(peer)
+        if conn:
+            conn.abort()
+
+    @property
+    def metrics(self) -> metrics.Metrics:
+        return self._metrics
+
+    def announce(self, object_id: str, origin: Connection | None = None) -> None:
+        message = {"type": "ihaveobject", "objectid": object_id}
+        line, payload = canonicalize(message) + b"\n", binary.message_payload(message)
         for connection in self._connections:
-            task = asyncio.create_task(connection.write_message(message))
-            self._background_tasks.add(task)
-            task.add_done_callback(self._background_tasks.discard)
-
-    async def connect(self, peer: str) -> None:
-        async with self._client_conn_sem:
-            if peer in {c.peer_name for c in self._connections}:
-                logging.info(f"Already connected to {peer}")
-                return
-            try:
-                logging.info(f"Connecting to {peer}")
-                reader, writer = await asyncio.open_connection(*peer.rsplit(":", 1), limit=config.BUFFER_SIZE)
-            except OSError as e:
-                logging.error(f"Failed connecting to {peer}: {e}")
-                return
-            await self.handle_connection(reader, writer, False)
+            # The sender is told about the object regardless, as an acknowledgement that it was valid
+            if object_id in connection.known_objects and not (connection is origin and config.ANNOUNCE_TO_SENDER):
+                self._metrics.inc("announcements_suppressed")
+                continue
+            connection.known_objects.add(object_id)
+            self._metrics.inc("announcements_sent")
+            connection.announce(line, payload)
+
+    def handle_stored(self, object_id: str) -> None:
+        """Takes over an object that another worker of a multi-process node received and stored"""
+        self._sync.received(object_id)
+        obj = self._objs.get(object_id)
+        if obj["type"] == "transaction":
+            if "height" not in obj:
+                self._mempool.add_tx(object_id)
+        elif self._objs.chaintip() == object_id:
+            self._mempool.handle_chaintip_change()
+        self.announce(object_id)
+        if obj["type"] == "block":
+            self.connect_orphans(object_id)
+
+    def _run_in_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def connect(self, peer: str) -> bool:
+        """
+        Connects to a peer and handles the connection until it is closed
+
+        Returns:
+            False, if no connection could be established
+        """
+        if peer in {c.peer_name for c in self._connections}:
+            logging.info(f"Already connected to {peer}")
+            return False
+        try:
+            logging.info(f"Connecting to {peer}")
+            reader, writer = await asyncio.wait_for(framing.open_connection(
+                *peer.rsplit(":", 1), config.MAX_MESSAGE_SIZE, config.BUFFER_SIZE, config.EXTENSIONS),
+                config.CONNECT_TIMEOUT)
+        except OSError as e:
+            logging.error(f"Failed connecting to {peer}: {e}")
+            return False
+        except asyncio.TimeoutError:
+            logging.error(f"Failed connecting to {peer}: No connection within {config.CONNECT_TIMEOUT} seconds")
+            return False
+        await self.handle_connection(reader, writer, False)
+        return True
 
-    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+    async def handle_connection(self, reader: framing.LineFramer, writer: asyncio.StreamWriter,
                                 incoming=True) -> None:
-        conn = Connection(reader, writer, incoming)
+        host = writer.get_extra_info("peername")[0]
+        if self._bans.is_banned(host):
+            # Rejected before any state is set up for the connection
+            logging.info(f"Rejecting connection {'from' if incoming else 'to'} banned host {host}")
+            self._metrics.inc("connections_rejected")
+            writer.transport.abort()
+            return
+        conn = Connection(reader, writer, incoming, self._processing)
         try:
             async with asyncio.TaskGroup() as tg:
+                dispatcher = None
                 try:
-                    await conn.write_message(messages.HELLO)
-                    await conn.write_message(messages.GET_PEERS)
-                    await conn.write_message(messages.GET_CHAINTIP)
-                    await conn.write_message(messages.GET_MEMPOOL)
+                    started = time.monotonic()
+                    # The requests are pipelined with the hello message, the peer handles them after the handshake
+                    await conn.write_messages(
+                        [messages.HELLO, messages.GET_PEERS, messages.GET_CHAINTIP, messages.GET_MEMPOOL])
                     # Handshake
-                    message = await conn.read_message()
-                    validate(message, schemas.HELLO)
+                    try:
+                        async with asyncio.timeout(config.HANDSHAKE_TIMEOUT):
+                            message = await conn.read_message()
+                    except TimeoutError:
+                        logging.error(f"Did not receive 'hello' from {conn.peer_name} in time")
+                        await conn.write_error(
+                            f"Did not receive a 'hello' message within {config.HANDSHAKE_TIMEOUT} seconds")
+                        return
+                    schemas.validate(message, schemas.HELLO)
                     if message["type"] != "hello":
                         await conn.write_error(f"Received message {message} prior to 'hello'")
                         return
+                    if not incoming:
+                        # An incoming peer may have sent its hello before it received ours
+                        self._peers.record_rtt(conn.peer_name, time.monotonic() - started)
+                        self._peers.mark_tried(conn.peer_name)
+                    extensions = set(config.EXTENSIONS) & set(message.get("extensions", []))
+                    if binary.EXTENSION in extensions:
+                        # Compression applies to binary frames only
+                        await conn.switch_to_binary(self._metrics if compression.EXTENSION in extensions else None)
                     self._connections.add(conn)
                     logging.info(f"Completed handshake with {conn.peer_name}")
+                    dispatcher = tg.create_task(self.process_messages(conn, tg))
                     # Request-response loop
                     while True:
                         message = await conn.read_message()
-                        validate(message, schemas.MESSAGE)
+                        # Junk blocks are rejected for the cost of one hash, before any validation or lookup
+                        self.precheck_block(message)
+                        schemas.validate(message, schemas.MESSAGE)
                         logging.info(f"Received message {message} from {conn.peer_name}")
-                        tg.create_task(self.handle_message(message, conn))
+                        rate_limit = conn.rate_limits.get(message["type"])
+                        delay = rate_limit.take() if rate_limit else 0
+                        if delay:
+                            self._metrics.inc("rate_limited")
+                            await asyncio.sleep(delay)
+                        self._metrics.observe("inbound_queue_depth", conn.inbound.qsize(), metrics.DEPTH_BUCKETS)
+                        if conn.inbound.full():
+                            self._metrics.inc("inbound_queue_full")
+                        await conn.inbound.put(
+                            (scheduler.classify(message), next(self._message_sequence), time.monotonic(), message))
                 except (EOFError, ConnectionError) as e:
                     logging.debug(e)
+                except framing.MessageTooLarge as e:
+                    logging.error(f"Unable to read message from {conn.peer_name}: {e}")
+                    await conn.write_error(str(e))
                 except ValueError as e:  # JSONDecodeError, UnicodeDecodeError
                     logging.error(
                         f"Unable to parse message from {conn.peer_name}: {e}")
                     await conn.write_error("Failed to parse incoming message as JSON")
+                    self.misbehaved(conn, config.MISBEHAVIOUR_MALFORMED_MESSAGE, str(e))
+                except ProtocolError as e:
+                    logging.error(f"Rejected block from {conn.peer_name}: {e}")
+                    await conn.write_error(str(e))
+                    self.misbehaved(conn, config.MISBEHAVIOUR_INVALID_OBJECT, str(e))
                 except ValidationError as e:
                     logging.error(
                         f"Unable to validate message from {conn.peer_name}: {e}")
                     await conn.write_error(f"Failed to validate incoming message: {e.message}")
+                    self.misbehaved(conn, config.MISBEHAVIOUR_MALFORMED_MESSAGE, e.message)
+                # Handle the messages received so far before closing the connection
+                await conn.inbound.join()
+                if dispatcher:
+                    dispatcher.cancel()
         except* TaskError:
             pass
         finally:
             await conn.close()
             self._connections.discard(conn)
 
+    async def process_messages(self, conn: Connection, tg: asyncio.TaskGroup) -> None:
+        """Handles each received message in a task of its own, as long as the peer has handlers left"""
+        while True:
+            await conn.handlers.acquire()
+            message_class, _, received, message = await conn.inbound.get()
+            tg.create_task(self.process_message(conn, message_class, received, message))
+
+    async def process_message(self, conn: Connection, message_class: scheduler.MessageClass, received: float,
+                              message: dict) -> None:
+        try:
+            # Free slots go to the most important messages, shared fairly between the peers. Handlers waiting for
+            # objects give up their slot, so the peer can still send the objects.
+            async with self._processing.slot(message_class, conn):
+                self._metrics.set("messages_processing", self._processing.in_use)
+                await self.handle_message(message, conn)
+        finally:
+            conn.handlers.release()
+            conn.inbound.task_done()
+            self._metrics.set("messages_processing", self._processing.in_use)
+            self._metrics.observe(f"message_latency_{message_class.name.lower()}", time.monotonic() - received)
+
     async def handle_message(self, message: dict, conn: Connection):
         try:
             match message["type"]:
                 case "getpeers":
                     await conn.write_message({
                         "type": "peers",
-                        "peers": [peer for peer in self._peers]
+                        "peers": self._peers.sample(config.PEERS_REPLY_SIZE)
                     })
                 case "peers":
+                    # Written to the file by the periodic flush
                     self._peers.add_all(message["peers"])
-                    self._peers.dump()
                 case "object":
-                    obj = message["object"]
-                    object_id = objects.Objects.id(obj)
-                    if object_id not in self._objs:
-                        if obj["type"] == "transaction":
-                            try:
-                                self.validate_transaction(obj)
-                            except transaction_validation.InvalidTransaction as e:
-                                await conn.write_error(str(e))
-                                return
-                            self._objs.put_object(obj)
-                            if "height" not in obj:
-                                self._mempool.add_tx(self._objs.id(obj))
-                        elif obj["type"] == "block":
-                            utxo_set = await self.validate_block(obj)
-
-                            if obj["previd"]:
-                                height = self._objs.height(obj["previd"]) + 1
-                            else:
-                                height = 0
-
-                            new_chaintip = False
-                            current_chaintip_id = self._objs.chaintip()
-
-                            if not current_chaintip_id or self._objs.height(current_chaintip_id) < height:
-                                new_chaintip = True
-
-                            self._objs.put_block(obj, utxo_set, height, new_chaintip)
-
-                            if new_chaintip:
-                                self._mempool.handle_chaintip_change()
-                        logging.info(
-                            f"Saved object: {obj} with object ID: {object_id}")
-                        self.broadcast({
-                            "type": "ihaveobject",
-                            "objectid": object_id
-                        })
-                    else:
-                        logging.info(
-                            f"Object: {obj} ignored, already in the database")
+                    try:
+                        await self.handle_object(message["object"], conn)
+                    except ProtocolError as e:
+                        # An object that could not be validated yet is no misbehaviour of the peer
+                        if not isinstance(e, TransientError):
+                            self._peers.record_invalid(conn.peer_name)
+                        raise
                 case "ihaveobject":
                     object_id = message["objectid"]
-                    if object_id in self._objs:
+                    if object_id in conn.known_objects:
+                        # Either announced by us or already requested from the peer
+                        self._metrics.inc("announcements_ignored")
+                        return
+                    conn.known_objects.add(object_id)
+                    if object_id in self._rejected:
+                        self._metrics.inc("rejected_objects_ignored")
+                        logging.info(f"Object with object ID: {object_id} was rejected before")
+                    elif object_id in self._objs or object_id in self._orphans:
                         logging.info(
                             f"Object with object ID: {object_id} is already in the database")
                     else:
-                        await conn.write_message({
-                            "type": "getobject",
-                            "objectid": object_id
-                        })
+                        self.request_object(object_id, conn)
                 case "getobject":
                     object_id = message["objectid"]
                     if object_id in self._objs:
+                        conn.known_objects.add(object_id)
                         await conn.write_message({
                             "type": "object",
                             "object": self._objs.get(object_id)
@@ -239,14 +593,15 @@ class Node:
                         logging.info("Received a 'getchaintip' message, even though no blocks have been stored yet")
                 case "chaintip":
                     block_id = message["blockid"]
-                    if block_id in self._objs:
+                    conn.known_objects.add(block_id)
+                    if block_id in self._rejected:
+                        self._metrics.inc("rejected_objects_ignored")
+                        logging.info(f"Chaintip block with ID: {block_id} was rejected before")
+                    elif block_id in self._objs or block_id in self._orphans:
                         logging.info(
                             f"Chaintip block with ID: {block_id} is already in the database")
                     else:
-                        await conn.write_message({
-                            "type": "getobject",
-                            "objectid": block_id
-                        })
+                        self.request_object(block_id, conn)
                 case "getmempool":
                     logging.info("Received a 'getmempool' message, even though no txids been in the mempool yet")
                     txs_in_mempool = self._mempool.get_pending()
@@ -262,6 +617,8 @@ class Node:
                         })
                 case "mempool":
                     txids = message["txids"]
+                    for txid in txids:
+                        conn.known_objects.add(txid)
                     if len(txids) > 0:
                         await self.get_objects(txids)
                 case "hello":
@@ -271,100 +628,239 @@ class Node:
             logging.error(
                 f"Unable to handle message from {conn.peer_name}: {e}")
             await conn.write_error(str(e))
+            if not isinstance(e, TransientError):
+                self.misbehaved(conn, config.MISBEHAVIOUR_INVALID_OBJECT, str(e))
             raise TaskError
 
+    async def handle_object(self, obj: dict, conn: Connection) -> None:
+        object_id = objects.Objects.id(obj)
+        conn.known_objects.add(object_id)
+        response_time = self._inflight.response_time(object_id, conn)
+        if response_time is not None:
+            self._peers.record_response(conn.peer_name, response_time, len(canonicalize(obj)))
+        self._sync.received(object_id)
+        if object_id in self._objs or object_id in self._orphans:
+            logging.info(
+                f"Object: {obj} ignored, already in the database")
+            return
+        rejection = self._rejected.get(object_id)
+        if rejection:
+            # Rejected again without validating it again
+            self._metrics.inc("rejected_objects_ignored")
+            self._inflight.received(object_id)
+            if rejection.reason is inventory.RejectReason.TRANSACTION:
+                await self.reject_transaction(conn, rejection.error)
+                return
+            raise ProtocolError(rejection.error)
+        if obj["type"] == "transaction":
+            try:
+                self.validate_transaction(obj)
+            except transaction_validation.MissingTransaction as e:
+                # Not asked from other peers meanwhile, it is requested again once it is needed
+                self._inflight.received(object_id)
+                await conn.write_error(str(e))
+                return
+            except transaction_validation.InvalidTransaction as e:
+                self._rejected.add(object_id, inventory.RejectReason.TRANSACTION, str(e))
+                self._inflight.received(object_id)
+                await self.reject_transaction(conn, str(e))
+                return
+            self._objs.put_object(obj)
+            if "height" not in obj:
+                self._mempool.add_tx(object_id)
+        elif obj["type"] == "block":
+            if obj["previd"] in self._rejected:
+                self.reject_block(object_id, inventory.RejectReason.ANCESTRY, "Received block whose parent is invalid")
+            if obj["previd"] and obj["previd"] not in self._objs:
+                self.add_orphan(object_id, obj, conn)
+                return
+            try:
+                utxo_set = await self.validate_block(obj)
+            except TransientError:
+                raise
+            except ProtocolError as e:
+                self.reject_block(object_id, inventory.RejectReason.BLOCK, str(e))
+
+            if obj["previd"]:
+                height = self._objs.height(obj["previd"]) + 1
+            else:
+                height = 0
+
+            # The chaintip is checked and replaced by the database, other workers may store blocks meanwhile
+            if self._objs.put_block(obj, utxo_set, height):
+                self._mempool.handle_chaintip_change()
+        logging.info(
+            f"Saved object: {obj} with object ID: {object_id}")
+        self.announce(object_id, conn)
+        if obj["type"] == "block":
+            self.connect_orphans(object_id)
+
+    async def reject_transaction(self, conn: Connection, error: str) -> None:
+        self._peers.record_invalid(conn.peer_name)
+        await conn.write_error(error)
+        self.misbehaved(conn, config.MISBEHAVIOUR_INVALID_OBJECT, error)
+
+    def reject_block(self, block_id: str, reason: inventory.RejectReason, error: str) -> NoReturn:
+        """
+        Remembers that a block is invalid, together with the orphans extending it
+
+        Raises:
+            ProtocolError: Always, with the error
+        """
+        self._rejected.add(block_id, reason, error)
+        self._inflight.received(block_id)
+        parents = [block_id]
+        while parents:
+            for orphan in self._orphans.pop_children(parents.pop()):
+                orphan.timer.cancel()
+                self._rejected.add(orphan.block_id, inventory.RejectReason.ANCESTRY,
+                                   "Received block whose parent is invalid")
+                self._run_in_background(self._write_error(orphan.origin, "Received block whose parent is invalid"))
+                parents.append(orphan.block_id)
+        raise ProtocolError(error)
+
+    def add_orphan(self, block_id: str, block: dict, conn: Connection) -> None:
+        # Only keep blocks which are worth their space in the pool
+        self.validate_proof_of_work(block, block_id)
+        timer = asyncio.get_running_loop().call_later(self._timeout, self.expire_orphan, block_id)
+        for evicted in self._orphans.add(orphans.Orphan(block_id, block, conn, timer)):
+            evicted.timer.cancel()
+        self._inflight.received(block_id)
+        logging.info(f"Block with ID: {block_id} is an orphan, waiting for its parent")
+        # Fetch the ancestors and the transactions of the orphan ahead of its connection
+        if block["previd"] not in self._orphans:
+            self._sync.want_parent(block["previd"])
+        self._sync.want_transactions(txid for txid in block["txids"] if txid not in self._objs)
+
+    def expire_orphan(self, block_id: str) -> None:
+        orphan = self._orphans.remove(block_id)
+        if orphan:
+            logging.error(f"Parent of orphan block with ID: {block_id} could not be received")
+            self._run_in_background(self._write_error(
+                orphan.origin, "Received block which parent(-s) could not be received"))
+
+    def connect_orphans(self, parent_id: str) -> None:
+        for orphan in self._orphans.pop_children(parent_id):
+            orphan.timer.cancel()
+            self._run_in_background(self.connect_orphan(orphan))
+
+    async def connect_orphan(self, orphan: orphans.Orphan) -> None:
+        try:
+            await self.handle_object(orphan.block, orphan.origin)
+        except ProtocolError as e:
+            logging.error(
+                f"Unable to connect orphan block from {orphan.origin.peer_name}: {e}")
+            if not isinstance(e, TransientError):
+                self.misbehaved(orphan.origin, config.MISBEHAVIOUR_INVALID_OBJECT, str(e))
+            await self._write_error(orphan.origin, str(e))
+
+    @staticmethod
+    async def _write_error(conn: Connection, error: str) -> None:
+        try:
+            await conn.write_error(error)
+        except ConnectionError as e:
+            logging.debug(e)
+
     def validate_transaction(self, transaction: dict) -> transaction_validation.TransactionMetadata:
         return transaction_validation.validate_transaction(
             transaction, self._objs)
 
+    def request_object(self, object_id: str, hint: Connection | None = None) -> None:
+        self._inflight.request(object_id, hint)
+
     async def resolve_object(self, object_id: str):
-        event = self._objs.event_for(object_id)
-        self.broadcast({
-            "type": "getobject",
-            "objectid": object_id
-        })
-        await asyncio.wait_for(event.wait(), self._timeout)
+        await self._inflight.fetch(object_id)
 
     async def get_object(self, object_id: str):
         if object_id in self._objs:
             return self._objs.get(object_id)
-        await self.resolve_object(object_id)
+        async with self._processing.suspended():
+            await self.resolve_object(object_id)
         return self._objs.get(object_id)
 
     async def get_objects(self, object_ids: list[str]) -> list[dict]:
         unknown_objs = [obj_id for obj_id in object_ids if obj_id not in self._objs]
-        await asyncio.gather(*[self.resolve_object(obj_id) for obj_id in unknown_objs])
+        if unknown_objs:
+            async with self._processing.suspended():
+                await asyncio.gather(*[self.resolve_object(obj_id) for obj_id in unknown_objs])
         return [self._objs.get(obj_id) for obj_id in object_ids]
 
+    def precheck_block(self, message) -> None:
+        """
+        Checks the target and the proof-of-work of a block in a message that is not validated yet
+
+        Raises:
+            ValidationError: The message contains a block with an invalid proof-of-work and an invalid header
+            ProtocolError: The message contains a block with an invalid target or proof-of-work
+        """
+        if not isinstance(message, dict) or message.get("type") != "object":
+            return
+        block = message.get("object")
+        if not isinstance(block, dict) or block.get("type") != "block":
+            return
+        block_id = objects.Objects.id(block)
+        try:
+            if block.get("T") != config.TARGET:
+                raise ProtocolError("Received block with invalid target")
+            self.validate_proof_of_work(block, block_id)
+        except ProtocolError as e:
+            self._metrics.inc("blocks_rejected_early")
+            self._rejected.add(block_id, inventory.RejectReason.PROOF_OF_WORK, str(e))
+            # Malformed headers are still reported as such, the txid list is not looked at
+            schemas.validate(block, schemas.BLOCK_HEADER)
+            raise
+
+    @staticmethod
+    def validate_proof_of_work(block: dict, block_id: str) -> None:
+        try:
+            block_validation.check_proof_of_work(block, block_id)
+        except block_validation.InvalidBlock as e:
+            raise ProtocolError(str(e))
+
     async def validate_block(self, block: dict) -> dict:
-        # Ensure the target is the one required
-        if block["T"] != config.TARGET:
-            raise ProtocolError("Received block with invalid target")
-        # Check the proof-of-work
         block_id = objects.Objects.id(block)
-        if int(block_id, base=16) >= int(block['T'], base=16):
-            raise ProtocolError(
-                "Received block does not satisfy the proof-of-work equation")
+        self.validate_proof_of_work(block, block_id)
         # Check that for all the txids in the block, you have the corresponding transaction in your
         # local object database. If not, then send a "getobject" message to your peers in order
         # to get the transaction.
         try:
             txs = await self.get_objects(block["txids"])
         except asyncio.TimeoutError:
-            raise ProtocolError("Received block contains transactions that could not be received")
-        # Request your peers for the parent block
-        if block["previd"]:
-            if block["previd"] not in self._objs:
-                try:
-                    await self.resolve_object(block["previd"])
-                except asyncio.TimeoutError:
-                    raise ProtocolError("Received block which parent(-s) could not be received")
-            # Check that the timestamp of each block (the created field) is later than that of its parent,...
-            if self._objs.get(block["previd"])["created"] > block["created"]:
-                raise ProtocolError("Received block with timestamp not later than of its parent")
-        else:
-            if block_id != objects.Objects.id(config.GENESIS):
-                raise ProtocolError("Received block which stops at a different genesis")
+            raise UnavailableError("Received block contains transactions that could not be received")
+        # The parent block is requested from your peers while the block waits in the orphan pool
+        if block["previd"] and block["previd"] not in self._objs:
+            raise UnavailableError("Received block which parent(-s) could not be received")
+        try:
+            block_validation.check_ancestry(block, block_id, self._objs.get(block["previd"]) if block["previd"] else None)
+        except block_validation.InvalidBlock as e:
+            raise ProtocolError(str(e))
         # ... and earlier than the current time.
         if block["created"] > time.time():
-            raise ProtocolError("Received block with timestamp in the future")
+            raise TransientError("Received block with timestamp in the future")
         # For each transaction in the block, check that the transaction is valid, and update UTXO set based on the
-        # transaction
-        not_coinbase_txs = [tx for tx in txs if "inputs" in tx]
-        fees = 0
-        for tx in not_coinbase_txs:
-            metadata = self.validate_transaction(tx)
-            fees += metadata.total_input_value - metadata.total_output_value
+        # transaction. In large blocks, transactions not spending from each other are validated concurrently off the
+        # event loop, small blocks are not worth the hand-off.
+        not_coinbase_txs = {txid: tx for txid, tx in zip(block["txids"], txs) if "inputs" in tx}
+        try:
+            if len(not_coinbase_txs) >= config.PARALLEL_VALIDATION_TXS:
+                metadata = await asyncio.to_thread(
+                    transaction_validation.validate_transactions, not_coinbase_txs, self._objs, self._executor)
+            else:
+                metadata = transaction_validation.validate_transactions(not_coinbase_txs, self._objs)
+        except transaction_validation.MissingTransaction as e:
+            raise UnavailableError(str(e))
+        except transaction_validation.InvalidTransaction as e:
+            raise ProtocolError(str(e))
         # Create new utxo set and check for problems while creation
         try:
-            utxo_set = utxo.create_utxo_set(block, self._objs)
+            utxo_set = utxo.create_utxo_set(block, self._objs, {txid: m.utxo_delta for txid, m in metadata.items()})
         except utxo.UtxoError as e:
             logging.warning("UTXO check was not successful")
             raise ProtocolError(
                 str(e))
-        # Check for coinbase transactions, there can be at most one coinbase transaction in a block
-        coinbase_txs = [tx for tx in txs if "inputs" not in tx]
-        if len(coinbase_txs) > 1:
-            raise ProtocolError(
-                "Received block contains more than one coinbase transaction")
-        if len(coinbase_txs) == 1:
-            coinbase_txid = objects.Objects.id(coinbase_txs[0])
-            if block["txids"][0] != coinbase_txid:
-                raise ProtocolError(
-                    "Received block with coinbase transaction not at index 0")
-            # Check the coinbase transaction cannot be spent in another transaction in the same block (this is in order
-            # to make the law of conservation for the coinbase transaction easier to verify).
-            for tx in not_coinbase_txs:
-                for inpt in tx["inputs"]:
-                    txid = inpt["outpoint"]["txid"]
-                    if txid == coinbase_txid:
-                        raise ProtocolError("Received block with coinbase transaction spend in another transaction")
-            # Check that the height in the coinbase transaction matches the height of the block the transaction is
-            # contained in.
-            if coinbase_txs[0]["height"] != self._objs.height(block["previd"]) + 1:
-                raise ProtocolError("Received block with coinbase transaction height does not match block height")
-            # Check the coinbase transaction has no outputs that exceed the block rewards and the fees.
-            outputs = sum(output["value"] for output in coinbase_txs[0]["outputs"])
-            if outputs > config.BLOCK_REWARD + fees:
-                raise ProtocolError("Received block with coinbase transaction that exceed block rewards and the fees")
+        try:
+            block_validation.check_coinbase(
+                block, txs, metadata, self._objs.height(block["previd"]) + 1 if block["previd"] else 0)
+        except block_validation.InvalidBlock as e:
+            raise ProtocolError(str(e))
         return utxo_set
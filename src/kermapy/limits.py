@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter, deque
+from typing import Hashable
+
+
+class ConcurrencyLimit:
+    """
+    Limits how many tasks run a section at once, in total and per owner
+
+    Free slots go to the waiting task with the highest priority, which is the lowest number. Waiters of the same
+    priority are served round-robin by owner, e.g. the peer that sent the message, so that one owner cannot starve the
+    others. An owner holds at most owner_limit slots at once, if given. A task holding a slot gives it up while it waits
+    for the network, so that the objects it waits for can still be processed by other tasks, including those of the
+    same owner.
+    """
+
+    def __init__(self, limit: int, owner_limit: int | None = None) -> None:
+        self._free: int = limit
+        self._owner_limit: int | None = owner_limit
+        # Slots in use by owner
+        self._owners: Counter[Hashable] = Counter()
+        self._holders: dict[asyncio.Task, tuple[int, Hashable]] = {}
+        # Owners are kept in round-robin order per priority
+        self._waiters: dict[int, dict[Hashable, deque[asyncio.Future]]] = {}
+
+    @property
+    def in_use(self) -> int:
+        return len(self._holders)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = 0, owner: Hashable = None):
+        await self._acquire(priority, owner)
+        task = asyncio.current_task()
+        self._holders[task] = (priority, owner)
+        try:
+            yield
+        finally:
+            del self._holders[task]
+            self._release(owner)
+
+    @contextlib.asynccontextmanager
+    async def suspended(self):
+        """Gives up the slot of the current task for the duration of the block, if it holds one"""
+        task = asyncio.current_task()
+        if task not in self._holders:
+            yield
+            return
+        priority, owner = self._holders.pop(task)
+        self._release(owner)
+        try:
+            yield
+        finally:
+            await self._acquire(priority, owner)
+            self._holders[task] = (priority, owner)
+
+    async def _acquire(self, priority: int, owner: Hashable) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(priority, {}).setdefault(owner, deque()).append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over already, pass it on
+                self._release(owner)
+            else:
+                self._remove_waiter(priority, owner, future)
+            raise
+
+    def _release(self, owner: Hashable) -> None:
+        self._free += 1
+        self._owners[owner] -= 1
+        if not self._owners[owner]:
+            del self._owners[owner]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hands the free slots over to the next waiters whose owners are below their limit"""
+        while self._free > 0:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            future, owner = waiter
+            if future.done():
+                # Cancelled, but its task did not run yet to remove it
+                continue
+            self._free -= 1
+            self._owners[owner] += 1
+            future.set_result(None)
+
+    def _next_waiter(self) -> tuple[asyncio.Future, Hashable] | None:
+        for priority in sorted(self._waiters):
+            owners = self._waiters[priority]
+            for owner, futures in owners.items():
+                if self._owner_limit is not None and self._owners[owner] >= self._owner_limit:
+                    continue
+                future = futures.popleft()
+                del owners[owner]
+                if futures:
+                    # Move the owner to the end of the round
+                    owners[owner] = futures
+                if not owners:
+                    del self._waiters[priority]
+                return future, owner
+        return None
+
+    def _remove_waiter(self, priority: int, owner: Hashable, future: asyncio.Future) -> None:
+        owners = self._waiters.get(priority, {})
+        futures = owners.get(owner)
+        if futures is None or future not in futures:
+            return
+        futures.remove(future)
+        if not futures:
+            del owners[owner]
+        if not owners:
+            del self._waiters[priority]
+
+
+class TokenBucket:
+    """
+    Limits the rate of events to rate per second, with bursts of up to burst events
+
+    Taking a token when none is left reserves the next one, so a waiting caller is never overtaken.
+    """
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self._rate: float = rate
+        self._burst: float = burst
+        self._tokens: float = burst
+        self._updated: float = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Takes a token
+
+        Returns:
+            The seconds to wait until the token is available, 0 if it is available right away
+        """
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0 if self._tokens >= 0 else -self._tokens / self._rate
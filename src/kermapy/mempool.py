@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import List
 
+from . import config
 from . import objects
 from . import utxo
 
@@ -77,6 +78,9 @@ class Mempool:
         self._height = None
         self._objs = objs
         self._storage: MempoolTxStorage = LocalMempoolTxStorage()
+        # Transactions that did not fit onto the current chaintip, e.g. because the block they spend from is still
+        # being validated, are retried once the chaintip changes
+        self._deferred: dict[str, None] = {}
 
     def add_tx(self, tx_id: str) -> None:
         existing = self._storage.get(tx_id)
@@ -89,6 +93,18 @@ class Mempool:
             self._storage.put(tx_id, MempoolState.MEMPOOL)
         except utxo.UtxoError:
             logging.warning(f"Rejected tx with id '{tx_id}' because of utxo error when adding tx")
+            self._defer(tx_id)
+
+    def _defer(self, tx_id: str) -> None:
+        self._deferred[tx_id] = None
+        if len(self._deferred) > config.MEMPOOL_DEFERRED_TXS:
+            del self._deferred[next(iter(self._deferred))]
+
+    def _retry_deferred(self) -> None:
+        deferred = list(self._deferred)
+        self._deferred.clear()
+        for tx_id in deferred:
+            self.add_tx(tx_id)
 
     def init(self) -> None:
         try:
@@ -184,5 +200,7 @@ class Mempool:
                 except utxo.UtxoError:
                     self._storage.remove(tx_id)
 
+        self._retry_deferred()
+
     def get_pending(self) -> List[str]:
         return self._storage.get_all_with_filter(MempoolState.MEMPOOL)
@@ -1,6 +1,8 @@
-from .config import VERSION
+from .config import EXTENSIONS, VERSION
 
 HELLO = {"type": "hello", "version": "0.8.0", "agent": f"Kermapy {VERSION}"}
+if EXTENSIONS:
+    HELLO["extensions"] = EXTENSIONS
 GET_PEERS = {"type": "getpeers"}
 GET_CHAINTIP = {"type": "getchaintip"}
 GET_MEMPOOL = {"type": "getmempool"}
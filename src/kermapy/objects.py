@@ -9,18 +9,23 @@ import plyvel
 from org.webpki.json.Canonicalize import canonicalize
 from . import config
 
+_OBJECT = b'object:'
+_HEIGHT = b'height:'
+_UTXO = b'utxo:'
+_CHAINTIP = b'chaintip'
+
 
 class Objects:
     def __init__(self, storage_path: str):
         self._db: plyvel.DB = plyvel.DB(storage_path, create_if_missing=True)
-        self._objects: plyvel.PrefixedDB = self._db.prefixed_db(b'object:')
-        self._heights: plyvel.PrefixedDB = self._db.prefixed_db(b'height:')
-        self._utxos: plyvel.PrefixedDB = self._db.prefixed_db(b'utxo:')
-        self._chaintip: plyvel.PrefixedDB = self._db.prefixed_db(b'chaintip')
+        self._objects: plyvel.PrefixedDB = self._db.prefixed_db(_OBJECT)
+        self._heights: plyvel.PrefixedDB = self._db.prefixed_db(_HEIGHT)
+        self._utxos: plyvel.PrefixedDB = self._db.prefixed_db(_UTXO)
+        self._chaintip: plyvel.PrefixedDB = self._db.prefixed_db(_CHAINTIP)
         self._mempool: plyvel.PrefixedDB = self._db.prefixed_db(b'mempool')
         self._events: dict[str, WeakSet[asyncio.Event]] = defaultdict(WeakSet)
         if self.id(config.GENESIS) not in self:
-            self.put_block(config.GENESIS, {}, 0, True)
+            self.put_block(config.GENESIS, {}, 0)
 
     def close(self):
         return self._db.close()
@@ -54,19 +59,58 @@ class Objects:
         return json.loads(value)
 
     def put_object(self, obj: dict) -> None:
+        self._put_object(obj)
+
+    def _put_object(self, obj: dict) -> str:
         object_id = self.id(obj)
         for event in self._events[object_id]:
             event.set()
         del self._events[object_id]
         self._objects.put(bytes.fromhex(object_id), canonicalize(obj))
+        return object_id
+
+    def put_block(self, obj: dict, utxo_set: dict, height: int) -> bool:
+        """
+        Stores a validated block, it becomes the chaintip if it is higher than the current chaintip
 
-    def put_block(self, obj: dict, utxo_set: dict, height: int, new_chaintip: bool):
+        Returns:
+            True, if the block became the chaintip
+        """
         object_id = self.id(obj)
+        chaintip = self.chaintip()
+        new_chaintip = not chaintip or self.height(chaintip) < height
         if new_chaintip:
             self._chaintip.put(b'', bytes.fromhex(object_id))
         self._heights.put(bytes.fromhex(object_id), int.to_bytes(height, 256, 'big', signed=False))
         self._utxos.put(bytes.fromhex(object_id), canonicalize(utxo_set))
-        self.put_object(obj)
+        self._put_object(obj)
+        return new_chaintip
+
+    def put_batch(self, txs: list[dict], blocks: list[tuple[dict, dict, int]], chaintip: str | None) -> None:
+        """
+        Stores transactions and validated blocks in one atomic write
+
+        Args:
+            txs (list[dict]): The transactions
+            blocks (list[tuple[dict, dict, int]]): The blocks with their UTXO set and height
+            chaintip (str | None): The id of the new chaintip, if it changes
+        """
+        stored = []
+        with self._db.write_batch() as batch:
+            for tx in txs:
+                stored.append(self.id(tx))
+                batch.put(_OBJECT + bytes.fromhex(stored[-1]), canonicalize(tx))
+            for block, utxo_set, height in blocks:
+                stored.append(self.id(block))
+                key = bytes.fromhex(stored[-1])
+                batch.put(_HEIGHT + key, int.to_bytes(height, 256, 'big', signed=False))
+                batch.put(_UTXO + key, canonicalize(utxo_set))
+                batch.put(_OBJECT + key, canonicalize(block))
+            if chaintip:
+                batch.put(_CHAINTIP, bytes.fromhex(chaintip))
+        for object_id in stored:
+            for event in self._events.pop(object_id, ()):
+                event.set()
 
     def event_for(self, object_id: str) -> asyncio.Event:
         event = asyncio.Event()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from org.webpki.json.Canonicalize import canonicalize
+
+
+class Orphan:
+    def __init__(self, block_id: str, block: dict, origin, timer: asyncio.TimerHandle) -> None:
+        self.block_id: str = block_id
+        self.block: dict = block
+        self.origin = origin
+        self.timer: asyncio.TimerHandle = timer
+        # The size of the block as it is stored and sent
+        self.size: int = len(canonicalize(block))
+
+
+class OrphanPool:
+    """
+    Blocks whose parent is not yet known, keyed by the missing parent
+
+    The pool holds at most max_orphans blocks of at most max_bytes in total, the oldest orphans are evicted first.
+    """
+
+    def __init__(self, max_orphans: int, max_bytes: int) -> None:
+        self._max_orphans: int = max_orphans
+        self._max_bytes: int = max_bytes
+        self._bytes: int = 0
+        self._orphans: dict[str, Orphan] = {}
+        self._children: defaultdict[str, dict[str, None]] = defaultdict(dict)
+
+    def __contains__(self, block_id: str) -> bool:
+        return block_id in self._orphans
+
+    def __len__(self) -> int:
+        return len(self._orphans)
+
+    @property
+    def size(self) -> int:
+        """The size of the orphans in the pool in bytes"""
+        return self._bytes
+
+    def add(self, orphan: Orphan) -> list[Orphan]:
+        """
+        Adds an orphan to the pool
+
+        Args:
+            orphan (Orphan): The orphan that should be added
+
+        Returns:
+            The orphans that were evicted to stay within the capacity of the pool
+        """
+        self._orphans[orphan.block_id] = orphan
+        self._children[orphan.block["previd"]][orphan.block_id] = None
+        self._bytes += orphan.size
+        evicted = []
+        while len(self._orphans) > self._max_orphans or self._bytes > self._max_bytes:
+            oldest = self.remove(next(iter(self._orphans)))
+            logging.warning(f"Evicted orphan block with ID: {oldest.block_id}")
+            evicted.append(oldest)
+        return evicted
+
+    def remove(self, block_id: str) -> Orphan | None:
+        orphan = self._orphans.pop(block_id, None)
+        if orphan:
+            self._bytes -= orphan.size
+            parent_id = orphan.block["previd"]
+            self._children[parent_id].pop(block_id, None)
+            if not self._children[parent_id]:
+                del self._children[parent_id]
+        return orphan
+
+    def pop_children(self, parent_id: str) -> list[Orphan]:
+        """
+        Removes the orphans waiting for the given parent from the pool
+
+        Args:
+            parent_id (str): The id of the block that was connected
+
+        Returns:
+            The orphans that can be processed now
+        """
+        children = [self._orphans.pop(block_id) for block_id in self._children.pop(parent_id, {})]
+        self._bytes -= sum(orphan.size for orphan in children)
+        return children
+
+    def clear(self) -> list[Orphan]:
+        orphans = list(self._orphans.values())
+        self._orphans.clear()
+        self._children.clear()
+        self._bytes = 0
+        return orphans
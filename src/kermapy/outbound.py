@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable
+
+from . import metrics
+
+
+class OutboundConnections:
+    """
+    Keeps a target number of connections to known peers open
+
+    Free slots are filled with candidates that are neither connected nor backing off. A peer whose connection failed
+    or did not last long backs off exponentially before it is tried again. Every rotation interval the slowest
+    connected peer is dropped in favour of a fresh candidate, so the node does not stay stuck with slow peers.
+    """
+
+    def __init__(self, connect: Callable[[str], Awaitable[bool]], candidates: Callable[[], Iterable[str]],
+                 slowness: Callable[[str], float], disconnect: Callable[[str], None], target: int,
+                 node_metrics: metrics.Metrics, interval: float = 5, min_backoff: float = 1,
+                 max_backoff: float = 300, stable_after: float = 60, rotate_interval: float = 600) -> None:
+        """
+        Args:
+            connect (Callable[[str], Awaitable[bool]]): Runs a connection to a peer until it is closed, returns False
+                if no connection could be established
+            candidates (Callable[[], Iterable[str]]): The peers that may be connected to, most preferred first
+            slowness (Callable[[str], float]): How slow a connected peer is, the slowest peer is rotated away
+            disconnect (Callable[[str], None]): Closes the connection to a peer
+        """
+        self._connect: Callable[[str], Awaitable[bool]] = connect
+        self._candidates: Callable[[], Iterable[str]] = candidates
+        self._slowness: Callable[[str], float] = slowness
+        self._disconnect: Callable[[str], None] = disconnect
+        self._target: int = target
+        self._metrics: metrics.Metrics = node_metrics
+        self._interval: float = interval
+        self._min_backoff: float = min_backoff
+        self._max_backoff: float = max_backoff
+        self._stable_after: float = stable_after
+        self._rotate_interval: float = rotate_interval
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+        self._wake_up: asyncio.Event = asyncio.Event()
+
+    def __contains__(self, peer: str) -> bool:
+        return peer in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def backoff(self, peer: str) -> float:
+        """Returns the seconds until a peer may be tried again"""
+        return max(0.0, self._retry_at.get(peer, 0) - asyncio.get_running_loop().time())
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_rotation = loop.time() + self._rotate_interval
+        try:
+            while True:
+                if loop.time() >= next_rotation:
+                    next_rotation = loop.time() + self._rotate_interval
+                    self.rotate()
+                self.fill()
+                self._wake_up.clear()
+                try:
+                    await asyncio.wait_for(self._wake_up.wait(), self._interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tasks = list(self._tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def fill(self) -> None:
+        """Connects to candidates until the target number of connections is reached"""
+        if len(self._tasks) >= self._target:
+            return
+        for peer in self._eligible():
+            logging.info(f"Filling outbound slot {len(self._tasks) + 1}/{self._target} with {peer}")
+            self._tasks[peer] = asyncio.create_task(self._run_connection(peer))
+            if len(self._tasks) >= self._target:
+                break
+        self._metrics.set("outbound_connections", len(self._tasks))
+
+    def rotate(self) -> None:
+        """Drops the slowest connected peer, if there is a candidate to replace it"""
+        if len(self._tasks) < self._target or not any(True for _ in self._eligible()):
+            return
+        slowest = max(self._tasks, key=self._slowness)
+        logging.info(f"Rotating away from slow peer {slowest}")
+        self._metrics.inc("outbound_rotations")
+        # The peer is not reconnected right away, so the slot goes to another candidate
+        self._retry_at[slowest] = asyncio.get_running_loop().time() + self._max_backoff
+        self._disconnect(slowest)
+
+    def _eligible(self) -> Iterable[str]:
+        now = asyncio.get_running_loop().time()
+        return (peer for peer in self._candidates()
+                if peer not in self._tasks and self._retry_at.get(peer, 0) <= now)
+
+    async def _run_connection(self, peer: str) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._metrics.inc("outbound_connects")
+        try:
+            connected = await self._connect(peer)
+        except Exception as e:
+            logging.error(f"Connection to {peer} failed: {e}")
+            connected = False
+        finally:
+            del self._tasks[peer]
+            self._metrics.set("outbound_connections", len(self._tasks))
+            self._wake_up.set()
+        lifetime = loop.time() - started
+        if not connected:
+            self._metrics.inc("outbound_connect_failures")
+        else:
+            self._metrics.inc("outbound_disconnects")
+            self._metrics.observe("outbound_connection_seconds", lifetime)
+        if connected and lifetime >= self._stable_after:
+            self._failures.pop(peer, None)
+            delay = self._min_backoff
+        else:
+            failures = self._failures.get(peer, 0)
+            self._failures[peer] = failures + 1
+            delay = min(self._max_backoff, self._min_backoff * 2 ** failures)
+        # A rotated peer keeps its longer backoff
+        self._retry_at[peer] = max(self._retry_at.get(peer, 0), loop.time() + delay)
+        logging.debug(f"Retrying {peer} in {delay} seconds at the earliest")
@@ -1,53 +1,276 @@
+import asyncio
+import hashlib
 import ipaddress
 import json
 import logging
+import os
 import pathlib
-from collections import Counter
+import random
+import time
 from typing import Iterator
 
-from .config import BOOTSTRAP_NODES
+from .config import BOOTSTRAP_NODES, NEW_BUCKETS, TRIED_BUCKETS, BUCKET_SIZE, PEERS_PER_HOST
+
+# Weight of a new measurement in the moving averages of the peer statistics
+SMOOTHING = 0.3
+# Assumed response time in seconds of a peer that was not measured yet
+UNKNOWN_RESPONSE_TIME = 1.0
+# An invalid object counts as much as this many timeouts
+INVALID_PENALTY = 10
+# Addresses on the default port are not subject to the per-host limit
+DEFAULT_PORT = "18018"
+
+
+def write_atomically(path: pathlib.Path, data: bytes) -> None:
+    """Replaces a file, a crash of the process or the system leaves either the old or the new content"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path)
+    # The rename itself is only durable once the directory is synced, which is not possible on Windows
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class PeerStats:
+    """
+    Measurements of a peer, kept as moving averages and counters
+
+    The score of a peer is higher the faster it responds to requests, and lower the more requests it let time out and
+    the more invalid objects it sent.
+    """
+
+    def __init__(self, rtt: float | None = None, latency: float | None = None, throughput: float | None = None,
+                 invalid: int = 0, timeouts: int = 0, tried: bool = False, last_seen: float = 0) -> None:
+        # Seconds from sending the hello message to receiving the one of the peer
+        self.rtt: float | None = rtt
+        # Seconds from sending a 'getobject' message to receiving the object
+        self.latency: float | None = latency
+        # Bytes per second of the objects sent in response
+        self.throughput: float | None = throughput
+        self.invalid: int = invalid
+        self.timeouts: int = timeouts
+        # Whether a connection to the peer was established
+        self.tried: bool = tried
+        # Unix time the peer was last gossiped about or connected to
+        self.last_seen: float = last_seen
+
+    @staticmethod
+    def _average(current: float | None, value: float) -> float:
+        return value if current is None else (1 - SMOOTHING) * current + SMOOTHING * value
+
+    def record_rtt(self, seconds: float) -> None:
+        self.rtt = self._average(self.rtt, seconds)
+
+    def record_response(self, seconds: float, size: int) -> None:
+        self.latency = self._average(self.latency, seconds)
+        self.throughput = self._average(self.throughput, size / max(seconds, 1e-6))
+
+    @property
+    def score(self) -> float:
+        response_time = next((t for t in (self.latency, self.rtt) if t is not None), UNKNOWN_RESPONSE_TIME)
+        return 1 / (0.01 + response_time) / (1 + self.timeouts + INVALID_PENALTY * self.invalid)
+
+    def to_json(self) -> dict:
+        return {
+            "rtt": self.rtt,
+            "latency": self.latency,
+            "throughput": self.throughput,
+            "invalid": self.invalid,
+            "timeouts": self.timeouts,
+            "tried": self.tried,
+            "last_seen": self.last_seen
+        }
+
+    @classmethod
+    def from_json(cls, value: dict | str) -> 'PeerStats':
+        # Older peer files store an empty string per peer
+        return cls(**value) if isinstance(value, dict) else cls()
 
 
 class Peers:
-    def __init__(self, storage_path: str) -> None:
-        self._dict: dict[str] = {}
-        self._cntr: Counter[str] = Counter()
+    """
+    The addresses of known peers with their statistics, bounded in number
+
+    Gossiped addresses go into the new table, addresses a connection was established to are moved to the tried table.
+    Both tables consist of buckets of bounded size and an address is put into the bucket of its network group, a /16
+    for IPv4, so a single network cannot fill a table. If a bucket is full, the stalest entry is evicted: one that
+    sent invalid objects, otherwise the one seen least recently. Entries evicted from the tried table go back to the
+    new table. A gossiped address on a port other than the default port is ignored once its host has per_host
+    addresses, as all of them fall into the same buckets.
+    """
+
+    def __init__(self, storage_path: str, new_buckets: int = NEW_BUCKETS, tried_buckets: int = TRIED_BUCKETS,
+                 bucket_size: int = BUCKET_SIZE, per_host: int = PEERS_PER_HOST) -> None:
+        self._dict: dict[str, PeerStats] = {}
+        # Ordered sets of addresses by bucket
+        self._new: list[dict[str, None]] = [{} for _ in range(new_buckets)]
+        self._tried: list[dict[str, None]] = [{} for _ in range(tried_buckets)]
+        self._bucket_size: int = bucket_size
+        self._per_host: int = per_host
         self._path: pathlib.Path = pathlib.Path(storage_path, "peers.json")
+        # Whether the peers changed since they were last written to the file
+        self.dirty: bool = False
         self.load()
 
     def __iter__(self) -> Iterator[str]:
         return self._dict.__iter__()
 
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def __contains__(self, peer: str) -> bool:
+        return peer in self._dict
+
     def add(self, peer: str) -> None:
-        if peer not in self._dict:
-            host, port = peer.rsplit(":", 1)
-            try:
-                ip = ipaddress.ip_address(host)
-            except ValueError:
-                logging.warning(f"Invalid peer: {peer}")
-                return
-            if ip.is_global:
-                if port == "18018" or self._cntr[host] < 10:
-                    self._dict[peer] = ""
-                    self._cntr[host] += 1
-                else:
-                    logging.debug(f"Too many peers for same host: {peer}")
-            else:
-                logging.warning(f"Peer IP is not global: {peer}")
+        if peer in self._dict:
+            self._dict[peer].last_seen = time.time()
+            self.dirty = True
+            return
+        host, port = peer.rsplit(":", 1)
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            logging.warning(f"Invalid peer: {peer}")
+            return
+        if not ip.is_global:
+            logging.warning(f"Peer IP is not global: {peer}")
+        elif port != DEFAULT_PORT and self._host_count(peer) >= self._per_host:
+            logging.debug(f"Ignoring peer {peer}, its host has {self._per_host} addresses already")
+        else:
+            self._insert(peer, PeerStats(last_seen=time.time()))
 
     def add_all(self, peers: list[str]) -> None:
         for peer in peers:
             self.add(peer)
 
+    def mark_tried(self, peer: str) -> None:
+        """Moves a peer a connection was established to into the tried table"""
+        stats = self._dict.get(peer)
+        if stats is None:
+            return
+        stats.last_seen = time.time()
+        self.dirty = True
+        if stats.tried:
+            return
+        del self._bucket(peer, self._new)[peer]
+        bucket = self._bucket(peer, self._tried)
+        if len(bucket) >= self._bucket_size:
+            demoted = min(bucket, key=self._staleness)
+            del bucket[demoted]
+            self._dict[demoted].tried = False
+            self._insert(demoted, self._dict.pop(demoted))
+        stats.tried = True
+        bucket[peer] = None
+
+    def sample(self, k: int) -> list[str]:
+        """Returns up to k randomly chosen peers"""
+        return random.sample(list(self._dict), min(k, len(self._dict)))
+
+    def _insert(self, peer: str, stats: PeerStats) -> None:
+        bucket = self._bucket(peer, self._tried if stats.tried else self._new)
+        if len(bucket) >= self._bucket_size:
+            evicted = min(bucket, key=self._staleness)
+            logging.debug(f"Evicting peer {evicted} for {peer}")
+            del bucket[evicted]
+            del self._dict[evicted]
+        bucket[peer] = None
+        self._dict[peer] = stats
+        self.dirty = True
+
+    def _host_count(self, peer: str) -> int:
+        host = peer.rsplit(":", 1)[0]
+        return sum(1 for table in (self._new, self._tried) for known in self._bucket(peer, table)
+                   if known.rsplit(":", 1)[0] == host)
+
+    def _staleness(self, peer: str) -> tuple[bool, float]:
+        stats = self._dict[peer]
+        return stats.invalid == 0, stats.last_seen
+
+    def _bucket(self, peer: str, table: list[dict[str, None]]) -> dict[str, None]:
+        host = peer.rsplit(":", 1)[0]
+        try:
+            ip = ipaddress.ip_address(host)
+            group = ip.packed[:2] if ip.version == 4 else ip.packed[:4]
+        except ValueError:
+            group = host.encode()
+        tag = b"tried" if table is self._tried else b"new"
+        digest = hashlib.sha256(tag + group).digest()
+        return table[int.from_bytes(digest[:8], "big") % len(table)]
+
+    def score(self, peer: str) -> float:
+        stats = self._dict.get(peer)
+        return stats.score if stats else PeerStats().score
+
+    def scores(self, peers: list[str]) -> list[float]:
+        """Returns the scores of several peers, so that a worker ranks them with one call to the storage process"""
+        return [self.score(peer) for peer in peers]
+
+    def ranked(self) -> list[str]:
+        """Returns the peers, highest score first"""
+        return sorted(self._dict, key=self.score, reverse=True)
+
+    def record_rtt(self, peer: str, seconds: float) -> None:
+        if peer in self._dict:
+            self._dict[peer].record_rtt(seconds)
+            self.dirty = True
+
+    def record_response(self, peer: str, seconds: float, size: int) -> None:
+        if peer in self._dict:
+            self._dict[peer].record_response(seconds, size)
+            self.dirty = True
+
+    def record_invalid(self, peer: str) -> None:
+        if peer in self._dict:
+            self._dict[peer].invalid += 1
+            self.dirty = True
+
+    def record_timeouts(self, peers: list[str]) -> None:
+        for peer in peers:
+            if peer in self._dict:
+                self._dict[peer].timeouts += 1
+                self.dirty = True
+
     def dump(self) -> None:
-        with self._path.open("w") as fp:
-            json.dump(self._dict, fp, indent=4)
+        write_atomically(self._path, self._serialize())
+
+    async def flush(self) -> bool:
+        """
+        Writes the peers to the file in a worker thread, if they changed
+
+        Returns:
+            True, if the file was written
+        """
+        if not self.dirty:
+            return False
+        # Serialized on the event loop, so the written peers are consistent
+        data = self._serialize()
+        try:
+            await asyncio.to_thread(write_atomically, self._path, data)
+        except OSError:
+            self.dirty = True
+            raise
+        return True
+
+    def _serialize(self) -> bytes:
+        self.dirty = False
+        return json.dumps({peer: stats.to_json() for peer, stats in self._dict.items()}).encode()
 
     def load(self) -> None:
         if self._path.exists():
             with self._path.open() as fp:
-                peers = json.load(fp)
+                peers = {peer: PeerStats.from_json(value) for peer, value in json.load(fp).items()}
         else:
-            peers = {n: "" for n in BOOTSTRAP_NODES}
-        self._dict = peers
-        self._cntr = Counter([peer.rsplit(":", 1)[0] for peer in peers])
+            peers = {n: PeerStats() for n in BOOTSTRAP_NODES}
+        self._dict = {}
+        for bucket in self._new + self._tried:
+            bucket.clear()
+        for peer, stats in peers.items():
+            self._insert(peer, stats)
+        self.dirty = False
@@ -0,0 +1,39 @@
+from enum import IntEnum
+
+
+class MessageClass(IntEnum):
+    """Classes of messages in the order they are scheduled, the lowest value first"""
+    BLOCK = 0
+    TRANSACTION = 1
+    SERVING = 2
+    GOSSIP = 3
+    PEERS = 4
+
+
+_CLASSES = {
+    "getobject": MessageClass.SERVING,
+    "getchaintip": MessageClass.SERVING,
+    "getmempool": MessageClass.SERVING,
+    "ihaveobject": MessageClass.GOSSIP,
+    "chaintip": MessageClass.GOSSIP,
+    "mempool": MessageClass.GOSSIP,
+    "getpeers": MessageClass.PEERS,
+    "peers": MessageClass.PEERS,
+}
+
+
+def classify(message: dict) -> MessageClass:
+    """
+    Classifies a validated message for scheduling
+
+    Args:
+        message (dict): The message received from a peer
+
+    Returns:
+        The class of the message, messages of unknown types are scheduled last
+    """
+    if message["type"] == "object":
+        if message["object"]["type"] == "block":
+            return MessageClass.BLOCK
+        return MessageClass.TRANSACTION
+    return _CLASSES.get(message["type"], MessageClass.PEERS)
@@ -1,3 +1,7 @@
+from jsonschema.exceptions import best_match
+from jsonschema.protocols import Validator
+from jsonschema.validators import validator_for
+
 HELLO = {
     "type": "object",
     "properties": {
@@ -11,6 +15,12 @@ HELLO = {
         },
         "agent": {
             "type": "string"
+        },
+        "extensions": {
+            "type": "array",
+            "items": {
+                "type": "string"
+            }
         }
     },
     "required": ["type", "version"],
@@ -216,6 +226,16 @@ BLOCK = {
     "required": ["type", "txids", "nonce", "previd", "created", "T"],  # "miner" and "note" are optional
     "additionalProperties": False
 }
+# A block without checking the items of the txid list, which may be long
+BLOCK_HEADER = {
+    **BLOCK,
+    "properties": {
+        **BLOCK["properties"],
+        "txids": {
+            "type": "array"
+        }
+    }
+}
 OBJECT = {
     "type": "object",
     "properties": {
@@ -295,3 +315,22 @@ MESSAGE = {
         MEMPOOL
     ]
 }
+
+_validators: dict[int, Validator] = {}
+
+
+def validate(instance, schema: dict) -> None:
+    """
+    Validates an instance like jsonschema.validate, but checks and compiles every schema only once
+
+    Raises:
+        ValidationError: The best matching error, if the instance is invalid
+    """
+    validator = _validators.get(id(schema))
+    if validator is None:
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = _validators[id(schema)] = cls(schema)
+    error = best_match(validator.iter_errors(instance))
+    if error is not None:
+        raise error
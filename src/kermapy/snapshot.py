@@ -0,0 +1,209 @@
+"""
+Export and import of the best chain as a compact file, to bootstrap a node without syncing over the network
+
+The file starts with a header line and continues with the blocks of the chain from the genesis block on, each
+preceded by its transactions, as length-prefixed frames in the encoding of the binary extension.
+"""
+import logging
+import time
+from concurrent.futures import Executor
+from typing import BinaryIO, Iterator
+
+from jsonschema.exceptions import ValidationError
+
+from . import binary, block_validation, objects, schemas, transaction_validation, utxo
+
+MAGIC = b"kerma-chain 1\n"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Overlay:
+    """The object database with the objects of the batch being imported on top"""
+
+    def __init__(self, objs: objects.Objects) -> None:
+        self._objs: objects.Objects = objs
+        self.objects: dict[str, dict] = {}
+        self.utxos: dict[str, dict] = {}
+        self.heights: dict[str, int] = {}
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self.objects or object_id in self._objs
+
+    def get(self, object_id: str) -> dict:
+        if object_id in self.objects:
+            return self.objects[object_id]
+        return self._objs.get(object_id)
+
+    def utxo(self, object_id: str) -> dict:
+        if object_id in self.utxos:
+            return self.utxos[object_id]
+        return self._objs.utxo(object_id)
+
+    def height(self, object_id: str) -> int:
+        if object_id in self.heights:
+            return self.heights[object_id]
+        return self._objs.height(object_id)
+
+    def clear(self) -> None:
+        self.objects.clear()
+        self.utxos.clear()
+        self.heights.clear()
+
+
+def export_chain(objs: objects.Objects, fp: BinaryIO) -> int:
+    """
+    Writes the best chain with the transactions of its blocks
+
+    Returns:
+        The number of blocks written
+    """
+    chain = []
+    block_id = objs.chaintip()
+    while block_id:
+        block = objs.get(block_id)
+        chain.append(block)
+        block_id = block["previd"]
+    fp.write(MAGIC)
+    for block in reversed(chain):
+        for tx_id in block["txids"]:
+            _write_object(fp, objs.get(tx_id))
+        _write_object(fp, block)
+    return len(chain)
+
+
+def _write_object(fp: BinaryIO, obj: dict) -> None:
+    fp.write(binary.frame(binary.message_payload({"type": "object", "object": obj})))
+
+
+def read_objects(fp: BinaryIO) -> Iterator[dict]:
+    """
+    Reads the objects of a chain file
+
+    Raises:
+        SnapshotError: The file is not a chain file or it is truncated
+    """
+    if fp.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a chain file")
+    while header := fp.read(binary.LENGTH_SIZE):
+        payload = fp.read(int.from_bytes(header, "big"))
+        if len(header) < binary.LENGTH_SIZE or len(payload) < int.from_bytes(header, "big"):
+            raise SnapshotError("Chain file is truncated")
+        try:
+            message = binary.decode_message(payload)
+        except ValueError as e:
+            raise SnapshotError(f"Chain file contains an invalid object: {e}")
+        if not isinstance(message, dict) or not isinstance(message.get("object"), dict):
+            raise SnapshotError("Chain file contains an invalid object")
+        yield message["object"]
+
+
+def import_chain(objs: objects.Objects, fp: BinaryIO, executor: Executor | None = None,
+                 batch_size: int = 100) -> int:
+    """
+    Validates and stores a chain read from a chain file
+
+    The blocks are validated like blocks received from a peer. The transactions of batch_size blocks at a time are
+    checked concurrently on the executor, as their signatures only depend on the transactions they spend from. The
+    blocks of a batch are then connected in order and stored in one write, so an import that fails keeps the
+    batches before the invalid block.
+
+    Args:
+        objs (objects.Objects): The object database the chain is imported into
+        fp (BinaryIO): The chain file
+        executor (Executor | None): The worker pool on which transactions are checked, if any
+        batch_size (int): The number of blocks stored in one write
+
+    Raises:
+        SnapshotError: The file is not a valid chain file or it contains an invalid object
+
+    Returns:
+        The number of blocks stored
+    """
+    overlay = _Overlay(objs)
+    txs: dict[str, dict] = {}
+    blocks: list[tuple[str, dict]] = []
+    stored = 0
+    for obj in read_objects(fp):
+        object_id = objects.Objects.id(obj)
+        if obj.get("type") == "block":
+            blocks.append((object_id, obj))
+            if len(blocks) >= batch_size:
+                stored += _import_batch(objs, overlay, txs, blocks, executor)
+                txs.clear()
+                blocks.clear()
+        else:
+            txs[object_id] = obj
+            overlay.objects[object_id] = obj
+    if blocks:
+        stored += _import_batch(objs, overlay, txs, blocks, executor)
+    return stored
+
+
+def _import_batch(objs: objects.Objects, overlay: _Overlay, txs: dict[str, dict], blocks: list[tuple[str, dict]],
+                  executor: Executor | None) -> int:
+    started = time.monotonic()
+    tx_ids = list(txs)
+    try:
+        referenced = [transaction_validation.referenced_outputs(txs[tx_id], overlay) for tx_id in tx_ids]
+        if executor is None:
+            verdicts = map(transaction_validation.check_block_transaction, tx_ids, txs.values(), referenced)
+        else:
+            verdicts = executor.map(transaction_validation.check_block_transaction, tx_ids, txs.values(), referenced,
+                                    chunksize=max(1, len(tx_ids) // 64))
+        metadata = dict(zip(tx_ids, verdicts))
+    except (transaction_validation.InvalidTransaction, ValueError) as e:
+        raise SnapshotError(f"Chain file contains an invalid transaction: {e}")
+
+    connected = []
+    for block_id, block in blocks:
+        if block_id in objs:
+            continue
+        try:
+            utxo_set, height = _connect_block(overlay, block_id, block, metadata)
+        except (block_validation.InvalidBlock, transaction_validation.InvalidTransaction, utxo.UtxoError,
+                ValidationError, KeyError, ValueError) as e:
+            raise SnapshotError(f"Chain file contains an invalid block {block_id}: {e}")
+        overlay.objects[block_id] = block
+        overlay.utxos[block_id] = utxo_set
+        overlay.heights[block_id] = height
+        connected.append((block, utxo_set, height))
+
+    chaintip = None
+    if connected:
+        tip_id = objects.Objects.id(connected[-1][0])
+        current_tip = objs.chaintip()
+        if not current_tip or objs.height(current_tip) < connected[-1][2]:
+            chaintip = tip_id
+    objs.put_batch(list(txs.values()), connected, chaintip)
+    overlay.clear()
+    logging.info(f"Imported {len(connected)} blocks with {len(txs)} transactions in "
+                 f"{time.monotonic() - started:.3f} seconds")
+    return len(connected)
+
+
+def _connect_block(overlay: _Overlay, block_id: str, block: dict,
+                   metadata: dict[str, transaction_validation.TransactionMetadata | None]) -> tuple[dict, int]:
+    schemas.validate(block, schemas.BLOCK)
+    block_validation.check_proof_of_work(block, block_id)
+    if block["previd"] and block["previd"] not in overlay:
+        raise block_validation.InvalidBlock("Received block which parent(-s) are not in the chain file")
+    block_validation.check_ancestry(block, block_id, overlay.get(block["previd"]) if block["previd"] else None)
+    if block["created"] > time.time():
+        raise block_validation.InvalidBlock("Received block with timestamp in the future")
+    block_txs = [overlay.get(tx_id) for tx_id in block["txids"]]
+    block_metadata = {}
+    for tx_id, tx in zip(block["txids"], block_txs):
+        if "inputs" not in tx:
+            continue
+        if tx_id not in metadata:
+            # Stored before, but not part of the chain file
+            metadata[tx_id] = transaction_validation.check_block_transaction(
+                tx_id, tx, transaction_validation.referenced_outputs(tx, overlay))
+        block_metadata[tx_id] = metadata[tx_id]
+    utxo_set = utxo.create_utxo_set(block, overlay, {tx_id: m.utxo_delta for tx_id, m in block_metadata.items()})
+    height = overlay.height(block["previd"]) + 1 if block["previd"] else 0
+    block_validation.check_coinbase(block, block_txs, block_metadata, height)
+    return utxo_set, height
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import defaultdict
+from multiprocessing import util
+from multiprocessing.managers import BaseManager, MakeProxyType
+from typing import Callable
+from weakref import WeakSet
+
+from . import bans, config, objects, peers
+
+_objects: 'SharedObjects | None' = None
+_peers: '_Synchronized | None' = None
+_bans: '_Synchronized | None' = None
+
+
+class SharedObjects(objects.Objects):
+    """
+    The object database in the storage process of a multi-process node
+
+    The storage process is the only one opening the database. Every stored object id is published to all workers
+    together with the index of the worker that stored it.
+    """
+
+    def __init__(self, storage_path: str, subscribers: list[multiprocessing.Queue]) -> None:
+        # The requests of the workers are served by a thread each, the chaintip is checked and replaced under the lock
+        self._chaintip_lock: threading.Lock = threading.Lock()
+        # The genesis block is stored before any worker is started
+        self._subscribers: list[multiprocessing.Queue] = []
+        super().__init__(storage_path)
+        self._subscribers = subscribers
+
+    def put_object(self, obj: dict, origin: int | None = None) -> None:
+        self._publish(self._put_object(obj), origin)
+
+    def put_block(self, obj: dict, utxo_set: dict, height: int, origin: int | None = None) -> bool:
+        with self._chaintip_lock:
+            new_chaintip = super().put_block(obj, utxo_set, height)
+        self._publish(self.id(obj), origin)
+        return new_chaintip
+
+    def _publish(self, object_id: str, origin: int | None) -> None:
+        for subscriber in self._subscribers:
+            subscriber.put((object_id, origin))
+
+
+class _Synchronized:
+    """Serializes the calls to an object of the storage process, which serves the requests of each worker in a thread"""
+
+    def __init__(self, obj) -> None:
+        self._obj = obj
+        self._lock: threading.Lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._obj, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return call
+
+
+_PeersProxy = MakeProxyType("_PeersProxy", (
+    "add_all", "mark_tried", "sample", "score", "scores", "ranked", "record_rtt", "record_response", "record_invalid",
+    "record_timeouts"))
+_BansProxy = MakeProxyType("_BansProxy", ("is_banned", "misbehaved"))
+
+
+class PeersProxy(_PeersProxy):
+    """The known peers of a worker of a multi-process node, kept and written to the file by the storage process"""
+
+    async def flush(self) -> bool:
+        return False
+
+
+class BansProxy(_BansProxy):
+    """The bans of a worker of a multi-process node, kept and written to the file by the storage process"""
+
+    async def flush(self) -> bool:
+        return False
+
+
+def _open(storage_path: str, subscribers: list[multiprocessing.Queue]) -> None:
+    global _objects, _peers, _bans
+    _objects = SharedObjects(storage_path, subscribers)
+    # Peers and bans are shared, so that every worker gossips the same peers and rejects the same banned hosts
+    _peers = _Synchronized(peers.Peers(storage_path))
+    _bans = _Synchronized(bans.BanManager(storage_path, config.BAN_THRESHOLD, config.BAN_DURATION, config.BAN_EXEMPT))
+    threading.Thread(target=_persist, daemon=True).start()
+    # Written once more when the manager shuts down
+    util.Finalize(None, _flush, exitpriority=10)
+
+
+def _persist() -> None:
+    while True:
+        time.sleep(config.PEERS_FLUSH_INTERVAL)
+        _flush()
+
+
+def _flush() -> None:
+    for name, persisted in (("peers", _peers), ("bans", _bans)):
+        try:
+            if persisted.dirty:
+                persisted.dump()
+        except OSError as e:
+            logging.error(f"Unable to write the {name}: {e}")
+
+
+def _get() -> SharedObjects:
+    return _objects
+
+
+def _get_peers() -> _Synchronized:
+    return _peers
+
+
+def _get_bans() -> _Synchronized:
+    return _bans
+
+
+class StorageManager(BaseManager):
+    pass
+
+
+StorageManager.register("objects", callable=_get, exposed=(
+    "get", "put_object", "put_block", "height", "utxo", "chaintip", "__contains__"))
+StorageManager.register("peers", callable=_get_peers, proxytype=PeersProxy)
+StorageManager.register("bans", callable=_get_bans, proxytype=BansProxy)
+
+
+def start_storage(storage_path: str, subscribers: list[multiprocessing.Queue]) -> StorageManager:
+    """
+    Starts the storage process of a multi-process node, which keeps the objects, the known peers and the bans
+
+    Args:
+        storage_path (str): The path of the database
+        subscribers (list[multiprocessing.Queue]): The queues on which the workers are told about stored objects
+
+    Returns:
+        The manager of the storage process, the workers connect to its address
+    """
+    manager = StorageManager(ctx=multiprocessing.get_context("fork"))
+    manager.start(_open, (storage_path, subscribers))
+    return manager
+
+
+class RemoteObjects:
+    """
+    The object database of a worker of a multi-process node, served by the storage process
+
+    Objects stored by other workers are handed over through the notification queue of the worker, so that waiters
+    for an object are woken up whichever worker received it.
+    """
+
+    id = staticmethod(objects.Objects.id)
+
+    def __init__(self, address, worker: int, notifications: multiprocessing.Queue) -> None:
+        manager = StorageManager(address=address)
+        manager.connect()
+        self._proxy = manager.objects()
+        self._worker: int = worker
+        self._notifications: multiprocessing.Queue = notifications
+        self._events: dict[str, WeakSet[asyncio.Event]] = defaultdict(WeakSet)
+        self._listener: threading.Thread | None = None
+
+    def listen(self, loop: asyncio.AbstractEventLoop, on_stored: Callable[[str], None]) -> None:
+        """
+        Starts handing over the objects stored by other workers
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The event loop of the worker
+            on_stored (Callable[[str], None]): Called on the loop with the id of every object stored by another worker
+        """
+        def handover():
+            while (notification := self._notifications.get()) is not None:
+                object_id, origin = notification
+                if origin != self._worker:
+                    loop.call_soon_threadsafe(self._stored, object_id, on_stored)
+
+        self._listener = threading.Thread(target=handover, daemon=True)
+        self._listener.start()
+
+    def close(self) -> None:
+        if self._listener:
+            self._notifications.put(None)
+
+    def _stored(self, object_id: str, on_stored: Callable[[str], None]) -> None:
+        self._set_events(object_id)
+        on_stored(object_id)
+
+    def _set_events(self, object_id: str) -> None:
+        for event in self._events.pop(object_id, ()):
+            event.set()
+
+    def height(self, object_id: str) -> int:
+        return self._proxy.height(object_id)
+
+    def utxo(self, object_id: str) -> dict:
+        return self._proxy.utxo(object_id)
+
+    def chaintip(self) -> str:
+        return self._proxy.chaintip()
+
+    def get(self, object_id: str) -> dict:
+        return self._proxy.get(object_id)
+
+    def put_object(self, obj: dict) -> None:
+        self._proxy.put_object(obj, self._worker)
+        self._set_events(self.id(obj))
+
+    def put_block(self, obj: dict, utxo_set: dict, height: int) -> bool:
+        new_chaintip = self._proxy.put_block(obj, utxo_set, height, self._worker)
+        self._set_events(self.id(obj))
+        return new_chaintip
+
+    def event_for(self, object_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._events[object_id].add(event)
+        return event
+
+    def __contains__(self, object_id: str):
+        return self._proxy.__contains__(object_id)
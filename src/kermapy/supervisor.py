@@ -0,0 +1,57 @@
+import asyncio
+import logging
+import multiprocessing
+
+from . import config, kermapy, storage
+
+
+def run(workers: int) -> None:
+    """
+    Runs a node as several worker processes sharing the listening port and one storage process
+
+    The kernel distributes incoming connections over the workers listening with SO_REUSEPORT. Only the first worker
+    connects to other peers. The objects, the known peers and the bans are kept by the storage process for all workers.
+    Every worker logs its own metrics, under the name of its process.
+
+    Args:
+        workers (int): The number of worker processes
+    """
+    ctx = multiprocessing.get_context("fork")
+    notifications = [ctx.Queue() for _ in range(workers)]
+    manager = storage.start_storage(config.STORAGE_PATH, notifications)
+    processes = [ctx.Process(target=_work, args=(index, manager.address, notifications[index]),
+                             name=f"kermapy-worker-{index}") for index in range(workers)]
+    for process in processes:
+        process.start()
+    logging.info(f"Started {workers} workers")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        manager.shutdown()
+
+
+def _work(index: int, address, notifications: multiprocessing.Queue) -> None:
+    objs = storage.RemoteObjects(address, index, notifications)
+    manager = storage.StorageManager(address=address)
+    manager.connect()
+    node = kermapy.Node(config.LISTEN_ADDR, config.STORAGE_PATH, objs=objs, reuse_port=True,
+                        known_peers=manager.peers(), ban_manager=manager.bans())
+    try:
+        asyncio.run(_serve(node, objs, index == 0))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve(node: kermapy.Node, objs: storage.RemoteObjects, discover: bool) -> None:
+    objs.listen(asyncio.get_running_loop(), node.handle_stored)
+    await node.start_server()
+    if discover:
+        node.peer_discovery()
+    await node.serve()
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Callable, Iterable
+
+
+class ChainSync:
+    """
+    Requests the ancestry of orphan blocks ahead of their connection
+
+    Missing parents and transactions are requested as soon as a block arrives instead of once its parent is
+    connected, so downloading the transactions of a chain overlaps with walking up its ancestors. At most window
+    requests are in flight at once, missing parents are requested before missing transactions.
+    """
+
+    def __init__(self, request_object: Callable[[str], None], window: int, timeout: float) -> None:
+        self._request_object: Callable[[str], None] = request_object
+        self._window: int = window
+        self._timeout: float = timeout
+        # Ordered sets of object ids waiting for a free slot in the window
+        self._parents: dict[str, None] = {}
+        self._transactions: dict[str, None] = {}
+        self._in_flight: dict[str, asyncio.TimerHandle] = {}
+
+    def __contains__(self, object_id: str) -> bool:
+        return object_id in self._in_flight or object_id in self._parents or object_id in self._transactions
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def want_parent(self, block_id: str) -> None:
+        if block_id not in self:
+            self._parents[block_id] = None
+            self._pump()
+
+    def want_transactions(self, tx_ids: Iterable[str]) -> None:
+        for tx_id in tx_ids:
+            if tx_id not in self:
+                self._transactions[tx_id] = None
+        self._pump()
+
+    def received(self, object_id: str) -> None:
+        self._parents.pop(object_id, None)
+        self._transactions.pop(object_id, None)
+        timer = self._in_flight.pop(object_id, None)
+        if timer:
+            timer.cancel()
+            self._pump()
+
+    def clear(self) -> None:
+        for timer in self._in_flight.values():
+            timer.cancel()
+        self._in_flight.clear()
+        self._parents.clear()
+        self._transactions.clear()
+
+    def _expire(self, object_id: str) -> None:
+        # Give up the slot, the orphan waiting for the object expires on its own
+        if self._in_flight.pop(object_id, None):
+            self._pump()
+
+    def _pump(self) -> None:
+        loop = asyncio.get_running_loop()
+        while len(self._in_flight) < self._window and (self._parents or self._transactions):
+            pending = self._parents if self._parents else self._transactions
+            object_id = next(iter(pending))
+            del pending[object_id]
+            self._in_flight[object_id] = loop.call_later(self._timeout, self._expire, object_id)
+            self._request_object(object_id)
@@ -1,12 +1,13 @@
 import copy
+from concurrent.futures import Executor
 
 from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from jsonschema.exceptions import ValidationError
-from jsonschema.validators import validate
 
 from . import objects
 from . import schemas
+from . import utxo
 from org.webpki.json.Canonicalize import canonicalize
 
 
@@ -14,10 +15,16 @@ class InvalidTransaction(Exception):
     pass
 
 
+class MissingTransaction(InvalidTransaction):
+    """A transaction spends from a transaction that is not known (yet)"""
+    pass
+
+
 class TransactionMetadata:
-    def __init__(self, total_input_value, total_output_value):
+    def __init__(self, total_input_value, total_output_value, utxo_delta: utxo.UtxoDelta | None = None):
         self.total_input_value = total_input_value
         self.total_output_value = total_output_value
+        self.utxo_delta = utxo_delta
 
 
 def validate_transaction(transaction: dict, objs: objects.Objects) -> TransactionMetadata | None:
@@ -31,11 +38,30 @@ def validate_transaction(transaction: dict, objs: objects.Objects) -> Transactio
     Raises:
         InvalidTransaction: The error that is raised when the transaction is not valid
 
+    Returns:
+        The metadata of the transaction or None (currently for coinbase transaction)
+    """
+    return check_transaction(transaction, referenced_outputs(transaction, objs))
+
+
+def check_transaction(transaction: dict, referenced: dict[str, list[dict]]) -> TransactionMetadata | None:
+    """
+    Validates a transaction against the outputs it references, without access to the object database
+
+    The arguments and the result can be pickled, so the check can run in a worker process.
+
+    Args:
+        transaction (dict): The transaction that should be validated
+        referenced (dict[str, list[dict]]): The outputs of the transactions spent from by their ids
+
+    Raises:
+        InvalidTransaction: The error that is raised when the transaction is not valid
+
     Returns:
         The metadata of the transaction or None (currently for coinbase transaction)
     """
     try:
-        validate(transaction, schemas.ALL_TRANSACTIONS)
+        schemas.validate(transaction, schemas.ALL_TRANSACTIONS)
     except ValidationError as e:
         raise InvalidTransaction(
             f"Transaction is not well formed: {e.message}")
@@ -44,13 +70,117 @@ def validate_transaction(transaction: dict, objs: objects.Objects) -> Transactio
     if "height" in transaction:
         return None
     else:
-        total_input_value = _validate_inputs(transaction, objs)
+        total_input_value = _validate_inputs(transaction, referenced)
         total_output_value = _validate_outputs(transaction, total_input_value)
 
         return TransactionMetadata(total_input_value, total_output_value)
 
 
-def _validate_inputs(transaction: dict, objs: objects.Objects) -> int:
+def referenced_outputs(transaction: dict, objs: objects.Objects) -> dict[str, list[dict]]:
+    """
+    Collects the outputs of the transactions a transaction spends from, unknown transactions are left out
+
+    Args:
+        transaction (dict): The transaction whose inputs should be resolved
+        objs (objects.Objects): The object manager in which the referenced txs should be searched
+
+    Returns:
+        The outputs of the referenced transactions by their ids
+    """
+    referenced = {}
+    try:
+        for inpt in transaction.get("inputs", []):
+            tx_id = inpt["outpoint"]["txid"]
+            try:
+                referenced[tx_id] = objs.get(tx_id)["outputs"]
+            except (KeyError, TypeError):
+                pass
+    except (AttributeError, KeyError, TypeError):
+        # Malformed transactions are rejected by the schema validation
+        pass
+    return referenced
+
+
+def validate_transactions(transactions: dict[str, dict], objs: objects.Objects,
+                          executor: Executor | None = None) -> dict[str, TransactionMetadata | None]:
+    """
+    Validates the transactions of a block and raises an error, if any of them is invalid
+
+    The transactions are validated level by level of the spend DAG within the block, so a transaction is only
+    validated after the transactions of the block it spends from. The transactions of one level are independent
+    of each other and are validated concurrently on the executor. The referenced outputs are looked up in the
+    calling thread, so the executor may be a process pool.
+
+    Args:
+        transactions (dict[str, dict]): The transactions that should be validated by their ids, in block order
+        objs (objects.Objects): The object manager in which the referenced txs should be searched
+        executor (Executor | None): The worker pool on which independent transactions are validated, if any
+
+    Raises:
+        InvalidTransaction: The error that is raised when a transaction is not valid
+
+    Returns:
+        The metadata of the transactions by their ids including their UTXO delta, in block order
+    """
+    metadata = dict.fromkeys(transactions)
+    for level in spend_dag_levels(transactions):
+        level_transactions = [transactions[tx_id] for tx_id in level]
+        level_referenced = [referenced_outputs(transaction, objs) for transaction in level_transactions]
+        if executor is None:
+            verdicts = map(check_block_transaction, level, level_transactions, level_referenced)
+        else:
+            verdicts = executor.map(check_block_transaction, level, level_transactions, level_referenced,
+                                    chunksize=max(1, len(level) // 64))
+        for tx_id, verdict in zip(level, verdicts):
+            metadata[tx_id] = verdict
+    return metadata
+
+
+def check_block_transaction(tx_id: str, transaction: dict,
+                            referenced: dict[str, list[dict]]) -> TransactionMetadata | None:
+    """Validates a transaction of a block like check_transaction and computes its UTXO delta"""
+    metadata = check_transaction(transaction, referenced)
+    if metadata is not None:
+        try:
+            metadata.utxo_delta = utxo.utxo_delta(tx_id, transaction, referenced)
+        except utxo.UtxoError:
+            # The UTXO set creation reports the missing input transaction
+            pass
+    return metadata
+
+
+def spend_dag_levels(transactions: dict[str, dict]) -> list[list[str]]:
+    """
+    Groups the transactions of a block by their depth in the spend DAG within the block
+
+    Args:
+        transactions (dict[str, dict]): The transactions by their ids, in block order
+
+    Returns:
+        The ids of the transactions per level, where no transaction spends from a transaction of the same or a
+        later level
+    """
+    depths: dict[str, int] = {}
+    levels: list[list[str]] = []
+    for tx_id, transaction in transactions.items():
+        depth = 0
+        try:
+            for inpt in transaction.get("inputs", []):
+                parent_id = inpt["outpoint"]["txid"]
+                # Spending a later transaction of the block is not an edge, the UTXO check rejects it
+                if parent_id in depths:
+                    depth = max(depth, depths[parent_id] + 1)
+        except (KeyError, TypeError):
+            # Malformed transactions are rejected by the schema validation
+            pass
+        depths[tx_id] = depth
+        if depth == len(levels):
+            levels.append([])
+        levels[depth].append(tx_id)
+    return levels
+
+
+def _validate_inputs(transaction: dict, referenced: dict[str, list[dict]]) -> int:
     total_input_value = 0
 
     outpoints_as_string = []
@@ -62,16 +192,16 @@ def _validate_inputs(transaction: dict, objs: objects.Objects) -> int:
         outpoints_as_string.append(str(outpoint["index"]) + outpoint["txid"])
 
         try:
-            stored_transaction = objs.get(tx_id)
+            stored_outputs = referenced[tx_id]
         except KeyError:
-            raise InvalidTransaction(
+            raise MissingTransaction(
                 f"Could not find transaction '{tx_id}' in object database")
 
-        index = _validate_input_index(tx_id, outpoint, stored_transaction)
+        index = _validate_input_index(tx_id, outpoint, stored_outputs)
         _validate_input_signature(
-            tx_id, inpt, transaction, stored_transaction, index)
+            tx_id, inpt, transaction, stored_outputs, index)
 
-        total_input_value += int(stored_transaction["outputs"][index]["value"])
+        total_input_value += int(stored_outputs[index]["value"])
 
     # Remove duplicates
     outpoints_set = set(outpoints_as_string)
@@ -84,20 +214,21 @@ def _validate_inputs(transaction: dict, objs: objects.Objects) -> int:
     return total_input_value
 
 
-def _validate_input_index(tx_id: str, outpoint: dict, stored_transaction: dict) -> int:
+def _validate_input_index(tx_id: str, outpoint: dict, stored_outputs: list[dict]) -> int:
     index = int(outpoint["index"])
 
     # Check whether the index is valid in the referenced transaction
-    if index >= len(stored_transaction["outputs"]):
+    if index >= len(stored_outputs):
         raise InvalidTransaction(
             f"Given index '{index}' for transaction '{tx_id}' is invalid")
 
     return index
 
 
-def _validate_input_signature(tx_id: str, inpt: dict, transaction: dict, stored_transaction: dict, index: int) -> None:
+def _validate_input_signature(tx_id: str, inpt: dict, transaction: dict, stored_outputs: list[dict],
+                              index: int) -> None:
     # Get public key from the referenced transaction
-    output = stored_transaction["outputs"][index]
+    output = stored_outputs[index]
     public_key_bytes = bytes.fromhex(output["pubkey"])
     public_key = ed25519.Ed25519PublicKey.from_public_bytes(
         public_key_bytes)
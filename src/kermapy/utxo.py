@@ -1,11 +1,29 @@
 from . import objects
 
+# The keys of the spent outputs and the created outputs by their keys
+UtxoDelta = tuple[list[str], dict[str, int]]
+
 
 class UtxoError(Exception):
     pass
 
 
-def create_utxo_set(block: dict, objs: objects.Objects) -> dict:
+def create_utxo_set(block: dict, objs: objects.Objects, deltas: dict[str, UtxoDelta | None] | None = None) -> dict:
+    """
+    Creates the UTXO set after a block from the UTXO set of its parent
+
+    Args:
+        block (dict): The block whose transactions are applied
+        objs (objects.Objects): The object manager in which the parent UTXO set and the txs should be searched
+        deltas (dict[str, UtxoDelta | None] | None): UTXO deltas computed during validation by transaction id, the
+            deltas of the other transactions are computed from the object database
+
+    Raises:
+        UtxoError: An input transaction is unknown or an output is spent that is not in the UTXO set
+
+    Returns:
+        The UTXO set after the block
+    """
     prev_block_id = block["previd"]
 
     if prev_block_id:
@@ -18,8 +36,12 @@ def create_utxo_set(block: dict, objs: objects.Objects) -> dict:
         utxo_set = dict()
 
     tx_ids = block["txids"]
+    deltas = deltas or {}
 
     for tx_id in tx_ids:
+        if deltas.get(tx_id):
+            apply_utxo_delta(utxo_set, deltas[tx_id])
+            continue
         try:
             adjust_utxo_set_add_transaction(utxo_set, tx_id, objs)
         except KeyError:
@@ -31,31 +53,62 @@ def create_utxo_set(block: dict, objs: objects.Objects) -> dict:
 def adjust_utxo_set_add_transaction(utxo_set: dict, tx_id: str, objs: objects.Objects) -> None:
     tx = objs.get(tx_id)
 
-    if "inputs" in tx:
-        for inpt in tx["inputs"]:
-            outpoint = inpt["outpoint"]
-            input_tx_id = outpoint["txid"]
-            input_tx_index = outpoint["index"]
+    referenced = {}
+    for inpt in tx.get("inputs", []):
+        input_tx_id = inpt["outpoint"]["txid"]
+        # Get transaction where the funds come from
+        try:
+            referenced[input_tx_id] = objs.get(input_tx_id)["outputs"]
+        except KeyError:
+            raise UtxoError(
+                f"Could not find input transaction '{input_tx_id}' in object database")
+
+    apply_utxo_delta(utxo_set, utxo_delta(tx_id, tx, referenced))
+
 
-            # Get transaction where the funds come from
-            try:
-                prev_tx = objs.get(input_tx_id)
-            except KeyError:
-                raise UtxoError(
-                    f"Could not find input transaction '{input_tx_id}' in object database")
+def utxo_delta(tx_id: str, tx: dict, referenced: dict[str, list[dict]]) -> UtxoDelta:
+    """
+    Computes the outputs a transaction spends and creates, without access to the object database
 
-            pub_key = prev_tx["outputs"][input_tx_index]["pubkey"]
+    Args:
+        tx_id (str): The id of the transaction
+        tx (dict): The transaction
+        referenced (dict[str, list[dict]]): The outputs of the transactions spent from by their ids
 
-            utxo_key = input_tx_id + "_" + pub_key + "_" + str(input_tx_index)
+    Raises:
+        UtxoError: An input transaction is not among the referenced outputs
 
-            # Check if output is till in UTXO, otherwise it has been spent already
-            if utxo_key not in utxo_set:
-                raise UtxoError(
-                    f"Could not find UTXO entry for key '{utxo_key}'")
+    Returns:
+        The keys of the spent outputs and the created outputs by their keys
+    """
+    spent = []
+    for inpt in tx.get("inputs", []):
+        outpoint = inpt["outpoint"]
+        input_tx_id = outpoint["txid"]
+        input_tx_index = outpoint["index"]
 
-            del utxo_set[utxo_key]
+        try:
+            pub_key = referenced[input_tx_id][input_tx_index]["pubkey"]
+        except KeyError:
+            raise UtxoError(
+                f"Could not find input transaction '{input_tx_id}' in object database")
+
+        spent.append(input_tx_id + "_" + pub_key + "_" + str(input_tx_index))
 
     # Add outputs of current transaction
-    for idx, output in enumerate(tx["outputs"]):
-        utxo_key = tx_id + "_" + output["pubkey"] + "_" + str(idx)
-        utxo_set[utxo_key] = output["value"]
+    created = {tx_id + "_" + output["pubkey"] + "_" + str(idx): output["value"]
+               for idx, output in enumerate(tx["outputs"])}
+    return spent, created
+
+
+def apply_utxo_delta(utxo_set: dict, delta: UtxoDelta) -> None:
+    spent, created = delta
+    for utxo_key in spent:
+        # Check if output is till in UTXO, otherwise it has been spent already
+        if utxo_key not in utxo_set:
+            raise UtxoError(
+                f"Could not find UTXO entry for key '{utxo_key}'")
+
+        del utxo_set[utxo_key]
+
+    utxo_set.update(created)
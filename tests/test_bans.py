@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.kermapy import bans, config
+from src.kermapy.kermapy import Node, ProtocolError, TaskError, UnavailableError
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class BanManagerTests(TestCase):
+    def setUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.bans = bans.BanManager(self._tmp_directory, 100, 60, ["127.0.0.1"])
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_directory)
+
+    def test_misbehaved_belowThreshold_shouldNotBan(self):
+        # Act
+        banned = self.bans.misbehaved("1.1.1.1", 50)
+
+        # Assert
+        self.assertFalse(banned)
+        self.assertFalse(self.bans.is_banned("1.1.1.1"))
+
+    def test_misbehaved_reachingThreshold_shouldBan(self):
+        # Arrange
+        self.bans.misbehaved("1.1.1.1", 50)
+
+        # Act
+        banned = self.bans.misbehaved("1.1.1.1", 50)
+
+        # Assert
+        self.assertTrue(banned)
+        self.assertTrue(self.bans.is_banned("1.1.1.1"))
+        self.assertFalse(self.bans.is_banned("8.8.8.8"))
+
+    def test_misbehaved_exemptHost_shouldNotBan(self):
+        # Act
+        banned = self.bans.misbehaved("127.0.0.1", 100)
+
+        # Assert
+        self.assertFalse(banned)
+        self.assertFalse(self.bans.is_banned("127.0.0.1"))
+
+    def test_isBanned_expired_shouldLiftBan(self):
+        # Arrange
+        manager = bans.BanManager(self._tmp_directory, 100, 0.01)
+        manager.misbehaved("1.1.1.1", 100)
+
+        # Act
+        time.sleep(0.02)
+
+        # Assert
+        self.assertFalse(manager.is_banned("1.1.1.1"))
+        self.assertEqual(0, len(manager))
+
+    def test_dump_shouldPersistBans(self):
+        # Arrange
+        self.bans.misbehaved("1.1.1.1", 100)
+
+        # Act
+        self.bans.dump()
+        loaded = bans.BanManager(self._tmp_directory, 100, 60)
+
+        # Assert
+        self.assertTrue(loaded.is_banned("1.1.1.1"))
+        self.assertFalse(loaded.dirty)
+
+
+class BanTestCase(KermaTestCase):
+    async def asyncSetUp(self):
+        with patch.object(config, "BAN_EXEMPT", []):
+            await super().asyncSetUp()
+
+    async def test_misbehavingHost_shouldBeRejectedOnReconnect(self):
+        with patch.object(config, "MISBEHAVIOUR_MALFORMED_MESSAGE", config.BAN_THRESHOLD):
+            client = await Client.new_established()
+            await client.write(b"Wbgygvf7rgtyv7tfbgy{{{\n")
+            self.assertIn(b"error", await client.readline())
+            await client.close()
+
+            client = await Client.new()
+
+            self.assertEqual(b"", await client.readline())
+            self.assertEqual(1, self._node.metrics.counters["connections_rejected"])
+
+            await client.close()
+
+
+class MisbehaviourTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.known_peers = Mock(flush=AsyncMock(return_value=False))
+        self.node = Node("127.0.0.1:19000", self._tmp_directory, 0.5, known_peers=self.known_peers)
+        self.conn = Mock(peer_name="10.0.0.1:18018", host="10.0.0.1", write_error=AsyncMock())
+
+    async def asyncTearDown(self):
+        await self.node.shutdown()
+        shutil.rmtree(self._tmp_directory)
+
+    async def _handle_object(self, error: ProtocolError) -> None:
+        with patch.object(self.node, "handle_object", AsyncMock(side_effect=error)):
+            with self.assertRaises(TaskError):
+                await self.node.handle_message({"type": "object", "object": {}}, self.conn)
+
+    async def test_handleMessage_invalidObject_shouldRecordInvalid(self):
+        # Act
+        await self._handle_object(ProtocolError("Received block with invalid target"))
+
+        # Assert
+        self.known_peers.record_invalid.assert_called_once_with("10.0.0.1:18018")
+
+    async def test_handleMessage_unavailableObject_shouldNotRecordInvalid(self):
+        # Act
+        await self._handle_object(UnavailableError("Received block contains transactions that could not be received"))
+
+        # Assert
+        self.known_peers.record_invalid.assert_not_called()
+        self.conn.write_error.assert_awaited_once()
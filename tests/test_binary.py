@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from src.kermapy import binary, config, objects
+
+TX = {
+    "inputs": [{
+        "outpoint": {"index": 0, "txid": "1bb37b637d07100cd26fc063dfd4c39a7931cc88dae3417871219715a5e374af"},
+        "sig": "1d0d7d774042607c69a87ac5f1cdf92bf474c25fafcc089fe667602bfefb0494726c519e92266957429ced875256e6915eb8cea2ea66366e739415efc47a6805"
+    }],
+    "outputs": [{"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 10}],
+    "type": "transaction"
+}
+COINBASE_TX = {
+    "height": 1,
+    "outputs": [{"pubkey": "f66c7d51551d344b74e071d3b988d2bc09c3ffa82857302620d14f2469cfbf60", "value": 50000000000000}],
+    "type": "transaction"
+}
+
+
+class BinaryEncodingTests(TestCase):
+    def test_encodeMessage_objects_shouldDecodeToObjectsWithSameId(self):
+        for obj in [TX, COINBASE_TX, config.GENESIS]:
+            # Act
+            data = binary.encode_message({"type": "object", "object": obj})
+
+            # Assert
+            payload = data[binary.LENGTH_SIZE:]
+            self.assertEqual(len(payload), int.from_bytes(data[:binary.LENGTH_SIZE], "big"))
+            self.assertEqual(binary.KIND_OBJECT, payload[0])
+            self.assertEqual(objects.Objects.id(obj), objects.Objects.id(binary.decode_message(payload)["object"]))
+            self.assertLess(len(payload), len(objects.canonicalize(obj)))
+
+    def test_encodeMessage_objectWithUppercaseHex_shouldFallBackToJson(self):
+        # Arrange
+        obj = {**COINBASE_TX, "outputs": [{**COINBASE_TX["outputs"][0], "pubkey": "F" * 64}]}
+
+        # Act
+        payload = binary.encode_message({"type": "object", "object": obj})[binary.LENGTH_SIZE:]
+
+        # Assert
+        self.assertEqual(binary.KIND_JSON, payload[0])
+        self.assertDictEqual(obj, binary.decode_message(payload)["object"])
+
+    def test_encodeLines_shouldFrameEveryLine(self):
+        # Act
+        data = binary.encode_lines(b'{"type":"getpeers"}\n{"type":"getchaintip"}\n')
+
+        # Assert
+        first_size = int.from_bytes(data[:binary.LENGTH_SIZE], "big")
+        first = data[binary.LENGTH_SIZE:binary.LENGTH_SIZE + first_size]
+        second = data[2 * binary.LENGTH_SIZE + first_size:]
+        self.assertDictEqual({"type": "getpeers"}, binary.decode_message(first))
+        self.assertDictEqual({"type": "getchaintip"}, binary.decode_message(second))
+
+    def test_decodeMessage_truncatedObject_shouldRaiseError(self):
+        # Arrange
+        payload = binary.encode_message({"type": "object", "object": TX})[binary.LENGTH_SIZE:]
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            binary.decode_message(payload[:-1])
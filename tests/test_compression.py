@@ -0,0 +1,48 @@
+import zlib
+from unittest import TestCase
+
+from src.kermapy import binary, compression, metrics
+
+
+class FrameCompressionTests(TestCase):
+    def setUp(self):
+        self.metrics = metrics.Metrics()
+        self.compressor = compression.FrameCompressor(64, 6, self.metrics)
+        self.decompressor = compression.FrameDecompressor(4096, self.metrics)
+
+    def test_compress_payloadsAboveThreshold_shouldRoundTripInOrder(self):
+        # Arrange
+        payloads = [bytes([binary.KIND_JSON]) + b'{"txids":["%s"],"type":"mempool"}' % (b"ab" * 32 * i)
+                    for i in range(1, 4)]
+
+        # Act
+        compressed = [self.compressor.compress(payload) for payload in payloads]
+        restored = [self.decompressor.decompress(payload) for payload in compressed]
+
+        # Assert
+        self.assertEqual(payloads, restored)
+        for payload in compressed:
+            self.assertTrue(payload[0] & compression.COMPRESSED)
+        self.assertGreater(self.metrics.gauges["compression_ratio"], 1)
+        self.assertEqual(3, self.metrics.histograms["compression_seconds"].count)
+
+    def test_compress_payloadBelowThreshold_shouldNotCompress(self):
+        # Arrange
+        payload = bytes([binary.KIND_JSON]) + b'{"type":"getpeers"}'
+
+        # Act
+        compressed = self.compressor.compress(payload)
+
+        # Assert
+        self.assertEqual(payload, compressed)
+        self.assertEqual(payload, self.decompressor.decompress(compressed))
+
+    def test_decompress_exceedingMaximumSize_shouldRaiseError(self):
+        # Arrange
+        compressobj = zlib.compressobj()
+        payload = bytes([binary.KIND_JSON | compression.COMPRESSED]) + compressobj.compress(b"0" * 8192) + \
+            compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            self.decompressor.decompress(payload)
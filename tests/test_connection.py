@@ -0,0 +1,203 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.kermapy import binary, compression, config, limits, metrics
+from src.kermapy.kermapy import Connection
+
+
+class ConnectionTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.writer = Mock()
+        self.writer.drain = AsyncMock()
+        self.writer.wait_closed = AsyncMock()
+        self.writer.get_extra_info = Mock(return_value=("127.0.0.1", 18018))
+        self.writer.is_closing = Mock(return_value=False)
+        self.processing = limits.ConcurrencyLimit(1)
+        self.conn = Connection(Mock(), self.writer, False, self.processing)
+
+    async def asyncTearDown(self):
+        await self.conn.close()
+
+    async def test_announce_shouldCoalesceAnnouncementsIntoOneWrite(self):
+        # Act
+        self.conn.announce(b'{"objectid":"a","type":"ihaveobject"}\n', b"a")
+        self.conn.announce(b'{"objectid":"b","type":"ihaveobject"}\n', b"b")
+        await asyncio.sleep(config.ANNOUNCE_INTERVAL * 2)
+
+        # Assert
+        self.writer.writelines.assert_called_once_with(
+            [b'{"objectid":"a","type":"ihaveobject"}\n{"objectid":"b","type":"ihaveobject"}\n'])
+
+    async def test_announce_binary_shouldFrameSharedPayloads(self):
+        # Arrange
+        message = {"type": "ihaveobject", "objectid": "a"}
+        payload = binary.message_payload(message)
+        await self.conn.switch_to_binary()
+
+        # Act
+        self.conn.announce(b"line\n", payload)
+        self.conn.announce(b"line\n", payload)
+        await asyncio.sleep(config.ANNOUNCE_INTERVAL * 2)
+
+        # Assert
+        self.writer.writelines.assert_called_with([binary.encode_message(message) * 2])
+
+    async def test_switchToBinary_pendingAnnouncements_shouldSendThemAsLinesFirst(self):
+        # Arrange
+        self.conn.announce(b'{"objectid":"a","type":"ihaveobject"}\n', b"a")
+
+        # Act
+        await self.conn.switch_to_binary()
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.writer.writelines.assert_called_once_with([b'{"objectid":"a","type":"ihaveobject"}\n', binary.SWITCH_MARKER])
+
+    async def test_send_queueFull_shouldDropMessages(self):
+        # Arrange
+        self.writer.drain.side_effect = asyncio.Event().wait
+
+        # Act
+        sent = [self.conn.send(b"x") for _ in range(config.SEND_QUEUE_SIZE + 2)]
+
+        # Assert
+        self.assertTrue(all(sent[:config.SEND_QUEUE_SIZE]))
+        self.assertFalse(sent[-1])
+        self.writer.transport.abort.assert_not_called()
+
+    async def test_send_queueFullAndDisconnectPolicy_shouldAbortConnection(self):
+        # Arrange
+        self.writer.drain.side_effect = asyncio.Event().wait
+
+        # Act
+        with patch.object(config, "SEND_QUEUE_POLICY", "disconnect"):
+            for _ in range(config.SEND_QUEUE_SIZE + 1):
+                self.conn.send(b"x")
+
+        # Assert
+        self.writer.transport.abort.assert_called_once()
+
+    async def _fill_send_queue(self) -> None:
+        self.writer.drain.side_effect = asyncio.Event().wait
+        # The first messages are taken by the send loop, which then waits for the peer to read
+        self.conn.send(b"x")
+        await asyncio.sleep(0.01)
+        for _ in range(config.SEND_QUEUE_SIZE):
+            self.conn.send(b"x")
+
+    async def _reply_with_slot(self) -> int:
+        async def reply():
+            async with self.processing.slot():
+                await self.conn.write_message({"type": "peers", "peers": []})
+
+        task = asyncio.create_task(reply())
+        await asyncio.sleep(0.01)
+        in_use = self.processing.in_use
+        await task
+        return in_use
+
+    async def test_writeMessage_queueFull_shouldWaitWithoutProcessingSlotAndDrop(self):
+        # Arrange
+        await self._fill_send_queue()
+
+        # Act
+        with patch.object(config, "SEND_TIMEOUT", 0.05):
+            in_use = await self._reply_with_slot()
+
+        # Assert
+        self.assertEqual(0, in_use)
+        self.assertEqual(config.SEND_QUEUE_SIZE, self.conn.send_backlog)
+        self.writer.transport.abort.assert_not_called()
+
+    async def test_writeMessage_queueFullAndDisconnectPolicy_shouldAbortConnection(self):
+        # Arrange
+        await self._fill_send_queue()
+
+        # Act
+        with patch.object(config, "SEND_TIMEOUT", 0.05), patch.object(config, "SEND_QUEUE_POLICY", "disconnect"):
+            await self._reply_with_slot()
+
+        # Assert
+        self.writer.transport.abort.assert_called_once()
+
+    async def test_writeMessage_shouldCoalesceQueuedMessagesIntoOneWrite(self):
+        # Act
+        await self.conn.write_message({"type": "getpeers"})
+        self.conn.send(b'{"type":"getchaintip"}\n')
+        await self.conn.write_error("Error")
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.writer.writelines.assert_called_once_with([
+            b'{"type":"getpeers"}\n',
+            b'{"type":"getchaintip"}\n',
+            b'{"error":"Error","type":"error"}\n'
+        ])
+        self.writer.drain.assert_awaited_once()
+
+    async def test_switchToBinary_shouldSendMarkerAndFramesAfterwards(self):
+        # Act
+        await self.conn.write_message({"type": "getpeers"})
+        await self.conn.switch_to_binary()
+        await self.conn.write_message({"type": "getchaintip"})
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.writer.writelines.assert_called_once_with([
+            b'{"type":"getpeers"}\n',
+            binary.SWITCH_MARKER,
+            binary.encode_message({"type": "getchaintip"})
+        ])
+
+    async def test_switchToBinary_withCompression_shouldCompressLargeMessages(self):
+        # Arrange
+        message = {"type": "mempool", "txids": ["ab" * 32] * 64}
+
+        # Act
+        await self.conn.switch_to_binary(metrics.Metrics())
+        await self.conn.write_message(message)
+        await asyncio.sleep(0.01)
+
+        # Assert
+        data = self.writer.writelines.call_args.args[0][1]
+        payload = data[binary.LENGTH_SIZE:]
+        self.assertTrue(payload[0] & compression.COMPRESSED)
+        self.assertLess(len(data), len(binary.encode_message(message)))
+
+    async def test_send_compressedAndQueueFull_shouldKeepCompressedStreamIntact(self):
+        # Arrange
+        node_metrics = metrics.Metrics()
+        first = b'{"txids":["' + b"ab" * 600 + b'"],"type":"mempool"}\n'
+        second = b'{"txids":["' + b"cd" * 600 + b'"],"type":"mempool"}\n'
+        await self.conn.switch_to_binary(node_metrics)
+        await asyncio.sleep(0.01)
+        drained = asyncio.Event()
+        self.writer.drain.side_effect = drained.wait
+        self.conn.send(first)
+        await asyncio.sleep(0.01)
+        for _ in range(config.SEND_QUEUE_SIZE):
+            self.conn.send(first)
+
+        # Act
+        dropped = not self.conn.send(second)
+        drained.set()
+        await asyncio.sleep(0.01)
+        self.conn.send(second)
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.assertTrue(dropped)
+        decompressor = compression.FrameDecompressor(config.MAX_MESSAGE_SIZE, node_metrics)
+        frames = [data for call in self.writer.writelines.call_args_list for data in call.args[0]][1:]
+        payloads = [decompressor.decompress(data[binary.LENGTH_SIZE:]) for data in frames]
+        self.assertEqual(binary.line_payloads(first) * (config.SEND_QUEUE_SIZE + 1) + binary.line_payloads(second),
+                         payloads)
+
+    async def test_writeMessages_shouldQueueMessagesAsOneWrite(self):
+        # Act
+        await self.conn.write_messages([{"type": "hello"}, {"type": "getpeers"}])
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.writer.writelines.assert_called_once_with([b'{"type":"hello"}\n{"type":"getpeers"}\n'])
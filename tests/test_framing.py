@@ -0,0 +1,127 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+from src.kermapy import binary, framing
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class LineFramerTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.transport = Mock(asyncio.Transport)
+        self.transport.is_closing.return_value = False
+        self.framer = framing.LineFramer(16, 32)
+        self.framer.connection_made(self.transport)
+
+    async def test_readMessage_multipleMessagesInOneChunk_shouldReturnEachMessage(self):
+        # Act
+        self.framer.data_received(b'{"a":1}\n{"b":2}\n{"c"')
+        self.framer.data_received(b':3}\n')
+
+        # Assert
+        self.assertEqual((False, b'{"a":1}\n'), await self.framer.read_message())
+        self.assertEqual((False, b'{"b":2}\n'), await self.framer.read_message())
+        self.assertEqual((False, b'{"c":3}\n'), await self.framer.read_message())
+
+    async def test_readMessage_messageInManyChunks_shouldReturnMessage(self):
+        # Act
+        for byte in b'{"a":1}\n{"bc":2}\n':
+            self.framer.data_received(bytes([byte]))
+
+        # Assert
+        self.assertEqual((False, b'{"a":1}\n'), await self.framer.read_message())
+        self.assertEqual((False, b'{"bc":2}\n'), await self.framer.read_message())
+
+    async def test_readMessage_messageTooLarge_shouldRaiseErrorAfterPreviousMessages(self):
+        # Act
+        self.framer.data_received(b'{"a":1}\n' + b"x" * 20)
+
+        # Assert
+        self.assertEqual((False, b'{"a":1}\n'), await self.framer.read_message())
+        with self.assertRaises(framing.MessageTooLarge):
+            await self.framer.read_message()
+        self.transport.pause_reading.assert_called_once()
+
+    async def test_readMessage_completeMessageTooLarge_shouldRaiseErrorAfterPreviousMessages(self):
+        # Act
+        self.framer.data_received(b'{"a":1}\n' + b"x" * 20 + b"\n")
+
+        # Assert
+        self.assertEqual((False, b'{"a":1}\n'), await self.framer.read_message())
+        with self.assertRaises(framing.MessageTooLarge):
+            await self.framer.read_message()
+
+    async def test_readMessage_frameTooLarge_shouldRaiseError(self):
+        # Arrange
+        framer = framing.LineFramer(64, 128, extensions=[binary.EXTENSION])
+        framer.connection_made(self.transport)
+
+        # Act
+        framer.data_received(binary.SWITCH_MARKER + binary.frame(b"first") + binary.frame(b"x" * 80))
+
+        # Assert
+        self.assertEqual((True, b"first"), await framer.read_message())
+        with self.assertRaises(framing.MessageTooLarge):
+            await framer.read_message()
+
+    async def test_readMessage_bufferFull_shouldPauseReadingUntilMessagesAreRead(self):
+        # Act
+        self.framer.data_received(b"0123456789abcd\n" * 3)
+        paused = self.transport.pause_reading.called
+        for _ in range(3):
+            await self.framer.read_message()
+
+        # Assert
+        self.assertTrue(paused)
+        self.transport.resume_reading.assert_called_once()
+
+    async def test_readMessage_connectionClosed_shouldRaiseEOFError(self):
+        # Arrange
+        read = asyncio.create_task(self.framer.read_message())
+        await asyncio.sleep(0)
+
+        # Act
+        self.framer.eof_received()
+
+        # Assert
+        with self.assertRaises(EOFError):
+            await read
+
+    async def test_readMessage_switchMarkerReceived_shouldSplitFramesAfterMarker(self):
+        # Arrange
+        framer = framing.LineFramer(1024, 4096, extensions=[binary.EXTENSION])
+        framer.connection_made(self.transport)
+        data = b'{"a":1}\n' + binary.SWITCH_MARKER + binary.frame(b"first") + binary.frame(b"second")
+
+        # Act
+        framer.data_received(data[:20])
+        framer.data_received(data[20:-3])
+        framer.data_received(data[-3:])
+
+        # Assert
+        self.assertEqual((False, b'{"a":1}\n'), await framer.read_message())
+        self.assertEqual((True, b"first"), await framer.read_message())
+        self.assertEqual((True, b"second"), await framer.read_message())
+
+    async def test_readMessage_switchMarkerWithoutExtension_shouldKeepSplittingLines(self):
+        # Arrange
+        framer = framing.LineFramer(1024, 4096)
+        framer.connection_made(self.transport)
+
+        # Act
+        framer.data_received(binary.SWITCH_MARKER)
+
+        # Assert
+        self.assertEqual((False, binary.SWITCH_MARKER), await framer.read_message())
+
+
+class LineFramerNodeTestCase(KermaTestCase):
+    async def test_messageTooLarge_shouldSendErrorAndClose(self):
+        client = await Client.new_established()
+
+        await client.write(b'{"type":"getpeers","padding":"' + b"x" * 2 ** 20 + b'"}\n')
+
+        self.assertEqual("error", (await client.read_dict())["type"])
+        self.assertEqual(b"", await client.readline())
+
+        await client.close()
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from src.kermapy import config
+from tests.test_kermapy import HELLO, KermaTestCase, Client
+
+
+class HandshakeTestCase(KermaTestCase):
+    async def test_noHelloWithinTimeout_shouldSendErrorAndClose(self):
+        with patch.object(config, "HANDSHAKE_TIMEOUT", 0.1):
+            client = await Client.new()
+            for _ in range(4):
+                await client.readline()
+
+            self.assertIn(b"Did not receive a 'hello' message", await client.readline())
+            self.assertEqual(b"", await client.readline())
+
+            await client.close()
+
+    async def test_messagesPipelinedWithHello_shouldBeHandledAfterHandshake(self):
+        client = await Client.new()
+        for _ in range(4):
+            await client.readline()
+
+        await client.write(HELLO + b'{"type":"getpeers"}\n')
+
+        self.assertEqual("peers", (await client.read_dict())["type"])
+
+        await client.close()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+from src.kermapy import inflight
+
+
+class FakeObjects:
+    def __init__(self) -> None:
+        self.events: dict[str, asyncio.Event] = {}
+
+    def __contains__(self, object_id: str) -> bool:
+        return False
+
+    def event_for(self, object_id: str) -> asyncio.Event:
+        self.events[object_id] = asyncio.Event()
+        return self.events[object_id]
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    def send(self, data: bytes) -> bool:
+        self.sent.append(json.loads(data))
+        return True
+
+
+class InflightRequestsTests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.objs = FakeObjects()
+        self.connections = {FakeConnection() for _ in range(3)}
+        self.requests = inflight.InflightRequests(self.objs, self.connections, 2, 0.1, 0.5)
+
+    def sent(self) -> int:
+        return sum(len(conn.sent) for conn in self.connections)
+
+    async def test_fetch_concurrentWaiters_shouldRequestOnce(self):
+        # Arrange
+        waiters = [asyncio.create_task(self.requests.fetch("a")) for _ in range(5)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        # Act
+        self.objs.events["a"].set()
+        await asyncio.gather(*waiters)
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.assertEqual(2, self.sent())
+        self.assertNotIn("a", self.requests)
+
+    async def test_request_withHint_shouldOnlyAskHint(self):
+        # Arrange
+        hint = next(iter(self.connections))
+
+        # Act
+        self.requests.request("a", hint)
+        await asyncio.sleep(0.05)
+
+        # Assert
+        self.assertEqual(1, self.sent())
+        self.assertListEqual([{"type": "getobject", "objectid": "a"}], hint.sent)
+        self.assertEqual(1, self.requests.load(hint))
+
+    async def test_request_notReceived_shouldRetryOnOtherPeer(self):
+        # Act
+        self.requests.request("a")
+        await asyncio.sleep(0.15)
+
+        # Assert
+        self.assertEqual(3, self.sent())
+        for conn in self.connections:
+            self.assertEqual(1, len(conn.sent))
+
+    async def test_fetch_notReceived_shouldTimeout(self):
+        # Act & Assert
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.requests.fetch("a")
+        await asyncio.sleep(0.05)
+        self.assertNotIn("a", self.requests)
+        for conn in self.connections:
+            self.assertEqual(0, self.requests.load(conn))
+
+    async def test_request_scoredPeers_shouldAskHighestScoresFirst(self):
+        # Arrange
+        scores = {conn: i for i, conn in enumerate(self.connections)}
+        lookups = []
+
+        def lookup(conns):
+            lookups.append(conns)
+            return [scores[conn] for conn in conns]
+
+        requests = inflight.InflightRequests(self.objs, self.connections, 1, 0.1, 0.5, lookup)
+
+        # Act
+        requests.request("a")
+        await asyncio.sleep(0.01)
+
+        # Assert
+        best = max(self.connections, key=scores.__getitem__)
+        self.assertListEqual([{"type": "getobject", "objectid": "a"}], best.sent)
+        self.assertEqual(1, self.sent())
+        self.assertEqual(1, len(lookups))
+
+    async def test_request_fewerPeersThanFanout_shouldNotLookUpScores(self):
+        # Arrange
+        lookup = Mock(return_value=[])
+        requests = inflight.InflightRequests(self.objs, self.connections, 3, 0.1, 0.5, lookup)
+
+        # Act
+        requests.request("a")
+        await asyncio.sleep(0.01)
+
+        # Assert
+        self.assertEqual(3, self.sent())
+        lookup.assert_not_called()
+
+    async def test_request_notReceived_shouldReportTimeout(self):
+        # Arrange
+        timed_out = []
+        requests = inflight.InflightRequests(self.objs, self.connections, 2, 0.1, 0.5, timed_out=timed_out.extend)
+        hint = next(iter(self.connections))
+
+        # Act
+        requests.request("a", hint)
+        await asyncio.sleep(0.15)
+
+        # Assert
+        self.assertListEqual([hint], timed_out)
+        self.assertIsNotNone(requests.response_time("a", hint))
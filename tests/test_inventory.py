@@ -0,0 +1,119 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.kermapy import config, inventory
+from src.kermapy.objects import Objects
+from tests.test_kermapy import KermaTestCase, Client
+
+COINBASE_TX = {
+    "height": 1, "outputs": [
+        {
+            "pubkey": "f66c7d51551d344b74e071d3b988d2bc09c3ffa82857302620d14f2469cfbf60",
+            "value": 50000000000000
+        }],
+    "type": "transaction"
+}
+COINBASE_TX_ID = "2a9458a2e75ed8bd0341b3cb2ab21015bbc13f21ea06229340a7b2b75720c4df"
+
+
+class KnownInventoryTests(TestCase):
+    def test_add_capacityExceeded_shouldForgetOldestGeneration(self):
+        # Arrange
+        known = inventory.KnownInventory(2)
+
+        # Act
+        for object_id in ["a", "b", "c", "d", "e"]:
+            known.add(object_id)
+
+        # Assert
+        self.assertNotIn("a", known)
+        self.assertNotIn("b", known)
+        for object_id in ["c", "d", "e"]:
+            self.assertIn(object_id, known)
+
+
+class RejectedObjectsTests(TestCase):
+    def test_get_rejected_shouldReturnReason(self):
+        # Arrange
+        rejected = inventory.RejectedObjects(2)
+
+        # Act
+        rejected.add("a", inventory.RejectReason.BLOCK, "Received invalid block")
+
+        # Assert
+        self.assertIn("a", rejected)
+        self.assertIs(inventory.RejectReason.BLOCK, rejected.get("a").reason)
+        self.assertEqual("Received invalid block", rejected.get("a").error)
+        self.assertIsNone(rejected.get("b"))
+
+    def test_add_capacityExceeded_shouldForgetOldestGeneration(self):
+        # Arrange
+        rejected = inventory.RejectedObjects(2)
+
+        # Act
+        for object_id in ["a", "b", "c", "d", "e"]:
+            rejected.add(object_id, inventory.RejectReason.TRANSACTION, "")
+
+        # Assert
+        self.assertNotIn("a", rejected)
+        self.assertNotIn("b", rejected)
+        for object_id in ["c", "d", "e"]:
+            self.assertIn(object_id, rejected)
+
+
+class RejectedObjectsNodeTestCase(KermaTestCase):
+    async def test_rejectedBlockAnnounced_shouldNotBeRequested(self):
+        client = await Client.new_established()
+        block = {**config.GENESIS, "nonce": "00" * 32}
+        await client.write_dict({"type": "object", "object": block})
+        self.assertEqual("error", (await client.read_dict())["type"])
+        await client.close()
+
+        client = await Client.new_established()
+        await client.write_dict({"type": "ihaveobject", "objectid": Objects.id(block)})
+
+        self.assertIsNone(await client.read_with_timeout(0.5))
+        self.assertEqual(1, self._node.metrics.counters["rejected_objects_ignored"])
+
+        await client.close()
+
+
+class RejectedRequestNodeTestCase(KermaTestCase):
+    async def asyncSetUp(self):
+        with patch.object(config, "GETOBJECT_RETRY_TIMEOUT", 0.1):
+            await super().asyncSetUp()
+
+    async def test_requestedTransactionInvalid_shouldNotBeRequestedFromOtherPeers(self):
+        client1 = await Client.new_established()
+        self.assertEqual("ihaveobject", (await client1.write_tx(COINBASE_TX))["type"])
+        client2 = await Client.new_established()
+        tx = {
+            "inputs": [{"outpoint": {"index": 0, "txid": COINBASE_TX_ID}, "sig": "00" * 64}],
+            "outputs": [{"pubkey": COINBASE_TX["outputs"][0]["pubkey"], "value": 10}],
+            "type": "transaction"
+        }
+
+        await client1.write_dict({"type": "ihaveobject", "objectid": Objects.id(tx)})
+        self.assertDictEqual({"type": "getobject", "objectid": Objects.id(tx)}, await client1.read_dict())
+        self.assertEqual("error", (await client1.write_tx(tx))["type"])
+
+        self.assertIsNone(await client2.read_with_timeout(0.3))
+
+        await client1.close()
+        await client2.close()
+
+
+class KnownInventoryNodeTestCase(KermaTestCase):
+    async def test_objectAnnouncedByPeer_shouldNotBeAnnouncedToPeer(self):
+        client1 = await Client.new_established()
+        client2 = await Client.new_established()
+
+        await client2.write_dict({"type": "ihaveobject", "objectid": COINBASE_TX_ID})
+        self.assertDictEqual({"type": "getobject", "objectid": COINBASE_TX_ID}, await client2.read_dict())
+
+        self.assertDictEqual({"type": "ihaveobject", "objectid": COINBASE_TX_ID}, await client1.write_tx(COINBASE_TX))
+        self.assertIsNone(await client2.read_with_timeout(0.5))
+        self.assertEqual(1, self._node.metrics.counters["announcements_suppressed"])
+
+        await client1.close()
+        await client2.close()
@@ -0,0 +1,238 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from src.kermapy import config, limits, objects
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class ConcurrencyLimitTests(IsolatedAsyncioTestCase):
+    async def test_slot_limitReached_shouldWaitForFreeSlot(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+        release = asyncio.Event()
+        order = []
+
+        async def hold(name: str):
+            async with limit.slot():
+                order.append(name)
+                await release.wait()
+
+        # Act
+        first = asyncio.create_task(hold("first"))
+        second = asyncio.create_task(hold("second"))
+        await asyncio.sleep(0.01)
+        in_use = limit.in_use
+        release.set()
+        await asyncio.gather(first, second)
+
+        # Assert
+        self.assertEqual(1, in_use)
+        self.assertEqual(["first", "second"], order)
+        self.assertEqual(0, limit.in_use)
+
+    async def test_suspended_slotHeld_shouldLetOtherTasksRun(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+        received = asyncio.Event()
+
+        async def wait_for_network():
+            async with limit.slot():
+                async with limit.suspended():
+                    await received.wait()
+
+        async def receive():
+            async with limit.slot():
+                received.set()
+
+        # Act
+        await asyncio.wait_for(asyncio.gather(wait_for_network(), receive()), 1)
+
+        # Assert
+        self.assertEqual(0, limit.in_use)
+
+    async def test_suspended_slotNotHeld_shouldNotReleaseSlot(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+
+        # Act
+        async with limit.suspended():
+            pass
+
+        # Assert
+        async with limit.slot():
+            self.assertEqual(1, limit.in_use)
+
+
+class ProcessingNodeTestCase(KermaTestCase):
+    async def test_messagesReceived_shouldRecordInboundQueueDepth(self):
+        client = await Client.new_established()
+
+        for _ in range(3):
+            await client.write_dict({"type": "getpeers"})
+        for _ in range(3):
+            self.assertEqual("peers", (await client.read_dict())["type"])
+        self.assertEqual(3, self._node.metrics.histograms["inbound_queue_depth"].count)
+        self.assertEqual(3, self._node.metrics.histograms["message_latency_peers"].count)
+        self.assertEqual(0, self._node.metrics.gauges["messages_processing"])
+
+        await client.close()
+
+    async def test_moreFetchesThanConnectionWorkers_shouldHandleReceivedObjects(self):
+        # Arrange
+        client = await Client.new_established()
+        txs = [{
+            "height": height,
+            "outputs": [{"pubkey": "f66c7d51551d344b74e071d3b988d2bc09c3ffa82857302620d14f2469cfbf60", "value": 1}],
+            "type": "transaction"
+        } for height in range(config.CONNECTION_WORKERS + 2)]
+        for tx in txs:
+            await client.write_dict({"type": "mempool", "txids": [objects.Objects.id(tx)]})
+        async with asyncio.timeout(1):
+            requested = {(await client.read_dict())["objectid"] for _ in txs}
+
+        # Act
+        for tx in txs:
+            await client.write_dict({"type": "object", "object": tx})
+
+        # Assert
+        async with asyncio.timeout(1):
+            announced = {(await client.read_dict())["objectid"] for _ in txs}
+        self.assertSetEqual({objects.Objects.id(tx) for tx in txs}, requested)
+        self.assertSetEqual(requested, announced)
+
+        await client.close()
+
+
+class PriorityConcurrencyLimitTests(IsolatedAsyncioTestCase):
+    async def _acquire_in_order(self, limit: limits.ConcurrencyLimit, waiters: list[tuple[int, str, str]]) -> list:
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with limit.slot():
+                await release.wait()
+
+        async def wait(priority: int, owner: str, name: str):
+            async with limit.slot(priority, owner):
+                order.append(name)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        tasks = []
+        for waiter in waiters:
+            tasks.append(asyncio.create_task(wait(*waiter)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order
+
+    async def test_slot_differentPriorities_shouldServeHighestPriorityFirst(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+
+        # Act
+        order = await self._acquire_in_order(limit, [(4, "a", "peers"), (2, "a", "serving"), (0, "b", "block")])
+
+        # Assert
+        self.assertEqual(["block", "serving", "peers"], order)
+
+    async def test_slot_samePriority_shouldServeOwnersRoundRobin(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+
+        # Act
+        order = await self._acquire_in_order(limit, [(2, "a", "a1"), (2, "a", "a2"), (2, "a", "a3"), (2, "b", "b1")])
+
+        # Assert
+        self.assertEqual(["a1", "b1", "a2", "a3"], order)
+
+    async def test_slot_ownerLimitReached_shouldServeOtherOwners(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(3, 1)
+        release = asyncio.Event()
+        acquired = []
+
+        async def hold(owner: str, name: str):
+            async with limit.slot(0, owner):
+                acquired.append(name)
+                await release.wait()
+
+        # Act
+        tasks = [asyncio.create_task(hold(*waiter)) for waiter in [("a", "a1"), ("a", "a2"), ("b", "b1")]]
+        await asyncio.sleep(0.01)
+        held = list(acquired)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        # Assert
+        self.assertEqual(["a1", "b1"], held)
+        self.assertEqual(["a1", "b1", "a2"], acquired)
+
+    async def test_suspended_ownerLimitReached_shouldLetSameOwnerRun(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(2, 1)
+        received = asyncio.Event()
+
+        async def wait_for_network():
+            async with limit.slot(0, "a"):
+                async with limit.suspended():
+                    await received.wait()
+
+        async def receive():
+            async with limit.slot(0, "a"):
+                received.set()
+
+        # Act
+        await asyncio.wait_for(asyncio.gather(wait_for_network(), receive()), 1)
+
+        # Assert
+        self.assertEqual(0, limit.in_use)
+
+    async def test_slot_waiterCancelled_shouldNotLoseSlot(self):
+        # Arrange
+        limit = limits.ConcurrencyLimit(1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limit.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        # Act
+        waiter.cancel()
+        release.set()
+        await holder
+
+        # Assert
+        async with asyncio.timeout(1):
+            async with limit.slot():
+                self.assertEqual(1, limit.in_use)
+
+
+class TokenBucketTests(TestCase):
+    def test_take_withinBurst_shouldNotWait(self):
+        # Arrange
+        bucket = limits.TokenBucket(10, 3)
+
+        # Act
+        delays = [bucket.take() for _ in range(3)]
+
+        # Assert
+        self.assertListEqual([0, 0, 0], delays)
+
+    def test_take_beyondBurst_shouldReserveNextTokens(self):
+        # Arrange
+        bucket = limits.TokenBucket(10, 1)
+        bucket.take()
+
+        # Act
+        first = bucket.take()
+        second = bucket.take()
+
+        # Assert
+        self.assertAlmostEqual(0.1, first, delta=0.01)
+        self.assertAlmostEqual(0.2, second, delta=0.01)
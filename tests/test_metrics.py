@@ -0,0 +1,45 @@
+import asyncio
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.kermapy import config, metrics
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class MetricsTests(TestCase):
+    def test_snapshot_shouldIncludeAllMetrics(self):
+        # Arrange
+        node_metrics = metrics.Metrics()
+        node_metrics.inc("announcements_sent", 2)
+        node_metrics.set("outbound_connections", 3)
+        node_metrics.observe("peers_flush_seconds", 0.002)
+
+        # Act
+        snapshot = node_metrics.snapshot()
+
+        # Assert
+        self.assertEqual(2, snapshot["counters"]["announcements_sent"])
+        self.assertEqual(3, snapshot["gauges"]["outbound_connections"])
+        self.assertEqual(1, snapshot["histograms"]["peers_flush_seconds"]["buckets"]["0.005"])
+
+
+class MetricsNodeTestCase(KermaTestCase):
+    async def asyncSetUp(self):
+        patcher = patch.object(config, "METRICS_INTERVAL", 0.1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        await super().asyncSetUp()
+
+    async def test_running_shouldLogMetricsPeriodically(self):
+        client = await Client.new_established()
+
+        with self.assertLogs(level="INFO") as logs:
+            await asyncio.sleep(0.25)
+
+        reports = [record.getMessage() for record in logs.records if record.getMessage().startswith("Metrics of")]
+        self.assertTrue(reports)
+        snapshot = json.loads(reports[-1].split(": ", 1)[1])
+        self.assertIn("counters", snapshot)
+
+        await client.close()
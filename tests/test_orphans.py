@@ -0,0 +1,82 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from src.kermapy import orphans
+
+
+def _orphan(block_id: str, previd: str) -> orphans.Orphan:
+    return orphans.Orphan(block_id, {"previd": previd, "type": "block"}, None, Mock())
+
+
+class OrphanPoolTests(TestCase):
+    def test_popChildren_shouldReturnOrphansOfParentOnly(self):
+        # Arrange
+        pool = orphans.OrphanPool(10, 1000)
+        pool.add(_orphan("b1", "a"))
+        pool.add(_orphan("b2", "a"))
+        pool.add(_orphan("c", "b1"))
+
+        # Act
+        children = pool.pop_children("a")
+
+        # Assert
+        self.assertListEqual(["b1", "b2"], [orphan.block_id for orphan in children])
+        self.assertNotIn("b1", pool)
+        self.assertIn("c", pool)
+        self.assertListEqual([], pool.pop_children("a"))
+
+    def test_add_poolFull_shouldEvictOldestOrphan(self):
+        # Arrange
+        pool = orphans.OrphanPool(2, 1000)
+        pool.add(_orphan("b1", "a"))
+        pool.add(_orphan("b2", "a"))
+
+        # Act
+        evicted = pool.add(_orphan("b3", "x"))
+
+        # Assert
+        self.assertListEqual(["b1"], [orphan.block_id for orphan in evicted])
+        self.assertEqual(2, len(pool))
+        self.assertListEqual(["b2"], [orphan.block_id for orphan in pool.pop_children("a")])
+
+    def test_add_bytesExceeded_shouldEvictOldestOrphans(self):
+        # Arrange
+        pool = orphans.OrphanPool(10, 3 * _orphan("b1", "a").size)
+        pool.add(_orphan("b1", "a"))
+        pool.add(_orphan("b2", "a"))
+        pool.add(_orphan("b3", "a"))
+
+        # Act
+        evicted = pool.add(_orphan("b4", "x"))
+
+        # Assert
+        self.assertListEqual(["b1"], [orphan.block_id for orphan in evicted])
+        self.assertEqual(3, len(pool))
+        self.assertEqual(3 * evicted[0].size, pool.size)
+
+    def test_popChildren_shouldReleaseBytes(self):
+        # Arrange
+        pool = orphans.OrphanPool(10, 1000)
+        pool.add(_orphan("b1", "a"))
+        pool.add(_orphan("c1", "b1"))
+
+        # Act
+        children = pool.pop_children("a")
+
+        # Assert
+        self.assertEqual(pool.size, pool.remove("c1").size)
+        self.assertEqual(0, pool.size)
+        self.assertListEqual(["b1"], [orphan.block_id for orphan in children])
+
+    def test_remove_lastChild_shouldForgetParent(self):
+        # Arrange
+        pool = orphans.OrphanPool(10, 1000)
+        pool.add(_orphan("b1", "a"))
+
+        # Act
+        orphan = pool.remove("b1")
+
+        # Assert
+        self.assertEqual("b1", orphan.block_id)
+        self.assertIsNone(pool.remove("b1"))
+        self.assertListEqual([], pool.pop_children("a"))
@@ -0,0 +1,142 @@
+import asyncio
+import shutil
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from src.kermapy import config, framing, metrics, outbound
+from src.kermapy.kermapy import Node
+
+
+class OutboundConnectionsTests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.peers = ["a", "b", "c"]
+        self.reachable = {"a", "b", "c"}
+        self.connected: dict[str, asyncio.Event] = {}
+        self.slowness = {}
+        self.metrics = metrics.Metrics()
+        self.outbound = outbound.OutboundConnections(
+            self.connect, lambda: self.peers, lambda peer: self.slowness.get(peer, 0), self.disconnect, 2,
+            self.metrics, interval=0.05, min_backoff=0.1, max_backoff=1, stable_after=10, rotate_interval=10)
+
+    async def connect(self, peer: str) -> bool:
+        if peer not in self.reachable:
+            return False
+        self.connected[peer] = asyncio.Event()
+        await self.connected[peer].wait()
+        del self.connected[peer]
+        return True
+
+    def disconnect(self, peer: str) -> None:
+        self.connected[peer].set()
+
+    async def test_fill_shouldConnectUpToTarget(self):
+        # Act
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Assert
+        self.assertSetEqual({"a", "b"}, set(self.connected))
+        self.assertEqual(2, self.metrics.gauges["outbound_connections"])
+
+    async def test_fill_connectionFailed_shouldBackOffAndTryNextPeer(self):
+        # Arrange
+        self.reachable.remove("a")
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Act
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Assert
+        self.assertSetEqual({"b", "c"}, set(self.connected))
+        self.assertGreater(self.outbound.backoff("a"), 0)
+        self.assertEqual(1, self.metrics.counters["outbound_connect_failures"])
+
+    async def test_fill_repeatedFailures_shouldDoubleBackoff(self):
+        # Arrange
+        self.reachable.clear()
+        self.outbound.fill()
+        await asyncio.sleep(0)
+        first = self.outbound.backoff("a")
+        await asyncio.sleep(first)
+
+        # Act
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Assert
+        self.assertAlmostEqual(2 * first, self.outbound.backoff("a"), delta=0.02)
+
+    async def test_rotate_shouldReplaceSlowestPeer(self):
+        # Arrange
+        self.slowness["b"] = 5
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Act
+        self.outbound.rotate()
+        await asyncio.sleep(0)
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Assert
+        self.assertSetEqual({"a", "c"}, set(self.connected))
+        self.assertEqual(1, self.metrics.counters["outbound_rotations"])
+        self.assertEqual(1, self.metrics.counters["outbound_disconnects"])
+
+    async def test_rotate_noCandidate_shouldKeepPeers(self):
+        # Arrange
+        self.peers.remove("c")
+        self.outbound.fill()
+        await asyncio.sleep(0)
+
+        # Act
+        self.outbound.rotate()
+        await asyncio.sleep(0)
+
+        # Assert
+        self.assertSetEqual({"a", "b"}, set(self.connected))
+
+    async def test_run_disconnected_shouldReconnectAfterBackoff(self):
+        # Arrange
+        task = asyncio.create_task(self.outbound.run())
+        await asyncio.sleep(0.01)
+        self.peers.remove("c")
+
+        # Act
+        self.connected["a"].set()
+        await asyncio.sleep(0.3)
+
+        # Assert
+        self.assertSetEqual({"a", "b"}, set(self.connected))
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertEqual(0, len(self.outbound))
+
+
+class NodeConnectTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.node = Node("127.0.0.1:19000", self._tmp_directory, 0.5)
+
+    async def asyncTearDown(self):
+        await self.node.shutdown()
+        shutil.rmtree(self._tmp_directory)
+
+    async def test_connect_unresponsivePeer_shouldFailAfterTimeout(self):
+        # Arrange
+        attempts = []
+
+        async def open_connection(*args):
+            attempts.append(args)
+            await asyncio.Event().wait()
+
+        # Act
+        with patch.object(framing, "open_connection", open_connection), patch.object(config, "CONNECT_TIMEOUT", 0.05):
+            connected = await asyncio.wait_for(self.node.connect("10.0.0.1:18018"), 1)
+
+        # Assert
+        self.assertFalse(connected)
+        self.assertEqual(1, len(attempts))
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.kermapy import peers
+
+
+class PeersTests(TestCase):
+    def setUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.peers = peers.Peers(self._tmp_directory)
+        self.peers.add_all(["1.1.1.1:18018", "8.8.8.8:18018"])
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_directory)
+
+    def test_ranked_fasterPeer_shouldComeFirst(self):
+        # Arrange
+        self.peers.record_response("1.1.1.1:18018", 2, 1000)
+        self.peers.record_response("8.8.8.8:18018", 0.1, 1000)
+
+        # Act
+        ranked = self.peers.ranked()
+
+        # Assert
+        self.assertEqual("8.8.8.8:18018", ranked[0])
+        self.assertEqual("1.1.1.1:18018", ranked[-1])
+
+    def test_score_invalidObject_shouldLowerScore(self):
+        # Arrange
+        self.peers.record_rtt("1.1.1.1:18018", 0.1)
+        self.peers.record_rtt("8.8.8.8:18018", 0.1)
+
+        # Act
+        self.peers.record_invalid("1.1.1.1:18018")
+
+        # Assert
+        self.assertLess(self.peers.score("1.1.1.1:18018"), self.peers.score("8.8.8.8:18018"))
+
+    def test_score_timeout_shouldLowerScore(self):
+        # Arrange
+        before = self.peers.score("1.1.1.1:18018")
+
+        # Act
+        self.peers.record_timeouts(["1.1.1.1:18018"])
+
+        # Assert
+        self.assertLess(self.peers.score("1.1.1.1:18018"), before)
+
+    def test_recordResponse_shouldAverageMeasurements(self):
+        # Arrange
+        stats = peers.PeerStats()
+
+        # Act
+        stats.record_response(1, 1000)
+        stats.record_response(2, 1000)
+
+        # Assert
+        self.assertAlmostEqual(1 + peers.SMOOTHING, stats.latency)
+        self.assertAlmostEqual(1000 - 500 * peers.SMOOTHING, stats.throughput)
+
+    def test_dump_shouldPersistStats(self):
+        # Arrange
+        self.peers.record_rtt("1.1.1.1:18018", 0.5)
+        self.peers.record_invalid("1.1.1.1:18018")
+
+        # Act
+        self.peers.dump()
+        loaded = peers.Peers(self._tmp_directory)
+
+        # Assert
+        self.assertEqual(self.peers.score("1.1.1.1:18018"), loaded.score("1.1.1.1:18018"))
+        self.assertListEqual(self.peers.ranked(), loaded.ranked())
+
+    def test_writeAtomically_shouldSyncFileAndDirectoryBeforeReturning(self):
+        # Arrange
+        path = pathlib.Path(self._tmp_directory, "file.json")
+        path.write_bytes(b"old")
+
+        # Act
+        with patch.object(peers.os, "fsync", wraps=peers.os.fsync) as fsync:
+            peers.write_atomically(path, b"new")
+
+        # Assert
+        self.assertEqual(b"new", path.read_bytes())
+        self.assertEqual(2, fsync.call_count)
+        self.assertListEqual([path], list(path.parent.glob("file.json*")))
+
+    def test_load_oldFormat_shouldStartWithEmptyStats(self):
+        # Arrange
+        pathlib.Path(self._tmp_directory, "peers.json").write_text(json.dumps({"1.1.1.1:18018": ""}))
+
+        # Act
+        loaded = peers.Peers(self._tmp_directory)
+
+        # Assert
+        self.assertListEqual(["1.1.1.1:18018"], list(loaded))
+        self.assertEqual(peers.PeerStats().score, loaded.score("1.1.1.1:18018"))
+
+    def test_flush_changed_shouldReplaceFile(self):
+        # Arrange
+        self.peers.record_rtt("1.1.1.1:18018", 0.5)
+
+        # Act
+        flushed = asyncio.run(self.peers.flush())
+
+        # Assert
+        self.assertTrue(flushed)
+        self.assertFalse(self.peers.dirty)
+        self.assertListEqual(["peers.json"], [path.name for path in pathlib.Path(self._tmp_directory).iterdir()])
+        self.assertEqual(self.peers.score("1.1.1.1:18018"), peers.Peers(self._tmp_directory).score("1.1.1.1:18018"))
+
+    def test_flush_unchanged_shouldNotWrite(self):
+        # Arrange
+        asyncio.run(self.peers.flush())
+
+        # Act
+        flushed = asyncio.run(self.peers.flush())
+
+        # Assert
+        self.assertFalse(flushed)
+
+
+class BucketTests(TestCase):
+    def setUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.peers = peers.Peers(self._tmp_directory, new_buckets=4, tried_buckets=2, bucket_size=2)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_directory)
+
+    def test_add_sameNetwork_shouldBoundEntries(self):
+        # Act
+        self.peers.add_all([f"1.1.1.{i}:18018" for i in range(10)])
+
+        # Assert
+        self.assertEqual(2, sum(1 for peer in self.peers if peer.startswith("1.1.")))
+
+    def test_add_manyPortsOfOneHost_shouldBoundEntries(self):
+        # Arrange
+        known_peers = peers.Peers(self._tmp_directory, new_buckets=4, tried_buckets=2, bucket_size=8, per_host=3)
+
+        # Act
+        known_peers.add_all([f"1.1.1.1:{port}" for port in range(20000, 20005)] + ["1.1.1.1:18018", "1.1.1.2:20000"])
+
+        # Assert
+        self.assertEqual(3, sum(1 for peer in known_peers if peer.startswith("1.1.1.1:2")))
+        self.assertIn("1.1.1.1:18018", known_peers)
+        self.assertIn("1.1.1.2:20000", known_peers)
+
+    def test_add_bucketFull_shouldEvictStalestEntry(self):
+        # Arrange
+        self.peers.add_all(["1.1.1.1:18018", "1.1.1.2:18018"])
+        self.peers.add("1.1.1.1:18018")
+
+        # Act
+        self.peers.add("1.1.1.3:18018")
+
+        # Assert
+        self.assertIn("1.1.1.1:18018", self.peers)
+        self.assertNotIn("1.1.1.2:18018", self.peers)
+        self.assertIn("1.1.1.3:18018", self.peers)
+
+    def test_add_bucketFull_shouldEvictMisbehavingPeerFirst(self):
+        # Arrange
+        self.peers.add_all(["1.1.1.1:18018", "1.1.1.2:18018"])
+        self.peers.record_invalid("1.1.1.2:18018")
+
+        # Act
+        self.peers.add("1.1.1.3:18018")
+
+        # Assert
+        self.assertIn("1.1.1.1:18018", self.peers)
+        self.assertNotIn("1.1.1.2:18018", self.peers)
+
+    def test_markTried_shouldMakeRoomInNewTable(self):
+        # Arrange
+        self.peers.add_all(["1.1.1.1:18018", "1.1.1.2:18018"])
+
+        # Act
+        self.peers.mark_tried("1.1.1.1:18018")
+        self.peers.add("1.1.1.3:18018")
+
+        # Assert
+        self.assertSetEqual({"1.1.1.1:18018", "1.1.1.2:18018", "1.1.1.3:18018"},
+                            {peer for peer in self.peers if peer.startswith("1.1.")})
+
+    def test_markTried_triedBucketFull_shouldDemoteToNewTable(self):
+        # Arrange
+        self.peers.add_all(["1.1.1.1:18018", "1.1.1.2:18018"])
+        self.peers.mark_tried("1.1.1.1:18018")
+        self.peers.mark_tried("1.1.1.2:18018")
+        self.peers.add("1.1.1.3:18018")
+
+        # Act
+        self.peers.mark_tried("1.1.1.3:18018")
+
+        # Assert
+        self.assertIn("1.1.1.1:18018", self.peers)
+        self.peers.dump()
+        loaded = peers.Peers(self._tmp_directory, new_buckets=4, tried_buckets=2, bucket_size=2)
+        self.assertSetEqual(set(self.peers), set(loaded))
+
+    def test_sample_shouldReturnAtMostK(self):
+        # Arrange
+        self.peers.add_all([f"{i}.1.1.1:18018" for i in range(1, 20)])
+
+        # Act
+        sample = self.peers.sample(5)
+
+        # Assert
+        self.assertEqual(5, len(sample))
+        self.assertEqual(5, len(set(sample)))
+        self.assertTrue(all(peer in self.peers for peer in sample))
@@ -0,0 +1,26 @@
+from src.kermapy import config
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class PrecheckTestCase(KermaTestCase):
+    async def test_blockFailingProofOfWork_shouldBeRejectedBeforeTxids(self):
+        client = await Client.new_established()
+        block = {**config.GENESIS, "nonce": "00" * 32, "txids": ["not a txid"] * 1000}
+
+        await client.write_dict({"type": "object", "object": block})
+
+        self.assertIn("proof-of-work", (await client.read_dict())["error"])
+        self.assertEqual(1, self._node.metrics.counters["blocks_rejected_early"])
+
+        await client.close()
+
+    async def test_blockWithInvalidTarget_shouldBeRejectedEarly(self):
+        client = await Client.new_established()
+        block = {**config.GENESIS, "T": "f" * 64}
+
+        await client.write_dict({"type": "object", "object": block})
+
+        self.assertIn("invalid target", (await client.read_dict())["error"])
+        self.assertEqual(1, self._node.metrics.counters["blocks_rejected_early"])
+
+        await client.close()
@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+from src.kermapy import scheduler
+
+
+class ClassifyTests(TestCase):
+    def test_classify_shouldOrderBlocksBeforeTransactionsBeforeServingBeforeGossipBeforePeers(self):
+        # Arrange
+        messages = [
+            {"type": "getpeers"},
+            {"type": "ihaveobject", "objectid": "a"},
+            {"type": "getobject", "objectid": "a"},
+            {"type": "object", "object": {"type": "transaction"}},
+            {"type": "object", "object": {"type": "block"}},
+        ]
+
+        # Act
+        classes = [scheduler.classify(message) for message in messages]
+
+        # Assert
+        self.assertEqual([
+            scheduler.MessageClass.PEERS,
+            scheduler.MessageClass.GOSSIP,
+            scheduler.MessageClass.SERVING,
+            scheduler.MessageClass.TRANSACTION,
+            scheduler.MessageClass.BLOCK,
+        ], classes)
@@ -0,0 +1,114 @@
+import io
+import shutil
+import tempfile
+from unittest import TestCase
+
+from src.kermapy import binary, config, objects, snapshot
+
+COINBASE_TX_1 = {
+    "height": 1,
+    "outputs": [{"pubkey": "f66c7d51551d344b74e071d3b988d2bc09c3ffa82857302620d14f2469cfbf60", "value": 50000000000000}],
+    "type": "transaction"
+}
+
+BLOCK_1 = {
+    "T": "00000002af000000000000000000000000000000000000000000000000000000",
+    "created": 1624220079,
+    "miner": "Snekel testminer",
+    "nonce": "000000000000000000000000000000000000000000000000000000009d8b60ea",
+    "note": "First block after genesis with CBTX",
+    "previd": "00000000a420b7cefa2b7730243316921ed59ffe836e111ca3801f82a4f5360e",
+    "txids": ["2a9458a2e75ed8bd0341b3cb2ab21015bbc13f21ea06229340a7b2b75720c4df"],
+    "type": "block"
+}
+
+COINBASE_TX_2 = {
+    "height": 2,
+    "outputs": [{"pubkey": "c7c2c13afd02be7986dee0f4630df01abdbc950ea379055f1a423a6090f1b2b3", "value": 50000000000000}],
+    "type": "transaction"
+}
+
+BLOCK_2 = {
+    "T": "00000002af000000000000000000000000000000000000000000000000000000",
+    "created": 1624221079,
+    "miner": "Snekel testminer",
+    "nonce": "000000000000000000000000000000000000000000000000000000004d82fc68",
+    "note": "Second block after genesis with CBTX",
+    "previd": "0000000108bdb42de5993bcf5f7d92557585dd6abfe9fb68e796518fe7f2ed2e",
+    "txids": ["73231cc901774ddb4196ee7e9e6b857b208eea04aee26ced038ac465e1e706d2"],
+    "type": "block"
+}
+
+BLOCK_2_ID = "00000002a8986627f379547ed1ec990841e1f1c6ba616a56bfcd4b410280dc6d"
+
+
+def chain_file(*objs: dict) -> io.BytesIO:
+    fp = io.BytesIO()
+    fp.write(snapshot.MAGIC)
+    for obj in objs:
+        fp.write(binary.frame(binary.message_payload({"type": "object", "object": obj})))
+    fp.seek(0)
+    return fp
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self.objs = objects.Objects(self._tmp_directory)
+
+    def tearDown(self):
+        self.objs.close()
+        shutil.rmtree(self._tmp_directory)
+
+    def test_importChain_shouldStoreChain(self):
+        # Arrange
+        fp = chain_file(config.GENESIS, COINBASE_TX_1, BLOCK_1, COINBASE_TX_2, BLOCK_2)
+
+        # Act
+        stored = snapshot.import_chain(self.objs, fp, batch_size=1)
+
+        # Assert
+        self.assertEqual(2, stored)
+        self.assertEqual(BLOCK_2_ID, self.objs.chaintip())
+        self.assertEqual(2, self.objs.height(BLOCK_2_ID))
+        self.assertDictEqual(COINBASE_TX_2, self.objs.get(BLOCK_2["txids"][0]))
+
+    def test_exportChain_shouldRoundTrip(self):
+        # Arrange
+        original = chain_file(config.GENESIS, COINBASE_TX_1, BLOCK_1, COINBASE_TX_2, BLOCK_2)
+        snapshot.import_chain(self.objs, original)
+        exported = io.BytesIO()
+
+        # Act
+        blocks = snapshot.export_chain(self.objs, exported)
+
+        # Assert
+        self.assertEqual(3, blocks)
+        self.assertEqual(original.getvalue(), exported.getvalue())
+
+    def test_importChain_invalidBlock_shouldKeepEarlierBatches(self):
+        # Arrange
+        fp = chain_file(config.GENESIS, COINBASE_TX_1, BLOCK_1, COINBASE_TX_2, BLOCK_2 | {"note": "Tampered"})
+
+        # Act
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.import_chain(self.objs, fp, batch_size=1)
+
+        # Assert
+        self.assertEqual(BLOCK_2["previd"], self.objs.chaintip())
+
+    def test_importChain_notAChainFile_shouldRaise(self):
+        # Arrange
+        fp = io.BytesIO(b'{"type": "object"}\n')
+
+        # Act & Assert
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.import_chain(self.objs, fp)
+
+    def test_importChain_truncatedFile_shouldRaise(self):
+        # Arrange
+        fp = io.BytesIO(chain_file(config.GENESIS, COINBASE_TX_1, BLOCK_1).getvalue()[:-10])
+
+        # Act & Assert
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.import_chain(self.objs, fp)
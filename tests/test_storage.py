@@ -0,0 +1,127 @@
+import asyncio
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+from src.kermapy import bans, config, peers, storage
+
+TX = {
+    "height": 1, "outputs": [
+        {
+            "pubkey": "f66c7d51551d344b74e071d3b988d2bc09c3ffa82857302620d14f2469cfbf60",
+            "value": 50000000000000
+        }],
+    "type": "transaction"
+}
+
+
+class RemoteObjectsTests(TestCase):
+    def setUp(self):
+        self._tmp_directory = tempfile.mkdtemp()
+        self._notifications = [multiprocessing.get_context("fork").Queue() for _ in range(2)]
+        self._manager = storage.start_storage(self._tmp_directory, self._notifications)
+        self._workers = [storage.RemoteObjects(self._manager.address, index, self._notifications[index])
+                         for index in range(2)]
+        self._managers = [storage.StorageManager(address=self._manager.address) for _ in range(2)]
+        for manager in self._managers:
+            manager.connect()
+
+    def tearDown(self):
+        for worker in self._workers:
+            worker.close()
+        self._manager.shutdown()
+        shutil.rmtree(self._tmp_directory)
+
+    def test_putObject_shouldHandOverObjectToOtherWorkers(self):
+        # Arrange
+        tx_id = storage.RemoteObjects.id(TX)
+        stored = []
+
+        async def act():
+            self._workers[1].listen(asyncio.get_running_loop(), stored.append)
+            event = self._workers[1].event_for(tx_id)
+            self._workers[0].put_object(TX)
+            await asyncio.wait_for(event.wait(), 5)
+
+        # Act
+        asyncio.run(act())
+
+        # Assert
+        self.assertEqual([tx_id], stored)
+        self.assertIn(tx_id, self._workers[1])
+        self.assertDictEqual(TX, self._workers[1].get(tx_id))
+
+    def test_putBlock_lowerThanChaintip_shouldKeepChaintip(self):
+        # Arrange
+        higher = {"type": "block", "note": "higher"}
+        lower = {"type": "block", "note": "lower"}
+
+        # Act
+        higher_is_chaintip = self._workers[0].put_block(higher, {}, 2)
+        lower_is_chaintip = self._workers[1].put_block(lower, {}, 1)
+
+        # Assert
+        self.assertTrue(higher_is_chaintip)
+        self.assertFalse(lower_is_chaintip)
+        self.assertEqual(storage.RemoteObjects.id(higher), self._workers[1].chaintip())
+
+    def test_putBlock_concurrentWorkers_shouldKeepHighestBlockAsChaintip(self):
+        # Arrange
+        blocks = [({"type": "block", "note": str(height)}, height) for height in range(1, 41)]
+
+        def put(worker: storage.RemoteObjects, heights: list[tuple[dict, int]]) -> None:
+            for block, height in heights:
+                worker.put_block(block, {}, height)
+
+        # Act
+        threads = [threading.Thread(target=put, args=(worker, blocks[index::2]))
+                   for index, worker in enumerate(self._workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(storage.RemoteObjects.id(blocks[-1][0]), self._workers[0].chaintip())
+
+    def test_peers_shouldBeSharedByWorkers(self):
+        # Arrange
+        known_peers = [manager.peers() for manager in self._managers]
+
+        # Act
+        known_peers[1].add_all(["8.8.8.8:18018"])
+
+        # Assert
+        self.assertIn("8.8.8.8:18018", known_peers[0].ranked())
+        self.assertEqual([known_peers[1].score("8.8.8.8:18018")], known_peers[0].scores(["8.8.8.8:18018"]))
+
+    def test_bans_shouldBeSharedByWorkers(self):
+        # Arrange
+        ban_managers = [manager.bans() for manager in self._managers]
+
+        # Act
+        banned = ban_managers[1].misbehaved("10.0.0.1", config.BAN_THRESHOLD)
+
+        # Assert
+        self.assertTrue(banned)
+        self.assertTrue(ban_managers[0].is_banned("10.0.0.1"))
+
+    def test_shutdown_shouldWritePeersAndBans(self):
+        # Arrange
+        self._managers[0].peers().add_all(["8.8.8.8:18018"])
+        self._managers[0].bans().misbehaved("10.0.0.1", config.BAN_THRESHOLD)
+
+        # Act
+        self._manager.shutdown()
+
+        # Assert
+        self.assertIn("8.8.8.8:18018", peers.Peers(self._tmp_directory))
+        self.assertTrue(bans.BanManager(self._tmp_directory, config.BAN_THRESHOLD, config.BAN_DURATION)
+                        .is_banned("10.0.0.1"))
+
+    def test_get_unknownObject_shouldRaiseKeyError(self):
+        # Act & Assert
+        with self.assertRaises(KeyError):
+            self._workers[0].get("00" * 32)
@@ -0,0 +1,78 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.kermapy import sync
+from tests.test_kermapy import KermaTestCase, Client
+
+
+class ChainSyncTests(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requested = []
+        self.chain_sync = sync.ChainSync(self.requested.append, 2, 0.1)
+
+    async def test_want_windowFull_shouldQueueRequests(self):
+        # Act
+        self.chain_sync.want_transactions(["t1", "t2", "t3"])
+
+        # Assert
+        self.assertListEqual(["t1", "t2"], self.requested)
+        self.assertIn("t3", self.chain_sync)
+
+    async def test_received_shouldRequestParentsBeforeTransactions(self):
+        # Arrange
+        self.chain_sync.want_transactions(["t1", "t2", "t3"])
+        self.chain_sync.want_parent("p1")
+
+        # Act
+        self.chain_sync.received("t1")
+
+        # Assert
+        self.assertListEqual(["t1", "t2", "p1"], self.requested)
+
+    async def test_want_alreadyWanted_shouldNotRequestAgain(self):
+        # Act
+        self.chain_sync.want_parent("p1")
+        self.chain_sync.want_parent("p1")
+        self.chain_sync.want_transactions(["p1"])
+
+        # Assert
+        self.assertListEqual(["p1"], self.requested)
+
+    async def test_requestTimedOut_shouldFreeSlot(self):
+        # Arrange
+        self.chain_sync.want_transactions(["t1", "t2", "t3"])
+
+        # Act
+        await asyncio.sleep(0.15)
+
+        # Assert
+        self.assertListEqual(["t1", "t2", "t3"], self.requested)
+        self.assertEqual(1, self.chain_sync.in_flight)
+
+
+class ChainSyncNodeTestCase(KermaTestCase):
+    async def test_sendOrphanBlock_shouldRequestParentAndTransactions(self):
+        client = await Client.new_established()
+        block_message = {
+            "object": {
+                "T": "00000002af000000000000000000000000000000000000000000000000000000", "created": 1624221079,
+                "miner": "Snekel testminer",
+                "nonce": "000000000000000000000000000000000000000000000000000000004d82fc68",
+                "note": "Second block after genesis with CBTX",
+                "previd": "0000000108bdb42de5993bcf5f7d92557585dd6abfe9fb68e796518fe7f2ed2e",
+                "txids": ["73231cc901774ddb4196ee7e9e6b857b208eea04aee26ced038ac465e1e706d2"], "type": "block"
+            }, "type": "object"
+        }
+
+        await client.write_dict(block_message)
+
+        self.assertDictEqual({
+            "type": "getobject",
+            "objectid": "0000000108bdb42de5993bcf5f7d92557585dd6abfe9fb68e796518fe7f2ed2e"
+        }, await client.read_dict())
+        self.assertDictEqual({
+            "type": "getobject",
+            "objectid": "73231cc901774ddb4196ee7e9e6b857b208eea04aee26ced038ac465e1e706d2"
+        }, await client.read_dict())
+
+        await client.close()
@@ -1,6 +1,8 @@
 import json
+import multiprocessing
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from unittest import TestCase
 from unittest.mock import Mock
 
@@ -588,3 +590,111 @@ class TransactionValidationTests(TestCase):
             self.fail("Expected an error but none was raised")
         except transaction_validation.InvalidTransaction as e:
             self.assertIn("has multiple inputs with the same outpoint", str(e))
+
+    # Block validation tests
+
+    def test_spendDagLevels_shouldGroupByDepthInBlock(self):
+        # Arrange
+        transactions = {
+            "a": {"inputs": [{"outpoint": {"index": 0, "txid": "x"}, "sig": None}], "outputs": []},
+            "b": {"inputs": [{"outpoint": {"index": 0, "txid": "a"}, "sig": None}], "outputs": []},
+            "c": {"height": 1, "outputs": []},
+            "d": {"inputs": [{"outpoint": {"index": 0, "txid": "b"}, "sig": None},
+                             {"outpoint": {"index": 0, "txid": "c"}, "sig": None}], "outputs": []},
+            "e": {"inputs": [{"outpoint": {"index": 0, "txid": "f"}, "sig": None}], "outputs": []},
+            "f": {"inputs": [{"outpoint": {"index": 0, "txid": "c"}, "sig": None}], "outputs": []}
+        }
+
+        # Act
+        levels = transaction_validation.spend_dag_levels(transactions)
+
+        # Assert
+        self.assertListEqual([["a", "c", "e"], ["b", "f"], ["d"]], levels)
+
+    def test_validateTransactions_withExecutor_shouldReturnMetadataInBlockOrder(self):
+        # Arrange
+        objs = Mock(objects.Objects)
+        objs.get.return_value = {
+            "height": 0, "outputs": [
+                {"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 50000000000}],
+            "type": "transaction"
+        }
+        transaction = {
+            "inputs": [{
+                "outpoint": {
+                    "index": 0, "txid": "1bb37b637d07100cd26fc063dfd4c39a7931cc88dae3417871219715a5e374af"
+                },
+                "sig": "1d0d7d774042607c69a87ac5f1cdf92bf474c25fafcc089fe667602bfefb0494726c519e92266957429ced875256e6915eb8cea2ea66366e739415efc47a6805"
+            }],
+            "outputs": [{"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 10}],
+            "type": "transaction"
+        }
+        transactions = {str(i): transaction for i in range(8)}
+
+        # Act
+        with ThreadPoolExecutor(4) as executor:
+            metadata = transaction_validation.validate_transactions(transactions, objs, executor)
+
+        # Assert
+        self.assertListEqual(list(transactions), list(metadata))
+        for m in metadata.values():
+            self.assertEqual(50000000000, m.total_input_value)
+            self.assertEqual(10, m.total_output_value)
+
+    def test_validateTransactions_withProcessPool_shouldReturnMetadataWithUtxoDelta(self):
+        # Arrange
+        objs = Mock(objects.Objects)
+        objs.get.return_value = {
+            "height": 0, "outputs": [
+                {"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 50000000000}],
+            "type": "transaction"
+        }
+        transaction = {
+            "inputs": [{
+                "outpoint": {
+                    "index": 0, "txid": "1bb37b637d07100cd26fc063dfd4c39a7931cc88dae3417871219715a5e374af"
+                },
+                "sig": "1d0d7d774042607c69a87ac5f1cdf92bf474c25fafcc089fe667602bfefb0494726c519e92266957429ced875256e6915eb8cea2ea66366e739415efc47a6805"
+            }],
+            "outputs": [{"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 10}],
+            "type": "transaction"
+        }
+
+        # Act
+        with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as executor:
+            metadata = transaction_validation.validate_transactions({"a": transaction}, objs, executor)
+
+        # Assert
+        self.assertEqual(10, metadata["a"].total_output_value)
+        self.assertEqual((
+            ["1bb37b637d07100cd26fc063dfd4c39a7931cc88dae3417871219715a5e374af_"
+             "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9_0"],
+            {"a_8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9_0": 10}
+        ), metadata["a"].utxo_delta)
+
+    def test_validateTransactions_invalidSignature_shouldRaiseError(self):
+        # Arrange
+        objs = Mock(objects.Objects)
+        objs.get.return_value = {
+            "height": 0, "outputs": [
+                {"pubkey": "a2ba5aebc27d7ffb476e45cdef00146eaabc2614eeb0b3a878541d96605e5a52", "value": 50000000000}],
+            "type": "transaction"
+        }
+        transaction = {
+            "inputs": [{
+                "outpoint": {
+                    "index": 0, "txid": "1bb37b637d07100cd26fc063dfd4c39a7931cc88dae3417871219715a5e374af"
+                },
+                "sig": "1d0d7d774042607c69a87ac5f1cdf92bf474c25fafcc089fe667602bfefb0494726c519e92266957429ced875256e6915eb8cea2ea66366e739415efc47a6805"
+            }],
+            "outputs": [{"pubkey": "8dbcd2401c89c04d6e53c81c90aa0b551cc8fc47c0469217c8f5cfbae1e911f9", "value": 10}],
+            "type": "transaction"
+        }
+
+        # Act & Assert
+        with ThreadPoolExecutor(2) as executor:
+            try:
+                transaction_validation.validate_transactions({"a": transaction}, objs, executor)
+                self.fail("Expected an error but none was raised")
+            except transaction_validation.InvalidTransaction as e:
+                self.assertIn("Invalid signature", str(e))